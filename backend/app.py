@@ -1,20 +1,27 @@
 from flask import Flask
+from werkzeug.exceptions import HTTPException
 from flask_cors import CORS
-from utils.db import db
+from utils.db import db, init_db, STICKY_HEADER
 from controllers.auth_controller import auth_bp
 from controllers.project_controller import project_bp
 from controllers.task_controller import task_bp
 from controllers.progress_controller import progress_bp
 from config import Config
+from utils.serializers import FastJSONProvider
 
 from flask_migrate import Migrate
 
-def create_app():
+def create_app(prefork=False):
+    # prefork: built in a server's master process before forking workers
+    # (wsgi.py), so nothing may start threads here
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config["PREFORK"] = prefork
+    app.json = FastJSONProvider(app)
 
-    CORS(app)
-    db.init_app(app)
+    # The SPA reads the replica stickiness deadline from a header (utils/db.py)
+    CORS(app, expose_headers=[STICKY_HEADER])
+    init_db(app)
     Migrate(app, db)
 
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -32,7 +39,11 @@ def create_app():
     app.register_blueprint(comment_bp, url_prefix="/api/comments")
 
     from controllers.attachment_controller import attachment_bp
+    from utils.uploads import upload_store
     app.register_blueprint(attachment_bp, url_prefix="/api/attachments")
+    upload_store.init_app(app)
+    from utils.previews import preview_generator
+    preview_generator.init_app(app, on_ready=upload_store.previews_ready)
 
     from controllers.tracking_controller import tracking_bp
     app.register_blueprint(tracking_bp, url_prefix="/api/tracking")
@@ -40,6 +51,43 @@ def create_app():
     from controllers.user_controller import user_bp
     app.register_blueprint(user_bp, url_prefix="/api/users")
 
+    from utils.cache import stats_cache, invalidate_on_write
+    stats_cache.ttl = app.config["STATS_CACHE_TTL"]
+    invalidate_on_write(app, stats_cache, task_bp, issue_bp, project_bp, user_bp)
+
+    from utils.deadlines import deadline_scheduler
+    deadline_scheduler.init_app(app)
+
+    from controllers.events_controller import events_bp
+    from utils.events import event_hub
+    app.register_blueprint(events_bp, url_prefix="/api/events")
+    event_hub.init_app(app)
+
+    from utils.heartbeats import heartbeat_buffer
+    heartbeat_buffer.init_app(app)
+
+    from controllers.telemetry_controller import telemetry_bp
+    from utils.telemetry import telemetry_buffer
+    app.register_blueprint(telemetry_bp, url_prefix="/api/telemetry")
+    telemetry_buffer.init_app(app)
+
+    from utils.fleet import fleet_index
+    fleet_index.init_app(app)
+
+    from controllers.search_controller import search_bp
+    app.register_blueprint(search_bp, url_prefix="/api/search")
+
+    from utils.typeahead import user_typeahead
+    user_typeahead.init_app(app)
+
+    from controllers.metrics_controller import metrics_bp
+    from utils.metrics import metrics
+    app.register_blueprint(metrics_bp, url_prefix="/api/metrics")
+    metrics.init_app(app)
+
+    from utils.query_guard import query_guard
+    query_guard.init_app(app)
+
     @app.route("/")
     def home():
         return {"status": "IoT Tracking Backend Running"}
@@ -52,10 +100,14 @@ def create_app():
 
     @app.errorhandler(Exception)
     def handle_exception(e):
+        # Werkzeug's HTTP errors (e.g. 416 from a Range download) keep their status
+        if isinstance(e, HTTPException):
+            return e
         return {"error": str(e), "type": type(e).__name__}, 500
 
     return app
 
 if __name__ == "__main__":
+    # Development server; production runs gunicorn with gunicorn.conf.py
     app = create_app()
     app.run(host="0.0.0.0", port=5000)
@@ -11,6 +11,68 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool (utils/db.py). Connections are pinged on checkout and
+    # recycled well inside MariaDB's wait_timeout
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Read replicas for GET requests, comma-separated database URIs, and how
+    # long a client keeps reading from the primary after a write
+    DB_REPLICA_URIS = [uri.strip() for uri in os.environ.get("DB_REPLICA_URIS", "").split(",") if uri.strip()]
+    DB_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
     SECRET_KEY = os.environ.get("SECRET_KEY", "supersecretkey")
+    STATS_CACHE_TTL = int(os.environ.get("STATS_CACHE_TTL", 30))
+    # Background overdue/priority escalation sweep (utils/deadlines.py)
+    DEADLINE_SCHEDULER_ENABLED = os.environ.get("DEADLINE_SCHEDULER_ENABLED", "true").lower() == "true"
+    DEADLINE_SCHEDULER_MAX_SLEEP = int(os.environ.get("DEADLINE_SCHEDULER_MAX_SLEEP", 3600))
+    # /api/events change feed (utils/events.py)
+    EVENTS_POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", 1.0))
+    EVENTS_RETENTION_HOURS = int(os.environ.get("EVENTS_RETENTION_HOURS", 24))
+    # Device heartbeat write-behind buffer (utils/heartbeats.py)
+    HEARTBEAT_FLUSH_INTERVAL = float(os.environ.get("HEARTBEAT_FLUSH_INTERVAL", 5))
+    HEARTBEAT_MAX_PENDING = int(os.environ.get("HEARTBEAT_MAX_PENDING", 250000))
+    # Device telemetry buffer and retention (utils/telemetry.py)
+    TELEMETRY_FLUSH_INTERVAL = float(os.environ.get("TELEMETRY_FLUSH_INTERVAL", 5))
+    TELEMETRY_MAX_PENDING = int(os.environ.get("TELEMETRY_MAX_PENDING", 500000))
+    TELEMETRY_FLUSH_ATTEMPTS = int(os.environ.get("TELEMETRY_FLUSH_ATTEMPTS", 3))
+    TELEMETRY_RAW_RETENTION_DAYS = int(os.environ.get("TELEMETRY_RAW_RETENTION_DAYS", 30))
+    TELEMETRY_MINUTE_RETENTION_DAYS = int(os.environ.get("TELEMETRY_MINUTE_RETENTION_DAYS", 90))
+    # Fleet online/offline index (utils/fleet.py); seconds
+    FLEET_OFFLINE_AFTER = int(os.environ.get("FLEET_OFFLINE_AFTER", 120))
+    FLEET_REFRESH_INTERVAL = int(os.environ.get("FLEET_REFRESH_INTERVAL", 10))
+    FLEET_REFRESH_LOOKBACK = int(os.environ.get("FLEET_REFRESH_LOOKBACK", 15))
+    FLEET_REBUILD_INTERVAL = int(os.environ.get("FLEET_REBUILD_INTERVAL", 300))
+    # auto: MariaDB FULLTEXT when available, else the in-process index (utils/search.py)
+    SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "auto")
+    # Seconds between rebuilds of the member typeahead index (utils/typeahead.py)
+    TYPEAHEAD_REBUILD_INTERVAL = int(os.environ.get("TYPEAHEAD_REBUILD_INTERVAL", 300))
+    # Request/SQL metrics at /api/metrics (utils/metrics.py). With several
+    # worker processes, METRICS_DIR is where they share their numbers.
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIR = os.environ.get("METRICS_DIR", "")
+    # N+1 detection and @query_budget enforcement (utils/query_guard.py):
+    # off, warn or raise. Warns by default in development.
+    QUERY_GUARD = os.environ.get("QUERY_GUARD", "warn" if os.environ.get("FLASK_ENV") == "development" else "off")
+    QUERY_GUARD_REPEAT = int(os.environ.get("QUERY_GUARD_REPEAT", 5))
+    # GET requests run once in the server's master before forking workers
+    # (utils/workers.py); comma-separated
+    WARMUP_PATHS = [p.strip() for p in os.environ.get("WARMUP_PATHS", ",".join([
+        "/api/projects/?page=1", "/api/tasks/?page=1", "/api/issues/?page=1", "/api/users/",
+        "/api/stats/dashboard", "/api/tracking/deployment/summary", "/api/projects/users/search?q=ad",
+    ])).split(",") if p.strip()]
     UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", os.path.join(os.getcwd(), 'uploads'))
+    # Attachment uploads (utils/uploads.py); bytes, except the session TTL
+    UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 2 * 1024 ** 3))
+    UPLOAD_CHUNK_BYTES = int(os.environ.get("UPLOAD_CHUNK_BYTES", 8 * 1024 ** 2))
+    UPLOAD_MAX_CHUNK_BYTES = int(os.environ.get("UPLOAD_MAX_CHUNK_BYTES", 32 * 1024 ** 2))
+    UPLOAD_SESSION_TTL_HOURS = int(os.environ.get("UPLOAD_SESSION_TTL_HOURS", 24))
+    # Attachment downloads: seconds clients may reuse a download, and (behind
+    # nginx) the internal location mapped to UPLOAD_FOLDER for X-Accel-Redirect
+    ATTACHMENT_CACHE_MAX_AGE = int(os.environ.get("ATTACHMENT_CACHE_MAX_AGE", 86400))
+    ATTACHMENT_ACCEL_REDIRECT = os.environ.get("ATTACHMENT_ACCEL_REDIRECT", "")
+    # Image/PDF preview rendering processes and queue bound (utils/previews.py)
+    PREVIEW_WORKERS = int(os.environ.get("PREVIEW_WORKERS", 2))
+    PREVIEW_MAX_PENDING = int(os.environ.get("PREVIEW_MAX_PENDING", 200))
 
@@ -1,36 +1,149 @@
-from flask import Blueprint, request
+import os
+from flask import Blueprint, current_app, redirect, request, send_file
 from models.attachment import Attachment
 from utils.db import db
-import os
+from utils.errors import NotFoundError, ValidationError
+from utils.serializers import serialize_list
+from utils.versions import conditional_get
+from utils.uploads import upload_store
+from utils.previews import preview_generator, PREVIEW_SIZES
+from utils.query_guard import query_budget
 
 attachment_bp = Blueprint("attachments", __name__)
 
-UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
 @attachment_bp.post("/upload")
 def upload_file():
+    # Single-request upload for small files; large ones should use the
+    # chunked /uploads endpoints below
     if 'file' not in request.files:
         return {"error": "No file part"}, 400
     file = request.files['file']
     if file.filename == '':
         return {"error": "No selected file"}, 400
-    
-    # In a real app, save to S3 or similar. Here we save locally.
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(file_path)
+
+    digest, size = upload_store.save_stream(file.stream)
     
     # We expect task_id in form data
-    task_id = request.form.get('task_id')
+    task_id = request.form.get('task_id', type=int)
     
-    attachment = Attachment(task_id=task_id, file_name=file.filename, file_url=file_path)
-    db.session.add(attachment)
+    attachment = upload_store.add_attachment(file.filename, digest, size, file.mimetype, task_id=task_id)
     db.session.commit()
+    preview_generator.submit(digest, attachment.content_type, attachment.file_name, upload_store.object_path(digest))
     
-    return {"message": "File uploaded", "url": file_path}
+    return {"message": "File uploaded", "id": attachment.id, "url": attachment.file_url, "sha256": digest}
+
+# Chunked, resumable uploads:
+#   POST   /uploads                  {file_name, size, task_id?, project_id?, content_type?}
+#   GET    /uploads/<id>             current offset, to resume after a dropped connection
+#   PUT    /uploads/<id>?offset=N    raw chunk body, appended at N (409 + offset if N is stale)
+#   POST   /uploads/<id>/complete    {sha256?} -> the attachment
+#   DELETE /uploads/<id>             abandon
+@attachment_bp.post("/uploads")
+def begin_upload():
+    data = request.get_json(silent=True) or {}
+    file_name = (data.get('file_name') or '').strip()
+    if not file_name:
+        raise ValidationError("file_name is required")
+    if not isinstance(data.get('size'), int):
+        raise ValidationError("size is required")
+    upload = upload_store.begin(file_name[:255], data['size'], data.get('content_type'),
+                                data.get('task_id'), data.get('project_id'))
+    return dict(upload.to_dict(), chunk_size=upload_store.chunk_size, max_chunk_size=upload_store.max_chunk), 201
+
+@attachment_bp.get("/uploads/<upload_id>")
+def get_upload(upload_id):
+    return upload_store.get(upload_id).to_dict()
+
+@attachment_bp.put("/uploads/<upload_id>")
+def put_chunk(upload_id):
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        raise ValidationError("offset is required")
+    new_offset = upload_store.append(upload_id, offset, request.stream, request.content_length)
+    return {"upload_id": upload_id, "offset": new_offset}
+
+@attachment_bp.post("/uploads/<upload_id>/complete")
+def complete_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    attachment = upload_store.complete(upload_id, data.get('sha256'))
+    preview_generator.submit(attachment.content_hash, attachment.content_type, attachment.file_name,
+                             upload_store.object_path(attachment.content_hash))
+    return {"id": attachment.id, "file_name": attachment.file_name, "file_url": attachment.file_url,
+            "sha256": attachment.content_hash, "size": attachment.size}, 201
+
+@attachment_bp.delete("/uploads/<upload_id>")
+def abort_upload(upload_id):
+    upload_store.abort(upload_id)
+    return {"message": "Upload discarded"}
+
+@attachment_bp.get("/<int:id>/download")
+def download(id):
+    # Conditional and Range requests are handled by send_file: If-None-Match
+    # against the content hash gets a 304 and Range a 206 for just those
+    # bytes. The file goes out through the server's wsgi.file_wrapper
+    # (sendfile under gunicorn), or with ATTACHMENT_ACCEL_REDIRECT set, is
+    # handed to nginx via X-Accel-Redirect.
+    a = db.session.get(Attachment, id)
+    if a is None:
+        raise NotFoundError("Attachment not found")
+    if not a.content_hash:
+        # Link-only attachment
+        if a.file_url and a.file_url.startswith(("http://", "https://")):
+            return redirect(a.file_url)
+        raise NotFoundError("Attachment has no stored file")
+
+    accel_prefix = current_app.config["ATTACHMENT_ACCEL_REDIRECT"]
+    if accel_prefix:
+        rv = current_app.response_class(mimetype=a.content_type or "application/octet-stream")
+        rv.headers["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + upload_store.object_key(a.content_hash)
+        rv.headers.set("Content-Disposition", "attachment", filename=a.file_name or a.content_hash)
+        rv.set_etag(a.content_hash)
+        rv.make_conditional(request)
+    else:
+        path = upload_store.object_path(a.content_hash)
+        if not os.path.exists(path):
+            raise NotFoundError("Stored file is missing")
+        rv = send_file(path, mimetype=a.content_type or None, as_attachment=True,
+                       download_name=a.file_name or a.content_hash, etag=a.content_hash, conditional=True)
+    # An attachment's content never changes, so clients can reuse it
+    # without revalidating for a while
+    rv.cache_control.private = True
+    rv.cache_control.max_age = current_app.config["ATTACHMENT_CACHE_MAX_AGE"]
+    rv.cache_control.no_cache = None
+    rv.cache_control.public = None
+    return rv
+
+@attachment_bp.get("/<int:id>/preview")
+def preview(id):
+    # ?size=thumb (default) or preview; 404 until rendered
+    size = request.args.get('size', 'thumb')
+    if size not in PREVIEW_SIZES:
+        raise ValidationError(f"size must be one of {', '.join(PREVIEW_SIZES)}")
+    a = db.session.get(Attachment, id)
+    if a is None or not a.content_hash:
+        raise NotFoundError("Attachment not found")
+    path = preview_generator.path(a.content_hash, size)
+    if not os.path.exists(path):
+        raise NotFoundError("Preview not available")
+    rv = send_file(path, mimetype="image/jpeg", etag=f"{a.content_hash}-{size}", conditional=True)
+    rv.cache_control.private = True
+    rv.cache_control.max_age = current_app.config["ATTACHMENT_CACHE_MAX_AGE"]
+    rv.cache_control.no_cache = None
+    rv.cache_control.public = None
+    return rv
 
 @attachment_bp.get("/task/<int:task_id>")
+@query_budget(4)
+@conditional_get(lambda task_id: [f"attachments:task:{task_id}"])
 def get_attachments(task_id):
     attachments = Attachment.query.filter_by(task_id=task_id).all()
-    return {"attachments": [{k: v for k, v in a.__dict__.items() if not k.startswith('_')} for a in attachments]}
+    data = serialize_list(Attachment, attachments)
+    previews = [upload_store.previews(a) for a in attachments]
+    if isinstance(data, dict):
+        # ?format=rows
+        data["columns"] += tuple(previews[0]) if previews else ()
+        data["rows"] = [row + tuple(p.values()) for row, p in zip(data["rows"], previews)]
+    else:
+        for item, p in zip(data, previews):
+            item.update(p)
+    return {"attachments": data}
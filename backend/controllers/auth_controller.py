@@ -2,6 +2,8 @@ from flask import Blueprint, request
 from models.user import User
 from utils.db import db
 from utils.jwt_utils import generate_token
+from utils.cache import stats_cache
+from utils.typeahead import user_typeahead
 from werkzeug.security import check_password_hash, generate_password_hash
 
 auth_bp = Blueprint("auth", __name__)
@@ -30,4 +32,7 @@ def register():
     user = User(name=data["name"], email=data["email"], password=hashed_password, role=data.get("role", "user"), is_approved=False)
     db.session.add(user)
     db.session.commit()
+    # New signups show up in the dashboard's pending approvals
+    stats_cache.invalidate()
+    user_typeahead.upsert(user)
     return {"message": "User created successfully"}
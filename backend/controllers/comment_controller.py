@@ -1,18 +1,25 @@
 from flask import Blueprint, request
 from models.comment import Comment
 from utils.db import db
+from utils.serializers import serialize_list
+from utils.versions import conditional_get
+from utils.query_guard import query_budget
 
 comment_bp = Blueprint("comments", __name__)
 
 @comment_bp.get("/project/<int:project_id>")
+@query_budget(4)
+@conditional_get(lambda project_id: [f"comments:project:{project_id}"])
 def get_project_comments(project_id):
     comments = Comment.query.filter_by(project_id=project_id).all()
-    return {"comments": [{k: v for k, v in c.__dict__.items() if not k.startswith('_')} for c in comments]}
+    return {"comments": serialize_list(Comment, comments)}
 
 @comment_bp.get("/task/<int:task_id>")
+@query_budget(4)
+@conditional_get(lambda task_id: [f"comments:task:{task_id}"])
 def get_task_comments(task_id):
     comments = Comment.query.filter_by(task_id=task_id).all()
-    return {"comments": [{k: v for k, v in c.__dict__.items() if not k.startswith('_')} for c in comments]}
+    return {"comments": serialize_list(Comment, comments)}
 
 @comment_bp.post("/")
 def add_comment():
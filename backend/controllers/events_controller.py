@@ -0,0 +1,69 @@
+from flask import Blueprint, Response, request, current_app
+from utils.db import db
+from utils.errors import ValidationError
+from utils.events import event_hub, load_events
+
+events_bp = Blueprint("events", __name__)
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_INTERVAL = 15
+# Rows per database read when a client resumes from behind the buffer
+CATCHUP_BATCH = 500
+
+
+def _catch_up(app, after_id):
+    # Runs inside the response generator, after the request context is gone,
+    # so it opens (and releases) its own session
+    with app.app_context():
+        try:
+            return load_events(after_id, CATCHUP_BATCH)
+        finally:
+            db.session.remove()
+
+
+def _stream(app, project_ids, topics, last_id):
+    yield "retry: 3000\n\n"
+    while True:
+        events = event_hub.wait(last_id, HEARTBEAT_INTERVAL)
+        if events is None:
+            events = _catch_up(app, last_id)
+            if events is None:
+                # Missed events were pruned: tell the client to refetch
+                last_id = event_hub.last_id
+                yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+                continue
+        if not events:
+            yield ": ping\n\n"
+            continue
+        for event_id, event_project_id, topic, message in events:
+            last_id = event_id
+            if (not project_ids or event_project_id in project_ids) and (not topics or topic in topics):
+                yield message
+
+
+@events_bp.get("/")
+def stream_events():
+    # Server-sent events for task/issue/comment/tracking changes, optionally
+    # limited to some projects (project_id) and topics (topic, e.g. "task"),
+    # both repeatable. "reset" is always sent. EventSource resends
+    # the last id it saw in Last-Event-ID when it reconnects; `last_event_id`
+    # does the same for clients that can't set headers.
+    project_ids = set(request.args.getlist('project_id', type=int))
+    topics = set(request.args.getlist('topic'))
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    if last_id is not None:
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            raise ValidationError("Invalid Last-Event-ID")
+
+    event_hub.start()
+    if last_id is None:
+        last_id = event_hub.last_id
+
+    app = current_app._get_current_object()
+    return Response(_stream(app, project_ids, topics, last_id), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Don't let nginx buffer the stream
+        "X-Accel-Buffering": "no",
+    })
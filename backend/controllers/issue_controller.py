@@ -1,10 +1,17 @@
 from flask import Blueprint, request
 from models.issue import Issue
 from utils.db import db
+from utils.project_counters import track_issue_change
+from utils.pagination import paginate_request, order_by_clauses, nulls_first_flag
+from utils.serializers import serialize_list
+from utils.versions import conditional_get
+from utils.query_guard import query_budget
 
 issue_bp = Blueprint("issues", __name__)
 
 @issue_bp.get("/")
+@query_budget(4)
+@conditional_get(lambda: [f"issues:{request.args['project_id']}" if request.args.get('project_id') else "issues"])
 def get_issues():
     project_id = request.args.get('project_id')
     status = request.args.get('status')
@@ -15,14 +22,28 @@ def get_issues():
     if status and status != 'All':
         query = query.filter_by(status=status)
         
-    issues = query.order_by(Issue.created_at.desc()).all()
-    return {"issues": [{k: v for k, v in i.__dict__.items() if not k.startswith('_')} for i in issues]}
+    # Newest first; id breaks ties so the order is stable for cursors
+    keys = [(nulls_first_flag(Issue.created_at), True), (Issue.created_at, True), (Issue.id, True)]
+
+    # Unpaginated unless the client asks for page= or cursor=
+    if 'page' not in request.args and 'cursor' not in request.args:
+        issues = query.order_by(*order_by_clauses(keys)).all()
+        return {"issues": serialize_list(Issue, issues)}
+
+    issues, pagination = paginate_request(query, keys)
+    return {
+        "issues": serialize_list(Issue, issues),
+        "pagination": pagination
+    }
 
 @issue_bp.post("/")
 def create_issue():
     data = request.json
     issue = Issue(**data)
     db.session.add(issue)
+    # Column defaults aren't applied until flush
+    db.session.flush()
+    track_issue_change(None, (issue.project_id, issue.status, issue.severity))
     db.session.commit()
     return {"message": "Issue created", "id": issue.id}
 
@@ -30,8 +51,10 @@ def create_issue():
 def update_issue(id):
     issue = Issue.query.get_or_404(id)
     data = request.json
+    before = (issue.project_id, issue.status, issue.severity)
     for key, value in data.items():
         setattr(issue, key, value)
+    track_issue_change(before, (issue.project_id, issue.status, issue.severity))
     db.session.commit()
     return {"message": "Issue updated"}
 
@@ -39,5 +62,6 @@ def update_issue(id):
 def delete_issue(id):
     issue = Issue.query.get_or_404(id)
     db.session.delete(issue)
+    track_issue_change((issue.project_id, issue.status, issue.severity), None)
     db.session.commit()
     return {"message": "Issue deleted"}
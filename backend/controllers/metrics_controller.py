@@ -0,0 +1,9 @@
+from flask import Blueprint
+from utils.metrics import metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+@metrics_bp.get("")
+def get_metrics():
+    # Prometheus text exposition format
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
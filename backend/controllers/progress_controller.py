@@ -1,6 +1,8 @@
 from flask import Blueprint, request
 from models.progress import ProjectProgress
 from utils.db import db
+from utils.serializers import serialize
+from utils.query_guard import query_budget
 
 progress_bp = Blueprint("progress", __name__)
 
@@ -20,8 +22,9 @@ def update_progress():
     return {"message": "Progress updated"}
 
 @progress_bp.get("/project/<id>")
+@query_budget(3)
 def get_progress(id):
     p = ProjectProgress.query.filter_by(project_id=id).first()
     if p:
-        return {k: v for k, v in p.__dict__.items() if not k.startswith('_')}
+        return serialize(p)
     return {}
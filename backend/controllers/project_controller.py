@@ -2,32 +2,55 @@ from flask import Blueprint, request
 from models.project import Project
 from models.user import User
 from models.attachment import Attachment
+from models.project_stats import ProjectStats
+from sqlalchemy.orm import load_only, selectinload
 from utils.db import db
 from utils.errors import ValidationError, NotFoundError
+from utils.pagination import paginate_request
+from utils.versions import conditional_get
+from utils.typeahead import user_typeahead, MIN_CHARS, DEBOUNCE_MS
+from utils.query_guard import query_budget
 
 project_bp = Blueprint("projects", __name__)
 
+def _serialization_options():
+    # fields= picks columns, include= picks relations (default: all of both,
+    # `include=` with no value for none). Returns the to_dict() arguments and
+    # the matching loader options: select-in loading for included relations,
+    # load_only for the columns.
+    fields = request.args.get('fields')
+    include = request.args.get('include')
+
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(Project.FIELDS)
+    include = [r.strip() for r in include.split(',') if r.strip()] if include is not None else list(Project.RELATIONS)
+
+    unknown = [f for f in fields if f not in Project.FIELDS] + [r for r in include if r not in Project.RELATIONS]
+    if unknown:
+        raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+    options = [load_only(*[getattr(Project, f) for f in set(fields) | {"id"}])]
+    if "members" in include:
+        options.append(selectinload(Project.members).load_only(User.id, User.name, User.email, User.role))
+    if "attachments" in include:
+        options.append(selectinload(Project.attachments))
+    return fields, include, options
+
 @project_bp.get("/")
+@query_budget(6)
+@conditional_get(lambda: ["projects"])
 def get_projects():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     search = request.args.get('search', '')
+    fields, include, options = _serialization_options()
     
-    query = Project.query
+    query = Project.query.options(*options)
     if search:
         query = query.filter(Project.name.ilike(f'%{search}%'))
         
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    projects = pagination.items
+    projects, pagination = paginate_request(query, [(Project.id, False)])
     
     return {
-        "projects": [p.to_dict() for p in projects],
-        "pagination": {
-            "total": pagination.total,
-            "pages": pagination.pages,
-            "current_page": page,
-            "per_page": per_page
-        }
+        "projects": [p.to_dict(fields, include) for p in projects],
+        "pagination": pagination
     }
 
 @project_bp.post("/")
@@ -38,23 +61,35 @@ def create_project():
         
     p = Project(**data)
     db.session.add(p)
+    db.session.flush()
+    db.session.add(ProjectStats(project_id=p.id))
     db.session.commit()
     return {"message": "Project created", "id": p.id}
 
 @project_bp.get("/<int:id>")
+@query_budget(6)
+@conditional_get(lambda id: ["projects"])
 def get_project(id):
-    p = Project.query.get(id)
+    fields, include, options = _serialization_options()
+    p = Project.query.options(*options).filter_by(id=id).first()
     if not p:
         raise NotFoundError(f"Project with id {id} not found")
-    return p.to_dict()
+    return p.to_dict(fields, include)
 
 @project_bp.get("/users/search")
+@query_budget(2)
 def search_users():
+    # Prefix typeahead from the in-memory index (utils/typeahead.py). `q` is
+    # echoed back so the client can drop responses to stale keystrokes.
     query = request.args.get('q', '')
-    if not query:
-        return {"users": []}
-    users = User.query.filter(User.name.ilike(f'%{query}%') | User.email.ilike(f'%{query}%')).limit(10).all()
-    return {"users": [{"id": u.id, "name": u.name, "email": u.email} for u in users]}
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    hints = {"min_chars": MIN_CHARS, "debounce_ms": DEBOUNCE_MS}
+    if len(query.strip()) < MIN_CHARS:
+        return {"q": query, "users": [], "hints": hints}
+    user_typeahead.ensure_fresh()
+    return {"q": query, "users": user_typeahead.search(query, limit), "hints": hints}, 200, {
+        "Cache-Control": "private, max-age=30"
+    }
 
 @project_bp.put("/<int:id>")
 def update_project(id):
@@ -76,6 +111,7 @@ def delete_project(id):
     if not p:
         raise NotFoundError(f"Project with id {id} not found")
         
+    ProjectStats.query.filter_by(project_id=id).delete()
     db.session.delete(p)
     db.session.commit()
     return {"message": "Project deleted"}
@@ -131,9 +167,17 @@ def upload_document(id):
 project_bp = Blueprint("projects", __name__)
 
 @project_bp.get("/")
+@query_budget(6)
+@conditional_get(lambda: ["projects"])
 def get_projects():
-    projects = Project.query.all()
-    return {"projects": [p.to_dict() for p in projects]}
+    fields, include, options = _serialization_options()
+    query = Project.query.options(*options)
+    # Unpaginated unless the client asks for page= or cursor=
+    if 'page' not in request.args and 'cursor' not in request.args:
+        return {"projects": [p.to_dict(fields, include) for p in query.all()]}
+
+    projects, pagination = paginate_request(query, [(Project.id, False)])
+    return {"projects": [p.to_dict(fields, include) for p in projects], "pagination": pagination}
 
 @project_bp.post("/")
 def create_project():
@@ -141,23 +185,35 @@ def create_project():
         data = request.json
         p = Project(**data)
         db.session.add(p)
+        db.session.flush()
+        db.session.add(ProjectStats(project_id=p.id))
         db.session.commit()
         return {"message": "Project created", "id": p.id}
     except Exception as e:
         return {"error": str(e)}, 500
 
 @project_bp.get("/<int:id>")
+@query_budget(6)
+@conditional_get(lambda id: ["projects"])
 def get_project(id):
-    p = Project.query.get_or_404(id)
-    return p.to_dict()
+    fields, include, options = _serialization_options()
+    p = Project.query.options(*options).filter_by(id=id).first_or_404()
+    return p.to_dict(fields, include)
 
 @project_bp.get("/users/search")
+@query_budget(2)
 def search_users():
+    # Prefix typeahead from the in-memory index (utils/typeahead.py). `q` is
+    # echoed back so the client can drop responses to stale keystrokes.
     query = request.args.get('q', '')
-    if not query:
-        return {"users": []}
-    users = User.query.filter(User.name.ilike(f'%{query}%') | User.email.ilike(f'%{query}%')).limit(10).all()
-    return {"users": [{"id": u.id, "name": u.name, "email": u.email} for u in users]}
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    hints = {"min_chars": MIN_CHARS, "debounce_ms": DEBOUNCE_MS}
+    if len(query.strip()) < MIN_CHARS:
+        return {"q": query, "users": [], "hints": hints}
+    user_typeahead.ensure_fresh()
+    return {"q": query, "users": user_typeahead.search(query, limit), "hints": hints}, 200, {
+        "Cache-Control": "private, max-age=30"
+    }
 
 @project_bp.put("/<int:id>")
 def update_project(id):
@@ -179,6 +235,7 @@ def update_project(id):
 @project_bp.delete("/<int:id>")
 def delete_project(id):
     p = Project.query.get_or_404(id)
+    ProjectStats.query.filter_by(project_id=id).delete()
     db.session.delete(p)
     db.session.commit()
     return {"message": "Project deleted"}
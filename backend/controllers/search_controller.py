@@ -0,0 +1,24 @@
+from flask import Blueprint, request, current_app
+from utils.errors import ValidationError
+from utils.search import search, SEARCH_TYPES
+from utils.query_guard import query_budget
+
+search_bp = Blueprint("search", __name__)
+
+@search_bp.get("/")
+@query_budget(6)
+def run_search():
+    # ?q= (required), ?types=task,issue (default: all), ?project_id=, ?limit=
+    q = request.args.get('q', '').strip()
+    if not q:
+        raise ValidationError("q is required")
+
+    types = [t for t in request.args.get('types', '').split(',') if t] or list(SEARCH_TYPES)
+    unknown = [t for t in types if t not in SEARCH_TYPES]
+    if unknown:
+        raise ValidationError(f"Unknown types: {', '.join(unknown)}", {"allowed": list(SEARCH_TYPES)})
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    project_id = request.args.get('project_id', type=int)
+
+    results, facets = search(q, types, project_id, limit, current_app.config["SEARCH_BACKEND"])
+    return {"query": q, "results": results, "facets": facets}
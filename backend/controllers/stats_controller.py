@@ -3,117 +3,162 @@ from models.project import Project
 from models.task import Task
 from models.issue import Issue
 from models.user import User
-from utils.db import db
+from models.project_stats import ProjectStats
+from utils.db import db, pool_metrics
+from utils.cache import stats_cache
+from utils.project_counters import SEVERITY_COLUMNS
+from utils.query_guard import query_budget
 from sqlalchemy import func
 
 stats_bp = Blueprint("stats", __name__)
 
-@stats_bp.get("/counts")
-def get_counts():
-    projects = Project.query.count()
-    tasks = Task.query.count()
-    issues = Issue.query.count()
-    users = User.query.count()
-    return jsonify({"projects": projects, "tasks": tasks, "issues": issues, "users": users})
+# Each aggregate lives in its own helper so the individual endpoints and the
+# combined /dashboard snapshot share the same queries.
 
-@stats_bp.get("/issues-by-severity")
-def get_issues_by_severity():
-    # Returns list of {severity, count}
+def _counts():
+    # One round trip for all totals (pending approvals rides along)
+    row = db.session.query(
+        db.session.query(func.count(Project.id)).scalar_subquery(),
+        db.session.query(func.count(Task.id)).scalar_subquery(),
+        db.session.query(func.count(Issue.id)).scalar_subquery(),
+        db.session.query(func.count(User.id)).scalar_subquery(),
+        db.session.query(func.count(User.id)).filter(User.is_approved == False).scalar_subquery(),
+    ).one()
+    return {"projects": row[0], "tasks": row[1], "issues": row[2], "users": row[3], "pending_approvals": row[4]}
+
+def _issues_by_severity():
     results = db.session.query(Issue.severity, func.count(Issue.id)).group_by(Issue.severity).all()
-    return jsonify({"data": [{"name": r[0], "value": r[1]} for r in results]})
+    return [{"name": r[0], "value": r[1]} for r in results]
 
-@stats_bp.get("/task-velocity")
-def get_task_velocity():
+def _task_velocity():
     # Returns tasks completed per day (mock logic for now as we don't track completion date history strictly)
     # In a real app, we'd query a history table. Here we'll group by updated_at for Done tasks.
     results = db.session.query(func.date(Task.updated_at), func.count(Task.id))\
         .filter(Task.status == 'Done')\
         .group_by(func.date(Task.updated_at))\
         .all()
-    return jsonify({"data": [{"date": str(r[0]), "count": r[1]} for r in results]})
+    return [{"date": str(r[0]), "count": r[1]} for r in results]
 
-@stats_bp.get("/team-workload")
-def get_team_workload():
-    # Returns tasks assigned per user
+def _team_workload():
     results = db.session.query(User.name, func.count(Task.id))\
         .join(Task, Task.assigned_to == User.name)\
         .filter(Task.status != 'Done')\
         .group_by(User.name)\
         .all()
-    return jsonify({"data": [{"name": r[0], "tasks": r[1]} for r in results]})
+    return [{"name": r[0], "tasks": r[1]} for r in results]
 
-@stats_bp.get("/pending-approvals")
-def get_pending_approvals():
-    count = User.query.filter_by(is_approved=False).count()
-    return jsonify({"count": count})
+def _project_health():
+    # Simple health calc based on task completion:
+    # At Risk: < 30% of tasks done, otherwise Healthy
+    # Counts come from project_stats, which the task/issue writes maintain.
+    rows = db.session.query(Project.id, Project.name, ProjectStats)\
+        .outerjoin(ProjectStats, ProjectStats.project_id == Project.id).all()
 
-@stats_bp.get("/project-health")
-def get_project_health():
-    # Simple health calc: 
-    # Healthy: No critical issues
-    # At Risk: Has critical issues OR > 5 active issues
-    
-    projects = Project.query.all()
     health_data = []
-    
-    for p in projects:
-        # Count critical issues related to this project (assuming issue has project_id or similar, 
-        # but Issue model might be loose. Let's assume we link via Issue logic or just mock for now if no direct link exists)
-        # Looking at Issue model earlier, it didn't seem to have project_id explicit in the snippet? 
-        # Let me check valid relationships. 
-        # The Issue model in previous context had title, severity, status, created_by.
-        # It lacks a direct foreign key to Project in the snippet I saw?
-        # Wait, let's double check Issue model to be safe. 
-        # If no link, I'll use a placeholder logic or try to match by name if relevant.
-        # Actually, let's just count open tasks vs total tasks for "completeness".
-        
-        total_tasks = Task.query.filter_by(project_id=p.id).count()
-        completed_tasks = Task.query.filter_by(project_id=p.id, status='Done').count()
-        
-        # If we can't easily link issues, we'll base health on progress.
+    for project_id, name, stats in rows:
+        total_tasks = stats.total_tasks if stats else 0
+        completed_tasks = stats.done_tasks if stats else 0
         progress = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
+
         status = "Healthy"
         if progress < 30 and total_tasks > 0:
             status = "At Risk"
-            
+
         health_data.append({
-            "id": p.id,
-            "name": p.name,
+            "id": project_id,
+            "name": name,
             "status": status,
             "progress": int(progress),
-            "total_tasks": total_tasks
+            "total_tasks": total_tasks,
+            "overdue_tasks": stats.overdue_tasks if stats else 0,
+            "open_issues": {
+                severity: getattr(stats, column) if stats else 0
+                for severity, column in SEVERITY_COLUMNS.items()
+            }
         })
-        
-    return jsonify({"data": health_data})
+    return health_data
+
+def _recent_activity():
+    # Last 5 tasks and last 5 issues, only the columns we show
+    recent_tasks = db.session.query(Task.id, Task.name, Task.assigned_to, Task.created_at)\
+        .order_by(Task.created_at.desc()).limit(5).all()
+    recent_issues = db.session.query(Issue.id, Issue.title, Issue.assigned_to, Issue.created_at)\
+        .order_by(Issue.created_at.desc()).limit(5).all()
+
+    activity = [
+        {"type": "task", "title": name, "user": user, "time": created_at, "id": id}
+        for id, name, user, created_at in recent_tasks
+    ] + [
+        # Issue doesn't have created_by, using assigned_to
+        {"type": "issue", "title": title, "user": user, "time": created_at, "id": id}
+        for id, title, user, created_at in recent_issues
+    ]
 
-@stats_bp.get("/recent-activity")
-def get_recent_activity():
-    # Get last 5 tasks
-    recent_tasks = Task.query.order_by(Task.created_at.desc()).limit(5).all()
-    # Get last 5 issues
-    recent_issues = Issue.query.order_by(Issue.created_at.desc()).limit(5).all()
-    
-    activity = []
-    for t in recent_tasks:
-        activity.append({
-            "type": "task",
-            "title": t.name,
-            "user": t.assigned_to,
-            "time": t.created_at,
-            "id": t.id
-        })
-        
-    for i in recent_issues:
-        activity.append({
-            "type": "issue",
-            "title": i.title,
-            "user": i.assigned_to, # Issue doesn't have created_by, using assigned_to
-            "time": i.created_at,
-            "id": i.id
-        })
-        
     # Sort mixed list by time desc
     activity.sort(key=lambda x: x['time'], reverse=True)
-    
-    return jsonify({"data": activity[:10]})
+    return activity[:10]
+
+def _dashboard_snapshot():
+    counts = _counts()
+    pending = counts.pop("pending_approvals")
+    return {
+        "counts": counts,
+        "issues_by_severity": _issues_by_severity(),
+        "task_velocity": _task_velocity(),
+        "team_workload": _team_workload(),
+        "pending_approvals": pending,
+        "project_health": _project_health(),
+        "recent_activity": _recent_activity()
+    }
+
+@stats_bp.get("/dashboard")
+@query_budget(10)
+def get_dashboard():
+    # Everything Dashboard.jsx needs in one request, served from the stats
+    # cache. Task, issue, project and user writes invalidate it (see app.py).
+    return jsonify(stats_cache.get_or_set("dashboard", _dashboard_snapshot))
+
+@stats_bp.get("/counts")
+@query_budget(3)
+def get_counts():
+    counts = _counts()
+    counts.pop("pending_approvals")
+    return jsonify(counts)
+
+@stats_bp.get("/issues-by-severity")
+@query_budget(3)
+def get_issues_by_severity():
+    # Returns list of {severity, count}
+    return jsonify({"data": _issues_by_severity()})
+
+@stats_bp.get("/task-velocity")
+@query_budget(3)
+def get_task_velocity():
+    return jsonify({"data": _task_velocity()})
+
+@stats_bp.get("/team-workload")
+@query_budget(3)
+def get_team_workload():
+    # Returns tasks assigned per user
+    return jsonify({"data": _team_workload()})
+
+@stats_bp.get("/pending-approvals")
+@query_budget(3)
+def get_pending_approvals():
+    count = User.query.filter_by(is_approved=False).count()
+    return jsonify({"count": count})
+
+@stats_bp.get("/project-health")
+@query_budget(3)
+def get_project_health():
+    return jsonify({"data": _project_health()})
+
+@stats_bp.get("/recent-activity")
+@query_budget(4)
+def get_recent_activity():
+    return jsonify({"data": _recent_activity()})
+
+@stats_bp.get("/db")
+def get_db_pools():
+    # Pool gauges/counters per bind and how GET requests were routed
+    return jsonify(pool_metrics.snapshot())
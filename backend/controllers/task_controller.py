@@ -5,34 +5,26 @@ from models.attachment import Attachment
 from models.audit_log import AuditLog
 from utils.db import db
 from utils.errors import ValidationError, NotFoundError
-from datetime import date, timedelta
+from utils.project_counters import track_task_change, track_bulk_tasks, task_counts_by_project
+from utils.deadlines import apply_deadline_rules, deadline_scheduler
+from utils.workload import assignee_workload
+from utils.pagination import paginate_request, nulls_first_flag
+from utils.task_trees import subtask_trees, MAX_TREE_DEPTH
+from utils.serializers import serialize, serialize_list
+from utils.versions import conditional_get, bump, collection_version
+from utils.events import record_bulk
+from utils.uploads import upload_store
+from utils.query_guard import query_budget
+from datetime import date
 from sqlalchemy import case
 
 task_bp = Blueprint("tasks", __name__)
 
-def update_overdue_tasks(project_id=None):
-    today = date.today()
-    query = Task.query.filter(
-        Task.deadline != None,
-        Task.deadline < today,
-        Task.status != 'Done',
-        Task.status != 'Overdue'
-    )
-    if project_id:
-        query = query.filter(Task.project_id == project_id)
-    
-    overdue_tasks = query.all()
-    if overdue_tasks:
-        for t in overdue_tasks:
-            t.status = 'Overdue'
-        db.session.commit()
-
 @task_bp.get("/project/<id>")
+@query_budget(6)
+@conditional_get(lambda id: [f"tasks:{id}"])
 def get_tasks(id):
-    update_overdue_tasks(id)
-    
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    # Pure read: overdue/escalation transitions are applied by utils.deadlines
     search = request.args.get('search', '')
     status = request.args.get('status', '')
 
@@ -43,50 +35,34 @@ def get_tasks(id):
     if status and status != 'All':
         query = query.filter(Task.status == status)
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    tasks = pagination.items
+    depth = request.args.get('depth', MAX_TREE_DEPTH, type=int)
+    if depth < 0:
+        raise ValidationError("depth must be 0 or more")
+    depth = min(depth, MAX_TREE_DEPTH)
+
+    tasks, pagination = paginate_request(query, [(Task.id, False)])
+
+    # Subtask trees for the whole page come from one recursive query (or the
+    # per-root cache) instead of lazy-loading t.subtasks level by level
+    subtrees = subtask_trees.get_many([t.id for t in tasks], collection_version(f"tasks:{id}"), depth)
 
     def serialize_task(t):
-        data = {k: v for k, v in t.__dict__.items() if not k.startswith('_')}
-        data['subtasks'] = [serialize_task(st) for st in t.subtasks]
+        data = serialize(t)
+        data['subtasks'] = subtrees[t.id]
         return data
 
     return {
         "tasks": [serialize_task(t) for t in tasks],
-        "pagination": {
-            "total": pagination.total,
-            "pages": pagination.pages,
-            "current_page": page,
-            "per_page": per_page
-        }
+        "pagination": pagination
     }
 
 @task_bp.get("/")
+@query_budget(5)
+@conditional_get(lambda: ["tasks"])
 def get_all_tasks():
-    # 1. Update Overdue
-    update_overdue_tasks()
-    
-    today = date.today()
-    three_days_from_now = today + timedelta(days=3)
-
-    # 2. Escalate Priority
-    urgent_tasks = Task.query.filter(
-        Task.deadline != None,
-        Task.deadline >= today,
-        Task.deadline <= three_days_from_now,
-        Task.status != 'Done',
-        Task.priority != 'High'
-    ).all()
-    
-    for t in urgent_tasks:
-        t.priority = 'High'
-    
-    if urgent_tasks:
-        db.session.commit()
+    # Pure read: overdue/escalation transitions are applied by utils.deadlines
 
-    # 3. Handling Request Params
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    # Handling Request Params
     search = request.args.get('search', '')
     status = request.args.get('status', '')
     sort_by = request.args.get('sort_by', 'deadline')
@@ -100,7 +76,7 @@ def get_all_tasks():
     if status and status != 'All':
         query = query.filter(Task.status == status)
 
-    # Sorting
+    # Sorting: (expression, descending) keys, shared by offset and cursor pagination
     if sort_by == 'priority':
         priority_order = case(
             (Task.priority == 'High', 1),
@@ -108,32 +84,24 @@ def get_all_tasks():
             (Task.priority == 'Low', 3),
             else_=4
         )
-        if order == 'asc':
-            query = query.order_by(priority_order.asc())
-        else:
-            query = query.order_by(priority_order.desc())
-            
+        keys = [(priority_order, order != 'asc')]
     elif sort_by == 'deadline':
-        if order == 'desc':
-            query = query.order_by(Task.deadline.desc())
-        else:
-            query = query.order_by(Task.deadline.asc())
-            
+        # NULL deadlines first ascending, last descending
+        keys = [(nulls_first_flag(Task.deadline), order == 'desc'), (Task.deadline, order == 'desc')]
+    elif sort_by == 'created_at':
+        keys = [(nulls_first_flag(Task.created_at), order == 'desc'), (Task.created_at, order == 'desc')]
+    else:
+        keys = []
+
     # Default fallback sort: ID desc
-    query = query.order_by(Task.id.desc())
+    keys.append((Task.id, True))
 
     # Pagination
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    tasks = pagination.items
+    tasks, pagination = paginate_request(query, keys)
 
     return {
-        "tasks": [{k: v for k, v in t.__dict__.items() if not k.startswith('_')} for t in tasks],
-        "pagination": {
-            "total": pagination.total,
-            "pages": pagination.pages,
-            "current_page": page,
-            "per_page": per_page
-        }
+        "tasks": serialize_list(Task, tasks),
+        "pagination": pagination
     }
 
 @task_bp.post("/")
@@ -143,8 +111,14 @@ def create_task():
         raise ValidationError("Task name is required")
     
     t = Task(**data)
+    apply_deadline_rules(t)
     db.session.add(t)
+    track_task_change(None, (t.project_id, t.status))
+    after_assignee = (t.assigned_to, t.status)
     db.session.commit()
+    assignee_workload.track(None, after_assignee)
+    if t.deadline:
+        deadline_scheduler.reschedule()
     return {"message": "Task added", "id": t.id}
 
 @task_bp.put("/<int:id>")
@@ -154,32 +128,49 @@ def update_task(id):
     
     # Immutable fields
     ignored_keys = ['id', 'created_at', 'updated_at']
+    before = (t.project_id, t.status)
+    before_assignee = (t.assigned_to, t.status)
     
     for key, value in data.items():
         if key not in ignored_keys and hasattr(t, key):
             setattr(t, key, value)
+    apply_deadline_rules(t)
+    track_task_change(before, (t.project_id, t.status))
+    after_assignee = (t.assigned_to, t.status)
     db.session.commit()
+    assignee_workload.track(before_assignee, after_assignee)
+    if any(k in data for k in ('deadline', 'status', 'priority')):
+        deadline_scheduler.reschedule()
     return {"message": "Task updated"}
 
 @task_bp.delete("/<int:id>")
 def delete_task(id):
     t = Task.query.get_or_404(id)
     db.session.delete(t)
+    track_task_change((t.project_id, t.status), None)
+    before_assignee = (t.assigned_to, t.status)
     db.session.commit()
+    assignee_workload.track(before_assignee, None)
     return {"message": "Task deleted"}
 
 @task_bp.post("/cleanup")
 def cleanup_tasks():
     today = date.today()
-    deleted_count = Task.query.filter(
-        (Task.status == 'Done') | ((Task.deadline != None) & (Task.deadline < today))
-    ).delete(synchronize_session=False)
+    criteria = (Task.status == 'Done') | ((Task.deadline != None) & (Task.deadline < today))
+    removed = task_counts_by_project(criteria)
+    deleted_count = Task.query.filter(criteria).delete(synchronize_session=False)
+    track_bulk_tasks(removed, -1)
+    bump("tasks", *[f"tasks:{pid}" for pid in removed])
+    record_bulk("task", removed)
     
     db.session.commit()
+    assignee_workload.invalidate()
     return {"message": f"Cleanup complete. {deleted_count} tasks deleted."}
 
 # Comments
 @task_bp.get("/<int:id>/comments")
+@query_budget(4)
+@conditional_get(lambda id: [f"comments:task:{id}"])
 def get_comments(id):
     comments = Comment.query.filter_by(task_id=id).order_by(Comment.created_at.desc()).all()
     return {"comments": [{"id": c.id, "user_name": c.user_name, "content": c.content, "created_at": c.created_at} for c in comments]}
@@ -197,9 +188,12 @@ def add_comment(id):
 
 # Attachments
 @task_bp.get("/<int:id>/attachments")
+@query_budget(4)
+@conditional_get(lambda id: [f"attachments:task:{id}"])
 def get_attachments(id):
     attachments = Attachment.query.filter_by(task_id=id).all()
-    return {"attachments": [{"id": a.id, "file_name": a.file_name, "file_url": a.file_url, "uploaded_at": a.uploaded_at} for a in attachments]}
+    return {"attachments": [{"id": a.id, "file_name": a.file_name, "file_url": a.file_url, "uploaded_at": a.uploaded_at,
+                             **upload_store.previews(a)} for a in attachments]}
 
 @task_bp.post("/<int:id>/attachments")
 def add_attachment(id):
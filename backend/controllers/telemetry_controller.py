@@ -0,0 +1,90 @@
+from flask import Blueprint, request
+from datetime import datetime, timedelta
+from models.tracking import DeploymentDevice
+from models.project import Project
+from utils.db import db
+from utils.errors import ValidationError, NotFoundError
+from utils.heartbeats import parse_ping
+from utils.telemetry import (telemetry_buffer, readings_from, rollup_series, raw_series, pick_resolution,
+                             to_epoch, METRICS, RESOLUTIONS, DEFAULT_MAX_POINTS)
+from utils.query_guard import query_budget
+
+telemetry_bp = Blueprint("telemetry", __name__)
+
+
+def _parse_time(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise ValidationError(f"Invalid {name}")
+
+
+def _range_args():
+    metric = request.args.get('metric')
+    if metric not in METRICS:
+        raise ValidationError(f"metric must be one of {', '.join(METRICS)}")
+    end = _parse_time('end', datetime.utcnow())
+    start = _parse_time('start', end - timedelta(days=1))
+    if start > end:
+        raise ValidationError("start must be before end")
+    max_points = request.args.get('max_points', DEFAULT_MAX_POINTS, type=int)
+    resolution = request.args.get('resolution', 'auto')
+    start, end = to_epoch(start), to_epoch(end)
+    if resolution == 'auto':
+        resolution = pick_resolution(start, end, max(max_points, 1))
+    elif resolution != 'raw' and resolution not in RESOLUTIONS:
+        raise ValidationError("resolution must be auto, raw, 1m, 1h or 1d")
+    return metric, resolution, start, end
+
+
+@telemetry_bp.post("/")
+def add_readings():
+    # One reading ({"serial_number", "timestamp"?, "battery"?, "rssi"?,
+    # "temperature"?}), a list, or {"readings": [...]}. Written in the
+    # background by utils/telemetry.py.
+    data = request.get_json(silent=True)
+    readings = data.get('readings', [data]) if isinstance(data, dict) else data
+    if not isinstance(readings, list) or not readings:
+        raise ValidationError("Expected a reading or a list of readings")
+
+    now = datetime.utcnow()
+    samples = []
+    for reading in readings:
+        samples.extend(readings_from(reading, lambda r: parse_ping(r, now)))
+    if not samples:
+        raise ValidationError(f"Readings need at least one of {', '.join(METRICS)}")
+
+    telemetry_buffer.start()
+    if not telemetry_buffer.add(samples):
+        retry_after = {"Retry-After": str(max(1, int(telemetry_buffer.flush_interval)))}
+        return {"error": "Telemetry buffer is full, retry later", "accepted": 0}, 503, retry_after
+    return {"accepted": len(samples)}, 202
+
+
+@telemetry_bp.get("/devices/<int:device_id>")
+@query_budget(3)
+def get_device_series(device_id):
+    if not db.session.get(DeploymentDevice, device_id):
+        raise NotFoundError("Device not found")
+    metric, resolution, start, end = _range_args()
+    if resolution == 'raw':
+        points = raw_series(device_id, metric, start, end)
+    else:
+        points = rollup_series(metric, resolution, start, end, device_id=device_id)
+    return {"device_id": device_id, "metric": metric, "resolution": resolution, "points": points}
+
+
+@telemetry_bp.get("/projects/<int:project_id>")
+@query_budget(3)
+def get_project_series(project_id):
+    # Aggregated over every device in the project
+    if not db.session.get(Project, project_id):
+        raise NotFoundError("Project not found")
+    metric, resolution, start, end = _range_args()
+    if resolution == 'raw':
+        raise ValidationError("Raw samples are only available per device")
+    points = rollup_series(metric, resolution, start, end, project_id=project_id)
+    return {"project_id": project_id, "metric": metric, "resolution": resolution, "points": points}
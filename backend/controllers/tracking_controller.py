@@ -1,14 +1,29 @@
 from flask import Blueprint, request
 from models.tracking import HardwareComponent, FirmwareVersion, TestSession, DeploymentDevice
 from utils.db import db
+from utils.serializers import serialize_list
+from utils.versions import conditional_get
+from utils.errors import ValidationError, NotFoundError
+from utils.heartbeats import heartbeat_buffer, parse_ping
+from utils.telemetry import telemetry_buffer, readings_from
+from utils.fleet import fleet_index, FLEET_STATES
+from utils.device_import import import_devices
+from utils.query_guard import query_budget
+from models.project import Project
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 tracking_bp = Blueprint("tracking", __name__)
 
 # Hardware
 @tracking_bp.get("/hardware/<project_id>")
+@query_budget(4)
+@conditional_get(lambda project_id: [f"hardware:{project_id}"])
 def get_hardware(project_id):
     items = HardwareComponent.query.filter_by(project_id=project_id).all()
-    return {"items": [{k: v for k, v in i.__dict__.items() if not k.startswith('_')} for i in items]}
+    return {"items": serialize_list(HardwareComponent, items)}
 
 @tracking_bp.post("/hardware/<project_id>")
 def add_hardware(project_id):
@@ -27,9 +42,11 @@ def delete_hardware(id):
 
 # Firmware
 @tracking_bp.get("/firmware/<project_id>")
+@query_budget(4)
+@conditional_get(lambda project_id: [f"firmware:{project_id}"])
 def get_firmware(project_id):
     items = FirmwareVersion.query.filter_by(project_id=project_id).order_by(FirmwareVersion.created_at.desc()).all()
-    return {"items": [{k: v for k, v in i.__dict__.items() if not k.startswith('_')} for i in items]}
+    return {"items": serialize_list(FirmwareVersion, items)}
 
 @tracking_bp.post("/firmware/<project_id>")
 def add_firmware(project_id):
@@ -48,9 +65,11 @@ def delete_firmware(id):
 
 # Testing
 @tracking_bp.get("/testing/<project_id>")
+@query_budget(4)
+@conditional_get(lambda project_id: [f"testing:{project_id}"])
 def get_testing(project_id):
     items = TestSession.query.filter_by(project_id=project_id).order_by(TestSession.date.desc()).all()
-    return {"items": [{k: v for k, v in i.__dict__.items() if not k.startswith('_')} for i in items]}
+    return {"items": serialize_list(TestSession, items)}
 
 @tracking_bp.post("/testing/<project_id>")
 def add_testing(project_id):
@@ -69,9 +88,106 @@ def delete_testing(id):
 
 # Deployment
 @tracking_bp.get("/deployment/<project_id>")
+@query_budget(4)
+@conditional_get(lambda project_id: [f"deployment:{project_id}"])
 def get_deployment(project_id):
     items = DeploymentDevice.query.filter_by(project_id=project_id).all()
-    return {"items": [{k: v for k, v in i.__dict__.items() if not k.startswith('_')} for i in items]}
+    return {"items": serialize_list(DeploymentDevice, items)}
+
+@tracking_bp.post("/deployment/heartbeat")
+def deployment_heartbeat():
+    # Accepts one ping ({"serial_number": ..., "timestamp": ...}) or a list,
+    # or {"pings": [...]}. last_ping is written in the background by
+    # utils/heartbeats.py, so this only validates and buffers.
+    data = request.get_json(silent=True)
+    pings = data.get('pings', [data]) if isinstance(data, dict) else data
+    if not isinstance(pings, list) or not pings:
+        raise ValidationError("Expected a ping or a list of pings")
+
+    now = datetime.utcnow()
+    parsed = [parse_ping(ping, now) for ping in pings]
+    # Pings may carry battery/rssi/temperature readings as well
+    samples = [s for ping in pings for s in readings_from(ping, lambda p: parse_ping(p, now))]
+    heartbeat_buffer.start()
+    rejected = heartbeat_buffer.add(parsed)
+    refused = set(rejected)
+    for serial, seen_at in parsed:
+        if serial not in refused:
+            fleet_index.touch(serial, seen_at)
+    if samples:
+        telemetry_buffer.start()
+        if not telemetry_buffer.add(samples):
+            logger.warning("Telemetry buffer full, dropped %s samples from heartbeats", len(samples))
+
+    body = {"accepted": len(parsed) - len(rejected), "rejected": len(rejected)}
+    if rejected:
+        # Backpressure: the buffer is full of other devices until the next
+        # flush. Clients should retry the refused serials after Retry-After.
+        body["rejected_serials"] = rejected
+        retry_after = {"Retry-After": str(max(1, int(heartbeat_buffer.flush_interval)))}
+        return body, 503 if len(rejected) == len(parsed) else 202, retry_after
+    return body, 202
+
+@tracking_bp.get("/deployment/summary")
+@query_budget(2)
+def deployment_summary():
+    # Online/offline counts per project from the fleet index. `window`
+    # (seconds, default 300) sizes "recently_offline": devices whose last
+    # ping fell past the offline threshold within that window.
+    window = request.args.get('window', 300, type=int)
+    project_id = request.args.get('project_id', type=int)
+    fleet_index.ensure_fresh()
+    return {
+        "offline_after": fleet_index.offline_after,
+        "window": window,
+        "projects": fleet_index.summary(window, project_id)
+    }
+
+@tracking_bp.get("/deployment/<int:project_id>/fleet")
+@query_budget(3)
+def deployment_fleet(project_id):
+    # Drill-down behind the summary counts: one page of devices in `state`,
+    # most recently seen first
+    state = request.args.get('state', 'offline')
+    if state not in FLEET_STATES:
+        raise ValidationError(f"state must be one of {', '.join(FLEET_STATES)}")
+    window = request.args.get('window', 300, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 500)
+
+    fleet_index.ensure_fresh()
+    ids, total = fleet_index.device_ids(project_id, state, window, (page - 1) * per_page, per_page)
+    rows = {d.id: d for d in DeploymentDevice.query.filter(DeploymentDevice.id.in_(ids)).all()} if ids else {}
+    items = [rows[i] for i in ids if i in rows]
+    return {
+        "items": serialize_list(DeploymentDevice, items),
+        "pagination": {
+            "total": total,
+            "pages": (total + per_page - 1) // per_page,
+            "current_page": page,
+            "per_page": per_page
+        }
+    }
+
+@tracking_bp.post("/deployment/<int:project_id>/import")
+def import_deployment(project_id):
+    # Bulk create/update devices by serial_number from a CSV or NDJSON upload,
+    # sent either as the raw request body or as a multipart "file" field.
+    # Format comes from ?format=, else the file name or content type.
+    if not db.session.get(Project, project_id):
+        raise NotFoundError("Project not found")
+    upload = request.files.get('file')
+    name = upload.filename if upload else ''
+    content_type = (upload.mimetype if upload else request.mimetype) or ''
+    fmt = request.args.get('format') or (
+        'csv' if name.endswith('.csv') or content_type == 'text/csv' else 'ndjson'
+    )
+    if fmt not in ('csv', 'ndjson'):
+        raise ValidationError("format must be csv or ndjson")
+
+    report = import_devices(project_id, upload.stream if upload else request.stream, fmt)
+    fleet_index.invalidate()
+    return report.to_dict()
 
 @tracking_bp.post("/deployment/<project_id>")
 def add_deployment(project_id):
@@ -79,6 +195,7 @@ def add_deployment(project_id):
     item = DeploymentDevice(project_id=project_id, **data)
     db.session.add(item)
     db.session.commit()
+    fleet_index.upsert_device(item)
     return {"message": "Device added", "id": item.id}
 
 @tracking_bp.delete("/deployment/<int:id>")
@@ -86,4 +203,5 @@ def delete_deployment(id):
     item = DeploymentDevice.query.get_or_404(id)
     db.session.delete(item)
     db.session.commit()
+    fleet_index.remove_device(id)
     return {"message": "Device deleted"}
@@ -1,35 +1,71 @@
 from flask import Blueprint, request
 from werkzeug.security import generate_password_hash
 from models.user import User
-from models.task import Task
+from sqlalchemy.orm import load_only
 from utils.db import db
 from utils.errors import ValidationError, NotFoundError
+from utils.workload import assignee_workload
+from utils.typeahead import user_typeahead
+from utils.query_guard import query_budget
 
 user_bp = Blueprint("users", __name__)
 
+# fields= projection for get_users: response field -> (User columns it needs, getter)
+USER_FIELDS = {
+    "id": (("id",), lambda u, workloads: u.id),
+    "name": (("name",), lambda u, workloads: u.name),
+    "email": (("email",), lambda u, workloads: u.email),
+    "role": (("role",), lambda u, workloads: u.role or "Member"),
+    "phone": (("phone",), lambda u, workloads: u.phone or ""),
+    "is_approved": (("is_approved",), lambda u, workloads: u.is_approved),
+    "status": ((), lambda u, workloads: "Online"), # Mock status
+    # Simple workload calc: 1 task = 20% workload, capped at 100%
+    "workload": (("name",), lambda u, workloads: min(100, workloads.get(u.name, 0) * 20)),
+}
+
 @user_bp.get("/")
+@query_budget(4)
 def get_users():
-    users = User.query.all()
-    user_list = []
-    
-    for u in users:
-        # Calculate workload based on active tasks
-        active_tasks = Task.query.filter_by(assigned_to=u.name).filter(Task.status != 'Done').count()
-        # Simple workload calc: 1 task = 20% workload, capped at 100%
-        workload = min(100, active_tasks * 20)
-        
-        user_list.append({
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "role": u.role or "Member",
-            "phone": u.phone or "",
-            "is_approved": u.is_approved,
-            "status": "Online", # Mock status
-            "workload": workload
-        })
-        
-    return {"users": user_list}
+    fields = request.args.get('fields', '')
+    page = request.args.get('page', type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in USER_FIELDS]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+    else:
+        fields = list(USER_FIELDS)
+
+    columns = {"id"}
+    for f in fields:
+        columns.update(USER_FIELDS[f][0])
+    query = User.query.options(load_only(*[getattr(User, c) for c in columns])).order_by(User.id)
+
+    pagination = None
+    if page:
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        users = pagination.items
+    else:
+        users = query.all()
+
+    # Open task counts for everyone come from one grouped query, cached
+    # and kept current by the task write paths
+    workloads = assignee_workload.counts() if "workload" in fields else {}
+
+    getters = [(f, USER_FIELDS[f][1]) for f in fields]
+    user_list = [{f: get(u, workloads) for f, get in getters} for u in users]
+
+    response = {"users": user_list}
+    if pagination:
+        response["pagination"] = {
+            "total": pagination.total,
+            "pages": pagination.pages,
+            "current_page": page,
+            "per_page": per_page
+        }
+    return response
 
 @user_bp.put("/<int:id>")
 def update_user(id):
@@ -54,4 +90,5 @@ def update_user(id):
         u.password = generate_password_hash(data['password'])
         
     db.session.commit()
+    user_typeahead.upsert(u)
     return {"message": "User updated"}
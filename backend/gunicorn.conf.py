@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# gunicorn -c gunicorn.conf.py
+#
+# The app is preloaded: wsgi.py builds and warms it once in the master and
+# the workers fork from that. `kill -HUP <master>` replaces the workers
+# gracefully but keeps the preloaded code; to deploy new code send USR2
+# (starts a new master) and then QUIT to the old one, or set
+# GUNICORN_PRELOAD=false so HUP reloads the code too.
+
+wsgi_app = "wsgi:app"
+# Workers share request metrics through files here (utils/metrics.py)
+os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "iot-tracking-metrics"))
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+# gevent: every open /api/events stream is a parked greenlet rather than a
+# thread, so a worker holds up to GUNICORN_WORKER_CONNECTIONS of them while
+# still serving other requests. gthread (GUNICORN_THREADS per worker) ties
+# up one thread per stream.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+
+if worker_class == "gevent":
+    # Before wsgi is preloaded: the locks, conditions and background threads
+    # the app creates in the master have to be the cooperative ones
+    from gevent import monkey
+    monkey.patch_all()
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Recycle workers now and then, staggered so they don't all restart at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Preloaded, this is the master's app; otherwise it's built right here
+    from wsgi import app
+    from utils.workers import after_fork
+    after_fork(app)
+
+
+def worker_exit(server, worker):
+    from wsgi import app
+    from utils.workers import before_exit
+    before_exit(app)
+
+
+def on_starting(server):
+    # Counters start from zero with each master
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
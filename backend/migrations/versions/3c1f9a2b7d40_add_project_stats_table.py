@@ -0,0 +1,50 @@
+"""Add project_stats counter table
+
+Revision ID: 3c1f9a2b7d40
+Revises: 0e4aa3e18414
+Create Date: 2026-10-18 09:12:31.204118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a2b7d40'
+down_revision = '0e4aa3e18414'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('project_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('total_tasks', sa.Integer(), nullable=False),
+    sa.Column('done_tasks', sa.Integer(), nullable=False),
+    sa.Column('overdue_tasks', sa.Integer(), nullable=False),
+    sa.Column('open_issues_low', sa.Integer(), nullable=False),
+    sa.Column('open_issues_medium', sa.Integer(), nullable=False),
+    sa.Column('open_issues_high', sa.Integer(), nullable=False),
+    sa.Column('open_issues_critical', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('project_id')
+    )
+    # Backfill from the existing rows; scripts/reconcile_project_stats.py
+    # does the same thing at any later point.
+    op.execute("""
+        INSERT INTO project_stats (project_id, total_tasks, done_tasks, overdue_tasks,
+            open_issues_low, open_issues_medium, open_issues_high, open_issues_critical)
+        SELECT p.id,
+            (SELECT COUNT(*) FROM tasks t WHERE t.project_id = p.id),
+            (SELECT COUNT(*) FROM tasks t WHERE t.project_id = p.id AND t.status = 'Done'),
+            (SELECT COUNT(*) FROM tasks t WHERE t.project_id = p.id AND t.status = 'Overdue'),
+            (SELECT COUNT(*) FROM issues i WHERE i.project_id = p.id AND i.severity = 'Low' AND i.status NOT IN ('Resolved', 'Closed')),
+            (SELECT COUNT(*) FROM issues i WHERE i.project_id = p.id AND i.severity = 'Medium' AND i.status NOT IN ('Resolved', 'Closed')),
+            (SELECT COUNT(*) FROM issues i WHERE i.project_id = p.id AND i.severity = 'High' AND i.status NOT IN ('Resolved', 'Closed')),
+            (SELECT COUNT(*) FROM issues i WHERE i.project_id = p.id AND i.severity = 'Critical' AND i.status NOT IN ('Resolved', 'Closed'))
+        FROM projects p
+    """)
+
+
+def downgrade():
+    op.drop_table('project_stats')
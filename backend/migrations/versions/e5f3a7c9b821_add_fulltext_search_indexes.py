@@ -0,0 +1,38 @@
+"""Add FULLTEXT search indexes
+
+Revision ID: e5f3a7c9b821
+Revises: d9e2b6c4f718
+Create Date: 2026-10-18 21:26:03.447190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f3a7c9b821'
+down_revision = 'd9e2b6c4f718'
+branch_labels = None
+depends_on = None
+
+FULLTEXT_INDEXES = [
+    ('ft_projects_name_description', 'projects', ['name', 'description']),
+    ('ft_tasks_name_description', 'tasks', ['name', 'description']),
+    ('ft_issues_title_description', 'issues', ['title', 'description']),
+    ('ft_comments_content', 'comments', ['content']),
+]
+
+
+def upgrade():
+    # Other databases use the in-process fallback in utils/search.py
+    if op.get_bind().dialect.name not in ('mysql', 'mariadb'):
+        return
+    for name, table, columns in FULLTEXT_INDEXES:
+        op.create_index(name, table, columns, unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name not in ('mysql', 'mariadb'):
+        return
+    for name, table, _ in FULLTEXT_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -7,4 +7,9 @@ class Attachment(db.Model):
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=True)
     file_name = db.Column(db.String(255))
     file_url = db.Column(db.String(500))
+    # Set for uploaded files, which are stored by hash (utils/uploads.py);
+    # link-only attachments just have a file_url
+    content_hash = db.Column(db.String(64), index=True)
+    size = db.Column(db.BigInteger)
+    content_type = db.Column(db.String(100))
     uploaded_at = db.Column(db.DateTime, server_default=db.func.now())
@@ -0,0 +1,15 @@
+from utils.db import db
+
+class ChangeEvent(db.Model):
+    # Append-only log behind the /api/events feed. Rows are written in the
+    # same transaction as the change they describe; the id doubles as the
+    # SSE event id clients resume from. See utils/events.py.
+    __tablename__ = 'change_events'
+
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True, autoincrement=True)
+    topic = db.Column(db.String(20), nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+    object_id = db.Column(db.Integer)
+    project_id = db.Column(db.Integer, index=True)
+    task_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), index=True)
@@ -0,0 +1,9 @@
+from utils.db import db
+
+class CollectionVersion(db.Model):
+    # One counter per cacheable collection scope (e.g. "tasks:12"), bumped
+    # in the same transaction as any write to it. See utils/versions.py.
+    __tablename__ = 'collection_versions'
+
+    scope = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
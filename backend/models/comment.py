@@ -8,3 +8,7 @@ class Comment(db.Model):
     user_name = db.Column(db.String(200))
     content = db.Column(db.Text)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ft_comments_content', 'content', mysql_prefix='FULLTEXT').ddl_if(dialect=('mysql', 'mariadb')),
+    )
@@ -11,3 +11,7 @@ class Issue(db.Model):
     severity = db.Column(db.String(50), default='Medium')
     assigned_to = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ft_issues_title_description', 'title', 'description', mysql_prefix='FULLTEXT').ddl_if(dialect=('mysql', 'mariadb')),
+    )
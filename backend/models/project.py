@@ -18,27 +18,33 @@ class Project(db.Model):
     material_cost = db.Column(db.Float, default=0.0)
     additional_cost = db.Column(db.Float, default=0.0)
 
+    __table_args__ = (
+        db.Index('ft_projects_name_description', 'name', 'description', mysql_prefix='FULLTEXT').ddl_if(dialect=('mysql', 'mariadb')),
+    )
+
     members = db.relationship('User', secondary='project_members', backref='projects')
     attachments = db.relationship('Attachment', backref='project', lazy=True)
 
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "customer": self.customer,
-            "start_date": str(self.start_date) if self.start_date else None,
-            "end_date": str(self.end_date) if self.end_date else None,
-            "status": self.status,
-            "stage": self.stage,
-            "priority": self.priority,
-            "manpower_cost": self.manpower_cost,
-            "equipment_cost": self.equipment_cost,
-            "material_cost": self.material_cost,
-            "additional_cost": self.additional_cost,
-            "members": [{"id": m.id, "name": m.name, "email": m.email, "role": m.role} for m in self.members],
-            "attachments": [{"id": a.id, "file_name": a.file_name, "file_url": a.file_url, "uploaded_at": a.uploaded_at} for a in self.attachments]
-        }
+    # Column fields to_dict() can return, and the relations it can include.
+    # project_controller uses these for fields=/include= and picks matching
+    # load options so only what is serialized gets loaded.
+    FIELDS = ("id", "name", "description", "customer", "start_date", "end_date", "status", "stage",
+              "priority", "manpower_cost", "equipment_cost", "material_cost", "additional_cost")
+    RELATIONS = ("members", "attachments")
+
+    def to_dict(self, fields=FIELDS, include=RELATIONS):
+        data = {}
+        for field in fields:
+            value = getattr(self, field)
+            if field in ("start_date", "end_date"):
+                value = str(value) if value else None
+            data[field] = value
+
+        if "members" in include:
+            data["members"] = [{"id": m.id, "name": m.name, "email": m.email, "role": m.role} for m in self.members]
+        if "attachments" in include:
+            data["attachments"] = [{"id": a.id, "file_name": a.file_name, "file_url": a.file_url, "uploaded_at": a.uploaded_at} for a in self.attachments]
+        return data
 
 project_members = db.Table('project_members',
     db.Column('project_id', db.Integer, db.ForeignKey('projects.id'), primary_key=True),
@@ -0,0 +1,17 @@
+from utils.db import db
+
+class ProjectStats(db.Model):
+    # Per-project counters maintained by the task and issue write paths so
+    # project health is a single indexed read. Rebuild with
+    # scripts/reconcile_project_stats.py if they ever drift.
+    __tablename__ = 'project_stats'
+
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    total_tasks = db.Column(db.Integer, nullable=False, default=0)
+    done_tasks = db.Column(db.Integer, nullable=False, default=0)
+    overdue_tasks = db.Column(db.Integer, nullable=False, default=0)
+    open_issues_low = db.Column(db.Integer, nullable=False, default=0)
+    open_issues_medium = db.Column(db.Integer, nullable=False, default=0)
+    open_issues_high = db.Column(db.Integer, nullable=False, default=0)
+    open_issues_critical = db.Column(db.Integer, nullable=False, default=0)
+
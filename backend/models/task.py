@@ -9,11 +9,16 @@ class Task(db.Model):
     assigned_to = db.Column(db.String(200))
     status = db.Column(db.String(50))
     priority = db.Column(db.String(50), default='Medium')
-    deadline = db.Column(db.Date)
+    deadline = db.Column(db.Date, index=True)
     parent_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
 
+    # For /api/search (utils/search.py); only created on MariaDB/MySQL
+    __table_args__ = (
+        db.Index('ft_tasks_name_description', 'name', 'description', mysql_prefix='FULLTEXT').ddl_if(dialect=('mysql', 'mariadb')),
+    )
+
     subtasks = db.relationship('Task', backref=db.backref('parent', remote_side=[id]), lazy=True)
     attachments = db.relationship('Attachment', backref='task', lazy=True)
     comments = db.relationship('Comment', backref='task', lazy=True)
@@ -0,0 +1,31 @@
+from utils.db import db
+
+class TelemetryChunk(db.Model):
+    # Raw samples for one device and metric over one hour, packed as
+    # (uint16 seconds into the hour, float32 value) pairs and appended to
+    # in place. See utils/telemetry.py.
+    __tablename__ = 'telemetry_chunks'
+
+    device_id = db.Column(db.Integer, db.ForeignKey('deployment_devices.id', ondelete='CASCADE'), primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    chunk_start = db.Column(db.Integer, primary_key=True, autoincrement=False)  # epoch seconds, hour aligned
+    samples = db.Column(db.LargeBinary(16777215), nullable=False)
+
+class TelemetryRollup(db.Model):
+    # count/sum/min/max per bucket at 1 minute, 1 hour and 1 day
+    # resolution, kept both per device and per project (device_id 0).
+    __tablename__ = 'telemetry_rollups'
+
+    project_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    device_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    metric = db.Column(db.String(20), primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True, autoincrement=False)  # bucket width in seconds
+    bucket_start = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    sample_count = db.Column(db.Integer, nullable=False)
+    value_sum = db.Column(db.Double, nullable=False)
+    value_min = db.Column(db.Double, nullable=False)
+    value_max = db.Column(db.Double, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_telemetry_rollups_device', 'device_id', 'metric', 'resolution', 'bucket_start'),
+    )
@@ -30,7 +30,7 @@ class DeploymentDevice(db.Model):
     __tablename__ = 'deployment_devices'
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
-    serial_number = db.Column(db.String(100))
+    serial_number = db.Column(db.String(100), index=True, unique=True)
     status = db.Column(db.String(50)) # Active, Offline, Maintenance
     location = db.Column(db.String(255))
-    last_ping = db.Column(db.DateTime)
+    last_ping = db.Column(db.DateTime, index=True)
@@ -0,0 +1,26 @@
+from utils.db import db
+
+class UploadSession(db.Model):
+    # An attachment upload in progress. Chunks are appended to
+    # <UPLOAD_FOLDER>/partial/<id> and received_bytes is how far the file
+    # has got, i.e. the offset the next chunk must start at. See
+    # utils/uploads.py.
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), nullable=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=True)
+    file_name = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100))
+    size = db.Column(db.BigInteger, nullable=False)
+    received_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now(), index=True)
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "file_name": self.file_name,
+            "size": self.size,
+            "offset": self.received_bytes,
+        }
@@ -0,0 +1,90 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Sustained heartbeat ingestion through POST /api/tracking/deployment/heartbeat
+# (buffered, flushed in bulk) versus one UPDATE + commit per ping, on SQLite.
+from config import Config
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+Config.DEADLINE_SCHEDULER_ENABLED = False
+
+from app import create_app
+from utils.db import db
+from utils.heartbeats import heartbeat_buffer
+from models.project import Project
+from models.tracking import DeploymentDevice
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--devices", type=int, default=200000)
+parser.add_argument("--seconds", type=float, default=10)
+parser.add_argument("--batch", type=int, default=500, help="pings per request")
+parser.add_argument("--clients", type=int, default=4)
+parser.add_argument("--flush-interval", type=float, default=2)
+args = parser.parse_args()
+
+app = create_app()
+app.config["HEARTBEAT_FLUSH_INTERVAL"] = args.flush_interval
+heartbeat_buffer.init_app(app)
+
+with app.app_context():
+    db.create_all()
+    db.session.add(Project(name="Fleet"))
+    db.session.flush()
+    db.session.execute(DeploymentDevice.__table__.insert(), [
+        {"project_id": 1, "serial_number": f"SN{i:07d}", "status": "Active", "location": "Bench"}
+        for i in range(args.devices)
+    ])
+    db.session.commit()
+
+serials = [f"SN{i:07d}" for i in range(args.devices)]
+sent = [0] * args.clients
+stop = threading.Event()
+
+
+def client(n):
+    c = app.test_client()
+    rng = random.Random(n)
+    while not stop.is_set():
+        pings = [{"serial_number": s} for s in rng.sample(serials, args.batch)]
+        r = c.post("/api/tracking/deployment/heartbeat", json={"pings": pings})
+        if r.status_code not in (202, 503):
+            raise SystemExit(f"Unexpected {r.status_code}: {r.get_data(as_text=True)}")
+        sent[n] += r.json["accepted"]
+
+
+threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+start = time.perf_counter()
+for t in threads:
+    t.start()
+time.sleep(args.seconds)
+stop.set()
+for t in threads:
+    t.join()
+elapsed = time.perf_counter() - start
+heartbeat_buffer.flush()
+
+with app.app_context():
+    pinged = DeploymentDevice.query.filter(DeploymentDevice.last_ping != None).count()
+
+stats = heartbeat_buffer.stats
+print(f"{args.devices} devices, {args.clients} clients x {args.batch} pings/request, {elapsed:.1f}s")
+print(f"  buffered endpoint   {sum(sent) / elapsed:10.0f} pings/s accepted "
+      f"({stats['rejected']} rejected, {stats['flushes']} flushes, {stats['flushed']} rows written, "
+      f"{pinged} devices with last_ping)")
+
+# Baseline: what the generic CRUD path amounts to, one UPDATE + commit per ping
+with app.app_context():
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < min(args.seconds, 5):
+        DeploymentDevice.query.filter_by(serial_number=random.choice(serials))\
+            .update({"last_ping": datetime.utcnow()})
+        db.session.commit()
+        count += 1
+    print(f"  UPDATE per ping     {count / (time.perf_counter() - start):10.0f} pings/s")
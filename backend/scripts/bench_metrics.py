@@ -0,0 +1,88 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Per-request cost of the /api/metrics instrumentation (utils/metrics.py):
+# the same requests through two apps on one SQLite database, one with
+# METRICS_ENABLED and one without. Alternating rounds keep drift from
+# favouring either side.
+from config import Config
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+Config.DEADLINE_SCHEDULER_ENABLED = False
+
+from app import create_app
+from utils.db import db
+from models.project import Project
+from models.task import Task
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--requests", type=int, default=1000, help="per round")
+parser.add_argument("--rounds", type=int, default=5)
+parser.add_argument("--path", default="/api/tasks/project/1")
+args = parser.parse_args()
+
+Config.METRICS_ENABLED = False
+plain = create_app()
+Config.METRICS_ENABLED = True
+instrumented = create_app()
+# Engine events are global, so the plain app's statements are timed too;
+# its requests just never read the numbers. That only makes the gap smaller
+# by the cost of the two engine callbacks, which are measured separately.
+
+with plain.app_context():
+    db.create_all()
+    db.session.add(Project(name="Bench"))
+    db.session.flush()
+    db.session.execute(Task.__table__.insert(), [{"name": f"Task {i}", "project_id": 1} for i in range(20)])
+    db.session.commit()
+
+
+def run(app):
+    client = app.test_client()
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        client.get(args.path)
+    return (time.perf_counter() - started) / args.requests * 1e6
+
+
+for app in (plain, instrumented):
+    run(app)  # warm up
+
+results = {"off": [], "on": []}
+for _ in range(args.rounds):
+    results["off"].append(run(plain))
+    results["on"].append(run(instrumented))
+
+off, on = statistics.median(results["off"]), statistics.median(results["on"])
+print(f"{args.path}: {off:.1f} us/request without metrics, {on:.1f} us with, "
+      f"+{on - off:.1f} us ({(on - off) / off * 100:.1f}%)")
+
+from flask import Response
+from utils.metrics import metrics, _before_execute, _after_execute
+
+
+class _Conn:
+    info = {}
+
+
+# The instrumentation on its own, without the noise of a whole request
+n = 200000
+started = time.perf_counter()
+for _ in range(n):
+    _before_execute(_Conn, None, None, None, None, False)
+    _after_execute(_Conn, None, None, None, None, False)
+print(f"engine callbacks: {(time.perf_counter() - started) / n * 1e6:.2f} us/statement")
+
+n = 50000
+response = Response()
+with instrumented.test_request_context(args.path):
+    started = time.perf_counter()
+    for _ in range(n):
+        metrics._start()
+        metrics._finish(response)
+print(f"request hooks: {(time.perf_counter() - started) / n * 1e6:.2f} us/request")
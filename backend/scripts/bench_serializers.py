@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Compares the old `{k: v for k, v in x.__dict__.items()}` + Flask JSON path
+# with utils.serializers + FastJSONProvider on rows loaded from SQLite.
+from config import Config
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+Config.DEADLINE_SCHEDULER_ENABLED = False
+
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from utils.db import db
+from utils.serializers import serializer_for, FastJSONProvider, orjson
+from models.task import Task
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=50000)
+parser.add_argument("--repeat", type=int, default=3)
+args = parser.parse_args()
+
+app = create_app()
+
+def best_of(fn):
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        size = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), size
+
+with app.test_request_context():
+    db.create_all()
+    now = datetime.utcnow()
+    db.session.execute(Task.__table__.insert(), [
+        {"project_id": 1, "name": f"Task {i}", "description": "Bench row", "assigned_to": "Bench",
+         "status": "To-Do", "priority": "Medium", "deadline": date.today() + timedelta(days=i % 30),
+         "created_at": now, "updated_at": now}
+        for i in range(args.rows)
+    ])
+    db.session.commit()
+    tasks = Task.query.all()
+
+    legacy_json = DefaultJSONProvider(app)
+    fast_json = FastJSONProvider(app)
+    serializer = serializer_for(Task)
+
+    results = [
+        ("__dict__ + Flask json", best_of(lambda: len(legacy_json.dumps(
+            [{k: v for k, v in t.__dict__.items() if not k.startswith('_')} for t in tasks])))),
+        ("registry dicts + fast json", best_of(lambda: len(fast_json.response(serializer.many(tasks)).get_data()))),
+        ("registry rows + fast json", best_of(lambda: len(fast_json.response(
+            {"columns": serializer.keys, "rows": serializer.rows(tasks)}).get_data()))),
+    ]
+
+    print(f"{args.rows} Task rows, best of {args.repeat}, JSON backend: {'orjson' if orjson else 'stdlib json'}")
+    baseline = results[0][1][0]
+    for name, (seconds, size) in results:
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms  {size / 1024:8.0f} KiB  {baseline / seconds:5.1f}x")
@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Latency and queries per request for every GET route at production-like
+# volumes: by default 10k projects, 2M tasks in subtask trees, 500k issues
+# and 200k devices, with comments, attachments and tracking records at
+# seed_data.py's usual rates (--scale shrinks or grows all of them). The
+# data is generated by seed_data.py into a SQLite file unless --db points
+# elsewhere. Requests go through create_app() and the Flask test client,
+# so the numbers cover the app and the database but not a web server.
+#
+# Results are written as JSON (--out). With --baseline, a route whose p50
+# is more than --tolerance slower than the baseline's, or that issues more
+# queries, is reported and the script exits 1.
+#
+#   python scripts/bench_suite.py --scale 0.05 --out before.json
+#   python scripts/bench_suite.py --scale 0.05 --baseline before.json
+#
+# Seeding the full scale takes about a minute on SQLite; pass the printed
+# database back as --db with --skip-seed to measure it again.
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--db", help="database URI (default: a new SQLite file)")
+parser.add_argument("--skip-seed", action="store_true", help="the database is already seeded")
+parser.add_argument("--scale", type=float, default=1.0)
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--requests", type=int, default=50, help="per route")
+parser.add_argument("--routes", default="", help="only routes containing this")
+parser.add_argument("--out", default="bench_results.json")
+parser.add_argument("--baseline")
+parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+args = parser.parse_args()
+
+db_uri = args.db or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_suite.db")
+
+from config import Config
+Config.SQLALCHEMY_DATABASE_URI = db_uri
+Config.DEADLINE_SCHEDULER_ENABLED = False
+Config.QUERY_GUARD = "off"
+
+from sqlalchemy import event, func
+from sqlalchemy.engine import make_url
+from utils.db import db
+from models.project import Project
+from models.task import Task
+from models.issue import Issue
+from models.user import User
+from models.tracking import DeploymentDevice
+from seed_data import default_counts, seed
+
+SIZES = {"projects": 10000, "tasks": 2000000, "issues": 500000, "devices": 200000, "users": 2000}
+
+# Routes that can't run here: streams, file bodies, upload sessions
+SKIP = {"static", "events.stream_events", "metrics.get_metrics", "attachments.download",
+        "attachments.preview", "attachments.get_upload"}
+# Query strings the frontend sends; list routes are paginated
+QUERIES = {
+    "projects.get_projects": ["page=1&per_page=20"],
+    "tasks.get_all_tasks": ["page=1&per_page=20", "page=2000&per_page=20", "cursor=&per_page=20"],
+    "tasks.get_tasks": ["page=1&per_page=20"],
+    "issues.get_issues": ["page=1&per_page=20"],
+    "users.get_users": ["page=1&per_page=20"],
+    "projects.search_users": ["q=us"],
+    "search.run_search": ["q=sensor"],
+    "telemetry.get_device_series": ["metric=battery"],
+    "telemetry.get_project_series": ["metric=battery"],
+}
+# URL arguments named "id" that aren't the blueprint's own object
+ID_KINDS = {"tasks.get_tasks": "project", "progress.get_progress": "project"}
+ARG_KINDS = {"project_id": "project", "task_id": "task", "device_id": "device"}
+BLUEPRINT_KINDS = {"projects": "project", "tasks": "task"}
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def targets(app, ids):
+    # (name, endpoint, path builder) for each route and query string
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if "GET" not in rule.methods or rule.endpoint in SKIP:
+            continue
+        if rule.endpoint == "search.run_search" and db_uri.startswith("sqlite"):
+            # SQLite falls back to the in-process index, which would have to
+            # index every row first; production searches MariaDB FULLTEXT
+            continue
+        kinds = {}
+        for arg in rule.arguments:
+            if arg == "id":
+                kinds[arg] = ID_KINDS.get(rule.endpoint, BLUEPRINT_KINDS.get(rule.endpoint.split(".")[0]))
+            else:
+                kinds[arg] = ARG_KINDS.get(arg)
+        if None in kinds.values():
+            continue
+        for query in QUERIES.get(rule.endpoint, [""]):
+            name = rule.rule + (f"?{query}" if query else "")
+            if args.routes and args.routes not in name:
+                continue
+
+            def build(rng, rule=rule, kinds=kinds, query=query):
+                path = rule.build({arg: rng.choice(ids[kind]) for arg, kind in kinds.items()})[1]
+                return path + (f"?{query}" if query else "")
+            yield name, rule.endpoint, build
+
+
+def measure(app, ids):
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", count)
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    results = {}
+    for name, endpoint, build in targets(app, ids):
+        timings, queries, statuses = [], [], set()
+        for i in range(args.requests + 1):
+            path = build(rng)
+            statements[0] = 0
+            started = time.perf_counter()
+            res = client.get(path)
+            elapsed = (time.perf_counter() - started) * 1000
+            statuses.add(res.status_code)
+            if i == 0:
+                # First request: empty caches
+                cold = elapsed
+                continue
+            timings.append(elapsed)
+            queries.append(statements[0])
+        results[name] = {
+            "endpoint": endpoint, "statuses": sorted(statuses), "cold_ms": round(cold, 3),
+            "p50_ms": round(percentile(timings, 50), 3), "p99_ms": round(percentile(timings, 99), 3),
+            "queries": percentile(queries, 50), "max_queries": max(queries),
+        }
+        r = results[name]
+        print(f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['queries']:>4} {r['max_queries']:>4}  {name}"
+              + ("" if r["statuses"] == [200] else f"  status {r['statuses']}"), flush=True)
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", count)
+    return results
+
+
+def compare(results, baseline):
+    if baseline.get("rows") != counts:
+        print(f"Note: baseline has {baseline.get('rows')} rows, this run {counts}")
+    regressions = []
+    for name, r in results.items():
+        b = baseline["routes"].get(name)
+        if b is None:
+            continue
+        slower = r["p50_ms"] > b["p50_ms"] * (1 + args.tolerance)
+        more = r["queries"] > b["queries"]
+        if slower or more:
+            regressions.append(name)
+        print(f"{'REGRESSED' if slower or more else 'ok':<10} p50 {b['p50_ms']:.2f} -> {r['p50_ms']:.2f} ms, "
+              f"p99 {b['p99_ms']:.2f} -> {r['p99_ms']:.2f} ms, queries {b['queries']} -> {r['queries']}  {name}")
+    for name in sorted(set(baseline["routes"]) - set(results)):
+        print(f"{'missing':<10} {name}")
+    return regressions
+
+
+seed_seconds = None
+if not args.skip_seed:
+    sizes = default_counts(args.scale)
+    sizes.update({name: max(1, int(count * args.scale)) for name, count in SIZES.items()})
+    print(f"Seeding {db_uri}: " + ", ".join(f"{v} {k}" for k, v in sizes.items()), flush=True)
+    started = time.perf_counter()
+    seed(db_uri, sizes, args.seed)
+    seed_seconds = round(time.perf_counter() - started, 1)
+    print(f"Seeded in {seed_seconds}s", flush=True)
+
+# Created after seeding so the in-process indexes (fleet, typeahead) are
+# built from the seeded data, as they would be at a server's start
+from app import create_app
+from utils.project_counters import rebuild_project_stats
+
+app = create_app()
+with app.app_context():
+    if not args.skip_seed:
+        rebuild_project_stats()
+    counts = {name: db.session.query(func.count(model.id)).scalar()
+              for name, model in (("projects", Project), ("tasks", Task), ("issues", Issue),
+                                  ("devices", DeploymentDevice), ("users", User))}
+    # Up to 1000 ids of each kind spread over the table, for URL arguments
+    ids = {kind: [i for (i,) in db.session.query(model.id).filter(model.id % max(1, counts[name] // 1000) == 0)
+                  .order_by(model.id).limit(1000)]
+           for kind, name, model in (("project", "projects", Project), ("task", "tasks", Task),
+                                     ("device", "devices", DeploymentDevice))}
+    db.session.remove()
+
+print(f"{'p50 ms':>9} {'p99 ms':>9} {'q':>4} {'qmax':>4}  route")
+results = measure(app, ids)
+
+report = {
+    "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+    "database": make_url(db_uri).render_as_string(hide_password=True),
+    "rows": counts, "seed_seconds": seed_seconds, "requests_per_route": args.requests,
+    "python": platform.python_version(), "routes": results,
+}
+with open(args.out, "w") as f:
+    json.dump(report, f, indent=2)
+print(f"Wrote {args.out}")
+
+if args.baseline:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"{len(regressions)} route(s) regressed against {args.baseline}")
+        sys.exit(1)
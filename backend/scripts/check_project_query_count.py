@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs against a throwaway SQLite file, no MariaDB needed
+from config import Config
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_count.db")
+Config.DEADLINE_SCHEDULER_ENABLED = False
+
+from sqlalchemy import event
+from app import create_app
+from utils.db import db
+from models.project import Project
+from models.user import User
+from models.attachment import Attachment
+
+app = create_app()
+
+def count_queries(client, url):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        res = client.get(url)
+        assert res.status_code == 200, res.get_data(as_text=True)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    return len(statements)
+
+with app.app_context():
+    db.create_all()
+
+    users = [User(name=f"User {i}", email=f"user{i}@example.com", role="Member", is_approved=True) for i in range(20)]
+    db.session.add_all(users)
+    for i in range(100):
+        p = Project(name=f"Project {i}", stage="Development", priority="Medium")
+        p.members = users[i % 20:i % 20 + 3]
+        p.attachments = [Attachment(file_name=f"spec-{i}.pdf", file_url=f"uploads/spec-{i}.pdf")]
+        db.session.add(p)
+    db.session.commit()
+
+    client = app.test_client()
+    failures = 0
+    for params in ["", "&include=", "&include=members", "&fields=id,name&include="]:
+        small = count_queries(client, f"/api/projects/?page=1&per_page=10{params}")
+        large = count_queries(client, f"/api/projects/?page=1&per_page=100{params}")
+        ok = small == large
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} params='{params}': 10 projects -> {small} queries, 100 projects -> {large} queries")
+
+    sys.exit(1 if failures else 0)
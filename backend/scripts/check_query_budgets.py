@@ -0,0 +1,117 @@
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Runs every GET route against a throwaway SQLite file twice, the second
+# time with five times the data, with QUERY_GUARD=raise. A route fails if it
+# goes over its @query_budget or if its statement count grows with the data
+# (an N+1 whether or not it has a budget yet). In-process caches warmed by
+# the first pass can only lower the second pass's counts. Repeated
+# statement shapes are logged by utils/query_guard.py as they happen.
+from config import Config
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_budgets.db")
+Config.DEADLINE_SCHEDULER_ENABLED = False
+Config.QUERY_GUARD = "raise"
+
+from app import create_app
+from utils.db import db
+from models.project import Project
+from models.task import Task
+from models.issue import Issue
+from models.comment import Comment
+from models.attachment import Attachment
+from models.user import User
+from models.tracking import HardwareComponent, FirmwareVersion, TestSession, DeploymentDevice
+
+# Routes that can't run here: streams, file bodies, upload sessions
+SKIP = {"static", "events.stream_events", "metrics.get_metrics", "attachments.download",
+        "attachments.preview", "attachments.get_upload"}
+
+app = create_app()
+seeded = 0
+
+
+def seed(rounds):
+    global seeded
+    for _ in range(rounds):
+        n = seeded
+        seeded += 1
+        users = [User(name=f"User {n}-{i}", email=f"user{n}-{i}@example.com", role="Member", is_approved=i % 4 != 0)
+                 for i in range(5)]
+        db.session.add_all(users)
+        for i in range(4):
+            p = Project(name=f"Project {n}-{i}", stage="Development", priority="Medium", status="Active")
+            p.members = users[i:i + 2]
+            p.attachments = [Attachment(file_name=f"spec-{n}-{i}.pdf", file_url=f"uploads/spec-{n}-{i}.pdf")]
+            db.session.add(p)
+            db.session.flush()
+            for j in range(5):
+                t = Task(project_id=p.id, name=f"Task {n}-{i}-{j}", status=("To Do", "In Progress", "Done")[j % 3],
+                         assigned_to=users[j].name, deadline=date.today() + timedelta(days=j - 2))
+                t.subtasks = [Task(project_id=p.id, name=f"Subtask {n}-{i}-{j}-{k}", status="To Do",
+                                   assigned_to=users[k].name) for k in range(2)]
+                t.comments = [Comment(project_id=p.id, user_name=users[j].name, content="Looks good")]
+                t.attachments = [Attachment(file_name=f"log-{n}-{i}-{j}.txt", file_url=f"uploads/log-{n}-{i}-{j}.txt")]
+                db.session.add(t)
+            db.session.add_all([Issue(project_id=p.id, title=f"Issue {n}-{i}-{j}", severity="High",
+                                      assigned_to=users[j].name) for j in range(3)])
+            db.session.add(Comment(project_id=p.id, user_name=users[0].name, content="Kickoff"))
+            db.session.add(HardwareComponent(project_id=p.id, name=f"Board {n}-{i}", status="Tested"))
+            db.session.add(FirmwareVersion(project_id=p.id, version=f"1.{n}.{i}", changelog="Fixes"))
+            db.session.add(TestSession(project_id=p.id, name=f"Run {n}-{i}", date=date.today(), result="Pass"))
+            db.session.add_all([DeploymentDevice(project_id=p.id, serial_number=f"SN-{n}-{i}-{j}", status="Active",
+                                                 location="Lab", last_ping=datetime.utcnow()) for j in range(5)])
+    db.session.commit()
+
+
+def paths():
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if "GET" not in rule.methods or rule.endpoint in SKIP:
+            continue
+        path = rule.build({arg: 1 for arg in rule.arguments})[1]
+        if rule.endpoint == "projects.search_users":
+            path += "?q=us"
+        elif rule.endpoint == "search.run_search":
+            path += "?q=project"
+        yield rule.endpoint, path
+
+
+def measure(client):
+    counts = {}
+    for endpoint, path in paths():
+        res = client.get(path)
+        body = res.get_json(silent=True) or {}
+        if res.status_code == 500 and body.get("type") == "QueryBudgetExceeded":
+            counts[path] = (endpoint, None, body["details"])
+            continue
+        assert res.status_code < 500, f"{path}: {res.get_data(as_text=True)}"
+        counts[path] = (endpoint, int(res.headers["X-Query-Count"]), None)
+    return counts
+
+
+with app.app_context():
+    db.create_all()
+    client = app.test_client()
+    seed(1)
+    small = measure(client)
+    seed(4)
+    large = measure(client)
+
+    failures = 0
+    for path, (endpoint, count, over) in large.items():
+        budget = getattr(app.view_functions[endpoint], "query_budget", None)
+        before = small[path][1]
+        if over is not None or small[path][2] is not None:
+            details = over or small[path][2]
+            status = f"FAIL over budget: {details['queries']} > {details['budget']}, top: {details['repeated'][:1]}"
+        elif count > before:
+            status = f"FAIL grows with data: {before} -> {count} queries"
+        else:
+            status = f"OK   {count} queries"
+        failures += status.startswith("FAIL")
+        print(f"{status:<40} budget {budget if budget is not None else '-':<3} {path}")
+
+    sys.exit(1 if failures else 0)
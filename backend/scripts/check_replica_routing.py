@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read-replica routing against a stand-in of two SQLite files: the
+# "replica" is a copy of the primary that never receives writes, so which
+# file a GET read from shows in the response.
+from config import Config
+workdir = tempfile.mkdtemp()
+primary = os.path.join(workdir, "primary.db")
+replica = os.path.join(workdir, "replica.db")
+Config.SQLALCHEMY_DATABASE_URI = "sqlite:///" + primary
+Config.DB_REPLICA_URIS = ["sqlite:///" + replica]
+Config.DB_REPLICA_STICKY_SECONDS = 2
+Config.DEADLINE_SCHEDULER_ENABLED = False
+
+from app import create_app
+from utils.db import db, pool_metrics
+from models.project import Project
+
+app = create_app()
+with app.app_context():
+    for key in (None, "replica0"):
+        db.metadata.create_all(db.engines[key])
+    for key in (None, "replica0"):
+        with db.engines[key].begin() as conn:
+            conn.execute(Project.__table__.insert(), [{"name": "Seeded", "status": "Active"}])
+
+client = app.test_client()
+
+
+def names():
+    return sorted(p["name"] for p in client.get("/api/projects/").json["projects"])
+
+
+def check(label, ok):
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    if not ok:
+        sys.exit(1)
+
+
+check("GET reads the replica", names() == ["Seeded"])
+client.post("/api/projects/", json={"name": "Written"})
+check("POST wrote to the primary only", names() == ["Seeded", "Written"])
+check("sticky cookie set after the write", client.get_cookie("db_primary_until") is not None)
+
+# A client without the cookie still sees the replica
+fresh = app.test_client()
+check("other clients read the replica", sorted(p["name"] for p in fresh.get("/api/projects/").json["projects"]) == ["Seeded"])
+
+client.delete_cookie("db_primary_until")
+check("without the cookie reads go back to the replica", names() == ["Seeded"])
+
+# The SPA calls the API cross-origin and sends no cookies: it echoes the
+# deadline header instead
+spa = app.test_client(use_cookies=False)
+origin = {"Origin": "http://localhost:5174"}
+res = spa.post("/api/projects/", json={"name": "From SPA"}, headers=origin)
+until = res.headers.get("X-DB-Primary-Until")
+check("deadline header returned after the write", until is not None)
+check("deadline header exposed to cross-origin scripts",
+      "x-db-primary-until" in res.headers.get("Access-Control-Expose-Headers", "").lower())
+
+
+def spa_names(headers):
+    res = spa.get("/api/projects/", headers=dict(origin, **headers))
+    return sorted(p["name"] for p in res.json["projects"])
+
+
+check("echoing the header reads the primary",
+      spa_names({"X-DB-Primary-Until": until}) == ["From SPA", "Seeded", "Written"])
+check("without it reads go to the replica", spa_names({}) == ["Seeded"])
+check("an expired deadline reads the replica", spa_names({"X-DB-Primary-Until": "1"}) == ["Seeded"])
+print(pool_metrics.snapshot())
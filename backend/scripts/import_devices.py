@@ -0,0 +1,39 @@
+import argparse
+import json
+import sys
+from app import create_app
+from utils.device_import import import_devices
+from utils.db import db
+from models.project import Project
+
+parser = argparse.ArgumentParser(description="Bulk create/update deployment devices by serial_number from CSV or NDJSON")
+parser.add_argument("path", help="file to import, or - for stdin")
+parser.add_argument("--project-id", type=int, required=True)
+parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension (.csv, else ndjson)")
+parser.add_argument("--chunk-size", type=int, default=1000)
+parser.add_argument("--errors", help="write the per-row error report to this file as NDJSON")
+args = parser.parse_args()
+
+fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+app = create_app()
+
+with app.app_context():
+    if not db.session.get(Project, args.project_id):
+        raise SystemExit(f"Project {args.project_id} not found")
+
+    if args.path == "-":
+        report = import_devices(args.project_id, sys.stdin.buffer, fmt, args.chunk_size)
+    else:
+        with open(args.path, "rb") as f:
+            report = import_devices(args.project_id, f, fmt, args.chunk_size)
+
+    print(f"Processed {report.processed} rows: {report.inserted} inserted, {report.updated} updated, {report.failed} failed.")
+    if args.errors:
+        with open(args.errors, "w") as out:
+            for e in report.errors:
+                out.write(json.dumps(e) + "\n")
+    else:
+        for e in report.errors[:20]:
+            print(f"  line {e['line']} ({e['serial_number']}): {e['error']}")
+    if report.failed > len(report.errors):
+        print(f"  ... only the first {len(report.errors)} errors were kept")
@@ -0,0 +1,24 @@
+import argparse
+from app import create_app
+from utils.project_counters import rebuild_project_stats
+
+parser = argparse.ArgumentParser(description="Rebuild project_stats counters from the tasks and issues tables")
+parser.add_argument("--dry-run", action="store_true", help="report drift without writing the corrected counters")
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    drift = rebuild_project_stats(dry_run=args.dry_run)
+
+    if not drift:
+        print("Counters are in sync.")
+    for d in drift:
+        if d["column"] is None:
+            print(f"Project {d['project_id']}: stale counter row (project no longer exists)")
+        else:
+            print(f"Project {d['project_id']}: {d['column']} stored={d['stored']} actual={d['actual']}")
+
+    if drift:
+        action = "Would fix" if args.dry_run else "Fixed"
+        print(f"{action} {len(drift)} drifted counter(s).")
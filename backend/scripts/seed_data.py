@@ -0,0 +1,437 @@
+import argparse
+import importlib
+import os
+import pkgutil
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from bisect import bisect
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Bulk test data at any scale: users, projects and their members, task
+# trees, issues, comments, attachments and tracking records (hardware,
+# firmware, test sessions, devices).
+#
+# Distributions are skewed the way real data is: a few large projects and
+# many small ones, a few busy assignees and commenters, status following a
+# task's age and deadline, devices in deployed projects, most of them
+# pinging. Everything comes from --seed and --as-of (default today), so a
+# run is repeatable. Ids are assigned up front, which keeps the output the
+# same however many --workers processes insert it.
+#
+# Rows go through one compiled INSERT per table and the driver's
+# executemany, in batches; the ORM isn't involved. About 1M rows
+# (--scale 1) load into SQLite in about 20 seconds on one core.
+#
+#   python scripts/seed_data.py --db sqlite:////tmp/demo.db --scale 0.1
+#   python scripts/seed_data.py --scale 2 --workers 4 --seed 7   # MYSQL_* database
+
+from config import Config
+from sqlalchemy import create_engine, event, func, select
+from utils.db import db
+from models.project import Project, project_members
+from models.task import Task
+from models.issue import Issue
+from models.comment import Comment
+from models.attachment import Attachment
+from models.user import User
+from models.tracking import HardwareComponent, FirmwareVersion, TestSession, DeploymentDevice
+import models
+
+# Every table, for create_all
+for module in pkgutil.iter_modules(models.__path__):
+    importlib.import_module(f"models.{module.name}")
+
+# Rows at --scale 1, about a million with the project members
+BASE_COUNTS = {
+    "users": 500, "projects": 2000, "tasks": 500000, "issues": 100000, "comments": 200000,
+    "attachments": 50000, "hardware": 10000, "firmware": 10000, "tests": 10000, "devices": 100000,
+}
+# Per-project tables and the table each one fills, in insert order
+PER_PROJECT = {
+    "tasks": Task, "issues": Issue, "comments": Comment, "attachments": Attachment,
+    "hardware": HardwareComponent, "firmware": FirmwareVersion, "tests": TestSession, "devices": DeploymentDevice,
+}
+BATCH = 5000
+CHUNK_PROJECTS = 50
+MAX_DEPTH = 3
+# Zipf exponents: how much the biggest projects / busiest users dominate
+PROJECT_SKEW = 0.8
+USER_SKEW = 1.1
+
+FIRST_NAMES = ("Aidil Siti Ahmad Nurul Hafiz Mei Ling Raj Priya Daniel Sarah Kevin Aisyah Farid Wei Jun "
+               "Arjun Chloe Imran Lina Marcus Nadia Omar Rachel Tan Yusuf").split()
+LAST_NAMES = "Rahman Lim Tan Wong Kumar Abdullah Lee Ng Ismail Chen Singh Hassan Ong Goh Yap".split()
+WORDS = ("sensor gateway firmware battery antenna enclosure calibration pcb lora mqtt dashboard provisioning "
+         "latency signal thermal bracket rollout field pilot audit ota bootloader modem gps accelerometer "
+         "humidity solar relay watchdog certificate").split()
+CUSTOMERS = ("Petronas TNB Maxis Sime Darby Gamuda IJM Axiata Celcom Digi Westports Boustead Inari "
+             "MRT Corp Prasarana").split()
+CITIES = ("Kuala Lumpur, Penang, Johor Bahru, Ipoh, Kuching, Kota Kinabalu, Melaka, Shah Alam, "
+          "Cyberjaya, Kuantan").split(", ")
+PARTS = ("Main board", "Sensor board", "Power module", "Antenna", "Enclosure", "GPS module", "LoRa radio",
+         "Battery pack", "Solar panel", "Gateway")
+STAGES = (("Planning", 15), ("Development", 35), ("Testing", 20), ("Deployment", 20), ("Completed", 10))
+ROLES = (("Member", 80), ("Manager", 15), ("Admin", 5))
+PRIORITIES = (("Low", 30), ("Medium", 50), ("High", 20))
+SEVERITIES = (("Low", 35), ("Medium", 40), ("High", 18), ("Critical", 7))
+OPEN_TASK_STATUSES = (("To-Do", 5), ("In Progress", 3), ("Testing", 2))
+HARDWARE_STATUSES = (("Designed", 30), ("Prototyping", 40), ("Tested", 30))
+TEST_RESULTS = (("Pass", 70), ("Fail", 20), ("Partial", 10))
+DEVICE_STATUSES = (("Active", 85), ("Offline", 10), ("Maintenance", 5))
+FILE_TYPES = (("pdf", "application/pdf", 30), ("png", "image/png", 25), ("jpg", "image/jpeg", 20),
+              ("txt", "text/plain", 15), ("zip", "application/zip", 10))
+COMMENTS = ("Looks good to me", "Blocked on hardware delivery", "Pushed a fix, please retest",
+            "Customer asked for an update", "Can we move the deadline?", "Logs attached",
+            "Reproduced on the bench unit", "Done, closing", "Needs another review", "Field test passed")
+
+
+def default_counts(scale):
+    counts = {name: int(count * scale) for name, count in BASE_COUNTS.items()}
+    counts["users"] = max(counts["users"], 10)
+    counts["projects"] = max(counts["projects"], 1)
+    return counts
+
+
+def _picker(pairs, rand):
+    # Weighted choice over (value..., weight) tuples; cheaper per call than
+    # rng.choices. Pairs give the value, longer tuples everything but the weight.
+    values = [p[0] if len(p) == 2 else p[:-1] for p in pairs]
+    cumulative = list(accumulate(p[-1] for p in pairs))
+    total = cumulative[-1]
+    return lambda: values[bisect(cumulative, rand() * total)]
+
+
+def _zipf(n, skew, rng):
+    # n weights, a few large and a long tail, in random order
+    weights = [1 / (rank + 1) ** skew for rank in range(n)]
+    rng.shuffle(weights)
+    return weights
+
+
+def _allocate(total, weights):
+    # Splits total in proportion to weights, exactly (largest remainder)
+    if not weights or sum(weights) == 0:
+        return [0] * len(weights)
+    scale = total / sum(weights)
+    shares = [w * scale for w in weights]
+    counts = [int(s) for s in shares]
+    short = total - sum(counts)
+    for i in sorted(range(len(shares)), key=lambda i: counts[i] - shares[i])[:short]:
+        counts[i] += 1
+    return counts
+
+
+def _ts(value):
+    # Driver-neutral DATETIME literal (the ORM's type processing is skipped)
+    return value.isoformat(" ")[:19]
+
+
+def make_engine(uri):
+    if not uri.startswith("sqlite"):
+        return create_engine(uri)
+    # Parallel workers take turns on a SQLite file; data only, so no fsyncs
+    engine = create_engine(uri, connect_args={"timeout": 300})
+
+    @event.listens_for(engine, "connect")
+    def _fast(dbapi_conn, record):
+        dbapi_conn.execute("PRAGMA synchronous=OFF")
+        dbapi_conn.execute("PRAGMA journal_mode=MEMORY")
+    return engine
+
+
+def insert_rows(conn, table, columns, rows):
+    # executemany of tuples in `columns` order, BATCH rows at a time
+    if not rows:
+        return
+    compiled = table.insert().compile(dialect=conn.dialect, column_keys=columns)
+    if compiled.positional:
+        order = [columns.index(name) for name in compiled.positiontup]
+        if order != list(range(len(columns))):
+            rows = [tuple(row[i] for i in order) for row in rows]
+    else:
+        rows = [dict(zip(columns, row)) for row in rows]
+    for i in range(0, len(rows), BATCH):
+        conn.exec_driver_sql(compiled.string, rows[i:i + BATCH])
+
+
+def _users(rng, first_id, count):
+    role = _picker(ROLES, rng.random)
+    rows = []
+    for user_id in range(first_id, first_id + count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        rows.append((user_id, name, f"{name.split()[0].lower()}.{user_id}@example.com", None,
+                     role(), f"+60 1{rng.randrange(10)}-{rng.randrange(10 ** 7):07d}",
+                     rng.random() < 0.95))
+    return ["id", "name", "email", "password", "role", "phone", "is_approved"], rows
+
+
+def _projects(rng, first_id, count, as_of):
+    stage_of, priority = _picker(STAGES, rng.random), _picker(PRIORITIES, rng.random)
+    rows = []
+    for project_id in range(first_id, first_id + count):
+        stage = stage_of()
+        start = as_of - timedelta(days=rng.randrange(30, 720))
+        end = start + timedelta(days=rng.randrange(90, 540))
+        rows.append((project_id, f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {project_id}",
+                     " ".join(rng.choices(WORDS, k=12)), rng.choice(CUSTOMERS), start.isoformat(), end.isoformat(),
+                     "Completed" if stage == "Completed" else "Active", stage, priority(),
+                     round(rng.lognormvariate(9, 1), 2), round(rng.lognormvariate(8, 1), 2),
+                     round(rng.lognormvariate(7.5, 1), 2), round(rng.lognormvariate(6, 1.5), 2)))
+    columns = ["id", "name", "description", "customer", "start_date", "end_date", "status", "stage", "priority",
+               "manpower_cost", "equipment_cost", "material_cost", "additional_cost"]
+    return columns, rows
+
+
+def _members(rng, project_ids, user_ids, user_weights):
+    # 2-12 members per project, busy people on more projects
+    members = {}
+    cumulative = list(accumulate(user_weights))
+    for project_id in project_ids:
+        size = min(len(user_ids), 2 + int(rng.expovariate(1 / 4)), 12)
+        chosen = set()
+        while len(chosen) < size:
+            chosen.add(rng.choices(user_ids, cum_weights=cumulative)[0])
+        members[project_id] = sorted(chosen)
+    return members
+
+
+def _chunk(uri, job):
+    # Generates and inserts everything below a batch of projects. Runs in a
+    # pool process with --workers; its own RNG keeps it deterministic.
+    rng = random.Random(f"{job['seed']}-{job['index']}")
+    rand, expo = rng.random, rng.expovariate
+    pick = lambda seq: seq[int(rand() * len(seq))]
+    as_of = job["as_of"]
+    now = datetime.combine(as_of, datetime.min.time()) + timedelta(hours=12)
+    names = job["user_names"]
+    offsets = dict(job["offsets"])
+    priority, severity = _picker(PRIORITIES, rand), _picker(SEVERITIES, rand)
+    open_status, hardware_status = _picker(OPEN_TASK_STATUSES, rand), _picker(HARDWARE_STATUSES, rand)
+    result, device_status, file_type = _picker(TEST_RESULTS, rand), _picker(DEVICE_STATUSES, rand), _picker(FILE_TYPES, rand)
+    tables = {name: [] for name in PER_PROJECT}
+
+    for project_id, stage, start, members, counts in job["projects"]:
+        start = datetime.combine(date.fromisoformat(start), datetime.min.time())
+        span = (now - start).total_seconds()
+        age = max(1, int(span // 86400))
+        member_names = [names[user_id] for user_id in members]
+
+        # Task trees: a root, or a child of a recent task less than
+        # MAX_DEPTH deep. Created evenly over the project's life; the
+        # older a task, the likelier it is done.
+        first, n = offsets["tasks"], counts["tasks"]
+        rows = tables["tasks"]
+        depths, created = [], []
+        for i in range(n):
+            task_id = first + i
+            parent = None
+            if i and rand() < 0.55:
+                candidate = i - 1 - int(min(i - 1, expo(1 / 20)))
+                if depths[candidate] < MAX_DEPTH:
+                    parent = first + candidate
+            depths.append(0 if parent is None else depths[parent - first] + 1)
+            made = min(now, start + timedelta(seconds=int(span * i / n + rand() * 86400)))
+            created.append(made)
+            deadline = (made + timedelta(days=3 + int(rand() * 57))).date()
+            updated = made
+            if stage == "Completed" or rand() < min(0.9, (now - made).days / 120):
+                status = "Done"
+                updated = made + timedelta(seconds=int(rand() * min(30 * 86400, (now - made).total_seconds())))
+            elif deadline < as_of:
+                status = "Overdue"
+            else:
+                status = open_status()
+            assignee = pick(member_names) if rand() < 0.85 else pick(job["outsiders"])
+            rows.append((task_id, project_id, f"{pick(WORDS).title()} {pick(WORDS)} #{task_id}", None, assignee,
+                         status, priority(), deadline.isoformat(), parent, _ts(made), _ts(updated)))
+
+        # Comments and attachments, mostly on the project's older tasks
+        for i in range(counts["comments"]):
+            task_index = int(n * rand() ** 3) if n and rand() < 0.9 else None
+            when = created[task_index] if task_index is not None else start
+            when = min(now, when + timedelta(seconds=int(expo(1 / 72) * 3600)))
+            tables["comments"].append((offsets["comments"] + i, project_id,
+                                       None if task_index is None else first + task_index,
+                                       pick(member_names), pick(COMMENTS), _ts(when)))
+        for i in range(counts["attachments"]):
+            task_index = int(n * rand()) if n and rand() < 0.8 else None
+            ext, content_type = file_type()
+            file_name = f"{pick(WORDS)}-{offsets['attachments'] + i}.{ext}"
+            when = created[task_index] if task_index is not None else start
+            tables["attachments"].append((offsets["attachments"] + i, None if task_index is None else first + task_index,
+                                          project_id, file_name, f"uploads/{file_name}",
+                                          int(rng.lognormvariate(12, 1.5)), content_type, _ts(min(now, when))))
+
+        for i in range(counts["issues"]):
+            made = start + timedelta(seconds=int(rand() * span))
+            closed = rand() < min(0.85, (now - made).days / 90)
+            status = pick(("Closed", "Resolved")) if closed else pick(("Open", "Open", "In Progress"))
+            tables["issues"].append((offsets["issues"] + i, project_id,
+                                     f"{pick(WORDS).title()} {pick(('fails', 'drops', 'times out', 'resets', 'drifts'))}",
+                                     " ".join([pick(WORDS) for _ in range(8)]), status, priority(), severity(),
+                                     pick(member_names), _ts(made)))
+
+        for i in range(counts["hardware"]):
+            tables["hardware"].append((offsets["hardware"] + i, project_id, f"{pick(PARTS)} rev {chr(65 + i % 6)}",
+                                       hardware_status(), None))
+        for i in range(counts["firmware"]):
+            made = start + timedelta(seconds=int(span * (i + 1) / (counts["firmware"] + 1)))
+            tables["firmware"].append((offsets["firmware"] + i, project_id, f"1.{i // 5}.{i % 5}",
+                                       f"{pick(('Fix', 'Add', 'Improve'))} {pick(WORDS)}", None, _ts(made)))
+        for i in range(counts["tests"]):
+            day = (start + timedelta(days=int(rand() * age))).date()
+            tables["tests"].append((offsets["tests"] + i, project_id, f"{pick(WORDS).title()} test {i + 1}",
+                                    day.isoformat(), result(), None))
+        for i in range(counts["devices"]):
+            device_id = offsets["devices"] + i
+            status = device_status()
+            if rand() < 0.03:
+                last_ping = None  # never came online
+            elif status == "Active":
+                last_ping = _ts(now - timedelta(seconds=int(expo(1 / 60))))
+            else:
+                last_ping = _ts(now - timedelta(seconds=int(expo(1 / 48) * 3600)))
+            tables["devices"].append((device_id, project_id, f"SN{device_id:09d}", status, pick(CITIES), last_ping))
+
+        for name in PER_PROJECT:
+            offsets[name] += counts[name]
+
+    columns = {
+        "tasks": ["id", "project_id", "name", "description", "assigned_to", "status", "priority", "deadline",
+                  "parent_id", "created_at", "updated_at"],
+        "comments": ["id", "project_id", "task_id", "user_name", "content", "created_at"],
+        "attachments": ["id", "task_id", "project_id", "file_name", "file_url", "size", "content_type", "uploaded_at"],
+        "issues": ["id", "project_id", "title", "description", "status", "priority", "severity", "assigned_to",
+                   "created_at"],
+        "hardware": ["id", "project_id", "name", "status", "datasheet_url"],
+        "firmware": ["id", "project_id", "version", "changelog", "build_url", "created_at"],
+        "tests": ["id", "project_id", "name", "date", "result", "report_url"],
+        "devices": ["id", "project_id", "serial_number", "status", "location", "last_ping"],
+    }
+    engine = make_engine(uri)
+    try:
+        with engine.begin() as conn:
+            for name, model in PER_PROJECT.items():
+                insert_rows(conn, model.__table__, columns[name], tables[name])
+    finally:
+        engine.dispose()
+    return {name: len(rows) for name, rows in tables.items()}
+
+
+def seed(uri, counts, seed=1, workers=1, as_of=None, progress=None):
+    # Adds `counts` rows (keys of BASE_COUNTS) after whatever is already in
+    # the database. Returns the rows inserted per table.
+    as_of = as_of or date.today()
+    engine = make_engine(uri)
+    db.metadata.create_all(engine)
+    rng = random.Random(f"{seed}-plan")
+
+    with engine.connect() as conn:
+        offsets = {name: (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+                   for name, model in list(PER_PROJECT.items()) + [("users", User), ("projects", Project)]}
+
+    user_columns, users = _users(rng, offsets["users"], counts["users"])
+    project_columns, projects = _projects(rng, offsets["projects"], counts["projects"], as_of)
+    user_ids = [row[0] for row in users]
+    user_names = {row[0]: row[1] for row in users}
+    user_weights = _zipf(len(user_ids), USER_SKEW, rng)
+    members = _members(rng, [p[0] for p in projects], user_ids, user_weights)
+    with engine.begin() as conn:
+        insert_rows(conn, User.__table__, user_columns, users)
+        insert_rows(conn, Project.__table__, project_columns, projects)
+        insert_rows(conn, project_members, ["project_id", "user_id"],
+                    [(project_id, user_id) for project_id, ids in members.items() for user_id in ids])
+    inserted = {"users": len(users), "projects": len(projects),
+                "members": sum(len(ids) for ids in members.values())}
+
+    # Per-project row counts: big projects get more of everything, and
+    # devices only go to projects that have shipped
+    size = _zipf(len(projects), PROJECT_SKEW, rng)
+    shipped = [w if p[7] in ("Deployment", "Completed") else 0 for w, p in zip(size, projects)]
+    if not any(shipped):
+        shipped = size
+    per_project = {name: _allocate(counts[name], shipped if name == "devices" else size) for name in PER_PROJECT}
+
+    # The busiest users also pick up tasks outside their projects
+    outsiders = [user_names[user_id] for _, user_id in sorted(zip(user_weights, user_ids), reverse=True)[:5]]
+    jobs = []
+    for index, begin in enumerate(range(0, len(projects), CHUNK_PROJECTS)):
+        batch = range(begin, min(begin + CHUNK_PROJECTS, len(projects)))
+        jobs.append({
+            "seed": seed, "index": index, "as_of": as_of, "offsets": dict(offsets), "outsiders": outsiders,
+            "user_names": {user_id: user_names[user_id] for i in batch for user_id in members[projects[i][0]]},
+            "projects": [(projects[i][0], projects[i][7], projects[i][4], members[projects[i][0]],
+                          {name: per_project[name][i] for name in PER_PROJECT}) for i in batch],
+        })
+        for name in PER_PROJECT:
+            offsets[name] += sum(per_project[name][i] for i in batch)
+    engine.dispose()
+
+    def done(result):
+        for name, count in result.items():
+            inserted[name] = inserted.get(name, 0) + count
+        if progress:
+            progress(inserted)
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            for result in pool.map(_chunk, [uri] * len(jobs), jobs):
+                done(result)
+    else:
+        for job in jobs:
+            done(_chunk(uri, job))
+    return inserted
+
+
+def finish(uri):
+    # Recounts project_stats and bumps the collection versions, so running
+    # servers don't answer with ETags from before the seed
+    Config.SQLALCHEMY_DATABASE_URI = uri
+    Config.DEADLINE_SCHEDULER_ENABLED = False
+    from app import create_app
+    from utils.project_counters import rebuild_project_stats
+    from utils.versions import bump_versions
+    from models.collection_version import CollectionVersion
+    app = create_app(prefork=True)
+    with app.app_context():
+        rebuild_project_stats()
+        scopes = {scope for (scope,) in db.session.query(CollectionVersion.scope)}
+        bump_versions(db.session.connection(), scopes | {"projects", "tasks", "issues"})
+        db.session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate test data in bulk")
+    parser.add_argument("--db", default=Config.SQLALCHEMY_DATABASE_URI, help="database URI (default: from MYSQL_*)")
+    parser.add_argument("--scale", type=float, default=1.0, help="1 = about a million rows")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1, help="insert processes")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="date the data is relative to (default today)")
+    for name in BASE_COUNTS:
+        parser.add_argument(f"--{name}", type=int, help=f"rows (default {BASE_COUNTS[name]} x scale)")
+    args = parser.parse_args()
+
+    counts = default_counts(args.scale)
+    counts.update({name: getattr(args, name) for name in BASE_COUNTS if getattr(args, name) is not None})
+    print("Seeding " + ", ".join(f"{count} {name}" for name, count in counts.items()), flush=True)
+
+    started = time.perf_counter()
+    total = [0]
+
+    def progress(inserted):
+        rows = sum(inserted.values())
+        if rows - total[0] >= 100000:
+            total[0] = rows
+            print(f"  {rows} rows, {time.perf_counter() - started:.1f}s", flush=True)
+
+    inserted = seed(args.db, counts, args.seed, args.workers, args.as_of, progress)
+    rows = sum(inserted.values())
+    elapsed = time.perf_counter() - started
+    print(f"Inserted {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)", flush=True)
+    finish(args.db)
+    print(f"Project counters and collection versions updated, {time.perf_counter() - started:.1f}s total")
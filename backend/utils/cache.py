@@ -0,0 +1,64 @@
+import threading
+import time
+from flask import request
+
+
+class TTLCache:
+    # Small in-process cache. Each worker keeps its own copy, so entries also
+    # expire after `ttl` seconds to bound staleness across workers.
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._data = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+
+    def get_or_set(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            generation = self._generation
+            value = compute()
+            with self._lock:
+                # Don't store a value computed before an invalidation landed
+                if generation == self._generation:
+                    self._data[key] = (value, time.monotonic() + self.ttl)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            if not keys:
+                self._data.clear()
+            for key in keys:
+                self._data.pop(key, None)
+
+
+# Shared cache for the dashboard aggregates in stats_controller
+stats_cache = TTLCache()
+
+
+def invalidate_on_write(app, cache, *blueprints):
+    # Drop cached entries whenever a successful write goes through one of the
+    # given blueprints.
+    names = {bp.name for bp in blueprints}
+
+    @app.after_request
+    def _invalidate(response):
+        if request.blueprint in names and request.method not in ("GET", "HEAD", "OPTIONS") \
+                and response.status_code < 400:
+            cache.invalidate()
+        return response
@@ -1,2 +1,151 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from flask import request
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import SelectBase
+
+# Engine setup, connection pool metrics and read-replica routing.
+#
+# With DB_REPLICA_URIS set, each replica is registered as a bind
+# ("replica0", "replica1", ...) and GET/HEAD requests read from one of them,
+# picked per request. Everything else uses the primary: writes, SELECT ...
+# FOR UPDATE, raw connections (session.connection()), background threads,
+# and any read after the request has written. A client that just wrote
+# gets a deadline DB_REPLICA_STICKY_SECONDS ahead, as a cookie and in the
+# X-DB-Primary-Until response header; until then its GETs that carry it
+# back (the cookie, or the header for cross-origin XHR, which sends no
+# cookies) read the primary, so it reads its own writes despite replica lag.
+
+REPLICA_KEY = "read_replica"
+WROTE_KEY = "wrote"
+STICKY_COOKIE = "db_primary_until"
+STICKY_HEADER = "X-DB-Primary-Until"
+READ_METHODS = ("GET", "HEAD")
+
+
+def _is_read(clause):
+    return isinstance(clause, SelectBase) and getattr(clause, "_for_update_arg", None) is None
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            replica = self.info.get(REPLICA_KEY)
+            if replica and not self._flushing and not self.info.get(WROTE_KEY) and _is_read(clause):
+                return self._db.engines[replica]
+            if isinstance(clause, UpdateBase):
+                self.info[WROTE_KEY] = True
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    session.info[WROTE_KEY] = True
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+class PoolMetrics:
+    # Counters from pool events plus the pools' own gauges, per bind
+    def __init__(self):
+        self.engines = {}
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.routing = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def watch(self, name, engine):
+        self.engines[name] = engine
+        for event_name in ("connect", "checkout", "invalidate"):
+            event.listen(engine.pool, event_name, self._counter(name, event_name))
+
+    def _counter(self, name, event_name):
+        def count(*args):
+            with self._lock:
+                self.counters[name][event_name] += 1
+        return count
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.routing.clear()
+
+    def routed(self, target):
+        with self._lock:
+            self.routing[target] += 1
+
+    def snapshot(self):
+        pools = {}
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            stats = {"pool": type(pool).__name__}
+            if hasattr(pool, "checkedout"):
+                stats.update(size=pool.size(), checked_out=pool.checkedout(),
+                             checked_in=pool.checkedin(), overflow=pool.overflow())
+            with self._lock:
+                stats.update(connects=self.counters[name]["connect"],
+                             checkouts=self.counters[name]["checkout"],
+                             invalidated=self.counters[name]["invalidate"])
+            pools[name] = stats
+        with self._lock:
+            return {"pools": pools, "requests": dict(self.routing)}
+
+
+pool_metrics = PoolMetrics()
+
+
+def engine_options(app):
+    # Pre-ping replaces connections MariaDB closed after wait_timeout;
+    # recycle retires them before that happens. Sizing only applies to
+    # server databases (SQLite in-memory pools take no size).
+    options = {
+        "pool_pre_ping": app.config["DB_POOL_PRE_PING"],
+        "pool_recycle": app.config["DB_POOL_RECYCLE"],
+    }
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        options.update(pool_size=app.config["DB_POOL_SIZE"], max_overflow=app.config["DB_MAX_OVERFLOW"],
+                       pool_timeout=app.config["DB_POOL_TIMEOUT"])
+    return options
+
+
+def init_db(app):
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app))
+    replicas = [f"replica{i}" for i in range(len(app.config["DB_REPLICA_URIS"]))]
+    if replicas:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds.update(zip(replicas, app.config["DB_REPLICA_URIS"]))
+        app.config["SQLALCHEMY_BINDS"] = binds
+    db.init_app(app)
+
+    with app.app_context():
+        for key, engine in db.engines.items():
+            pool_metrics.watch(key or "primary", engine)
+
+    if not replicas:
+        return
+
+    @app.before_request
+    def _route_reads():
+        if request.method not in READ_METHODS:
+            return
+        until = max(request.cookies.get(STICKY_COOKIE, type=float, default=0),
+                    request.headers.get(STICKY_HEADER, type=float, default=0))
+        if until > time.time():
+            pool_metrics.routed("sticky")
+            return
+        db.session.info[REPLICA_KEY] = random.choice(replicas)
+        pool_metrics.routed("replica")
+
+    @app.after_request
+    def _stick_after_write(response):
+        if request.method not in READ_METHODS and db.session.info.get(WROTE_KEY):
+            sticky = app.config["DB_REPLICA_STICKY_SECONDS"]
+            until = str(time.time() + sticky)
+            response.set_cookie(STICKY_COOKIE, until, max_age=sticky, httponly=True)
+            response.headers[STICKY_HEADER] = until
+        return response
@@ -0,0 +1,210 @@
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, time as dt_time
+from sqlalchemy import func, text
+from utils.db import db
+from utils.cache import stats_cache
+from utils.versions import bump
+from utils.events import record_bulk
+from utils.project_counters import track_bulk_tasks
+from models.task import Task
+
+logger = logging.getLogger(__name__)
+
+# Tasks due within this many days get bumped to High priority
+ESCALATION_DAYS = 3
+# Ids per UPDATE ... WHERE id IN (...)
+UPDATE_BATCH = 1000
+# MariaDB named lock held while a worker sweeps
+SWEEP_LOCK = "iot_tracking_deadline_sweep"
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10]) if value else None
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def apply_deadline_rules(t, today=None):
+    # Row-level version of the sweep for the write paths, so a task that is
+    # created or edited past a boundary is stored correctly straight away.
+    today = today or date.today()
+    deadline = _as_date(t.deadline)
+    if deadline is None or t.status is None or t.status == 'Done':
+        return
+    if deadline < today and t.status != 'Overdue':
+        t.status = 'Overdue'
+    if today <= deadline <= today + timedelta(days=ESCALATION_DAYS) \
+            and t.priority is not None and t.priority != 'High':
+        t.priority = 'High'
+
+
+def _lock_and_update(criteria, values):
+    # Locks the matching rows first (SELECT ... FOR UPDATE, in the sweep's
+    # transaction) and updates exactly those, so the per-project counts
+    # describe the rows that changed: a concurrent sweep waits and then
+    # finds nothing, and a task edited meanwhile is either in or out of
+    # both. Returns {project_id: rows updated}.
+    rows = db.session.query(Task.id, Task.project_id).filter(*criteria)\
+        .order_by(Task.id).with_for_update().all()
+    ids = [task_id for task_id, _ in rows]
+    for start in range(0, len(ids), UPDATE_BATCH):
+        Task.query.filter(Task.id.in_(ids[start:start + UPDATE_BATCH]))\
+            .update(values, synchronize_session=False)
+    return Counter(project_id for _, project_id in rows)
+
+
+def apply_deadline_transitions(today=None):
+    # Set-based sweep: mark overdue tasks and escalate tasks due soon.
+    # Returns (overdue_count, escalated_count).
+    today = today or date.today()
+
+    newly_overdue = _lock_and_update((
+        Task.deadline != None,
+        Task.deadline < today,
+        Task.status != 'Done',
+        Task.status != 'Overdue'
+    ), {Task.status: 'Overdue'})
+    overdue_count = sum(newly_overdue.values())
+    newly_overdue.pop(None, None)
+    track_bulk_tasks({pid: {'overdue_tasks': count} for pid, count in newly_overdue.items()}, 1)
+
+    escalated = _lock_and_update((
+        Task.deadline != None,
+        Task.deadline >= today,
+        Task.deadline <= today + timedelta(days=ESCALATION_DAYS),
+        Task.status != 'Done',
+        Task.priority != 'High'
+    ), {Task.priority: 'High'})
+    escalated_count = sum(escalated.values())
+    escalated.pop(None, None)
+
+    # Bulk UPDATEs skip the flush hook that normally bumps list versions
+    changed_projects = set(newly_overdue) | set(escalated)
+    if overdue_count or escalated_count:
+        bump("tasks", *[f"tasks:{pid}" for pid in changed_projects])
+        record_bulk("task", changed_projects)
+
+    db.session.commit()
+    if overdue_count or escalated_count:
+        stats_cache.invalidate()
+    return overdue_count, escalated_count
+
+
+def next_transition_date(today=None):
+    # Every boundary falls on a midnight: a task turns overdue the day after
+    # its deadline and escalates ESCALATION_DAYS before it. Both lookups are
+    # MIN() over the deadline index, so this stays cheap on large tables.
+    today = today or date.today()
+
+    next_overdue = db.session.query(func.min(Task.deadline)).filter(
+        Task.deadline >= today,
+        Task.status != 'Done',
+        Task.status != 'Overdue'
+    ).scalar()
+    next_escalation = db.session.query(func.min(Task.deadline)).filter(
+        Task.deadline > today + timedelta(days=ESCALATION_DAYS),
+        Task.status != 'Done',
+        Task.priority != 'High'
+    ).scalar()
+
+    candidates = []
+    if next_overdue:
+        candidates.append(_as_date(next_overdue) + timedelta(days=1))
+    if next_escalation:
+        candidates.append(_as_date(next_escalation) - timedelta(days=ESCALATION_DAYS))
+    return min(candidates) if candidates else None
+
+
+@contextmanager
+def sweep_lock():
+    # GET_LOCK on its own connection, so it outlives the sweep's commits and
+    # is released with the connection if the process dies. SQLite (one
+    # development process) has no such lock and doesn't need one.
+    engine = db.engine
+    if engine.dialect.name not in ("mysql", "mariadb"):
+        yield True
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": SWEEP_LOCK}).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": SWEEP_LOCK})
+
+
+class DeadlineScheduler:
+    # Background thread that sleeps until the next deadline boundary and then
+    # runs apply_deadline_transitions(). Task writes call reschedule() so a
+    # nearer boundary is picked up; max_sleep bounds how long writes made by
+    # other workers can go unnoticed.
+    def __init__(self):
+        self.app = None
+        self.max_sleep = 3600
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.max_sleep = app.config["DEADLINE_SCHEDULER_MAX_SLEEP"]
+        # Under a pre-forking server each worker starts it after the fork
+        # (utils/workers.py); a thread started here wouldn't survive it
+        if app.config["DEADLINE_SCHEDULER_ENABLED"] and not app.config["PREFORK"]:
+            self.start()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="deadline-scheduler", daemon=True)
+        self._thread.start()
+
+    def reschedule(self):
+        self._wakeup.set()
+
+    def sweep(self):
+        # Every worker runs a scheduler and they all wake at the same
+        # boundaries; only the one holding the lock sweeps
+        with self.app.app_context():
+            try:
+                with sweep_lock() as acquired:
+                    if not acquired:
+                        logger.debug("Deadline sweep already running elsewhere, skipped")
+                        return
+                    overdue, escalated = apply_deadline_transitions()
+                if overdue or escalated:
+                    logger.info("Deadline sweep: %s overdue, %s escalated", overdue, escalated)
+            finally:
+                db.session.remove()
+
+    def seconds_until_next(self):
+        with self.app.app_context():
+            try:
+                fire_on = next_transition_date()
+            finally:
+                db.session.remove()
+        if fire_on is None:
+            return self.max_sleep
+        delay = (datetime.combine(fire_on, dt_time.min) - datetime.now()).total_seconds()
+        return max(0, min(delay, self.max_sleep))
+
+    def _run(self):
+        due = True
+        while True:
+            try:
+                if due:
+                    self.sweep()
+                delay = self.seconds_until_next()
+            except Exception:
+                logger.exception("Deadline sweep failed")
+                delay = 60
+            # Woken early by reschedule(): just recompute the next boundary
+            due = not self._wakeup.wait(delay)
+            self._wakeup.clear()
+
+
+deadline_scheduler = DeadlineScheduler()
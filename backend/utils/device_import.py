@@ -0,0 +1,202 @@
+import codecs
+import csv
+import json
+from datetime import datetime, timezone
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from utils.db import db
+from utils.errors import ValidationError
+from utils.versions import bump
+from utils.events import record_bulk
+from models.tracking import DeploymentDevice
+
+# Streaming bulk import of deployment devices. Rows are read one at a time
+# from the upload (CSV or NDJSON), validated, and upserted on the unique
+# serial_number index CHUNK_SIZE rows per INSERT ... ON DUPLICATE KEY
+# UPDATE, committing after each chunk. A chunk the database rejects is split
+# and retried down to single rows, so good rows still land and each bad one
+# is reported with its own error. Only the current chunk and at most
+# MAX_ERRORS error entries are held in memory, whatever the file size.
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 1000
+DEVICE_STATUSES = ("Active", "Offline", "Maintenance")
+IMPORT_COLUMNS = ("serial_number", "status", "location", "last_ping")
+
+
+def iter_records(stream, fmt):
+    # (line number, dict) pairs from a binary stream
+    text = codecs.getreader("utf-8-sig")(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        if "serial_number" not in (reader.fieldnames or ()):
+            raise ValidationError("CSV header must include serial_number")
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_no, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, "Invalid JSON"
+                continue
+            yield line_no, record if isinstance(record, dict) else "Each line must be a JSON object"
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def validate_record(record):
+    # Column values for the upsert, or raises ValueError. Blank fields
+    # leave the stored value alone.
+    serial = _clean(record.get("serial_number"))
+    if not serial:
+        raise ValueError("serial_number is required")
+    if len(serial) > 100:
+        raise ValueError("serial_number is longer than 100 characters")
+
+    status = _clean(record.get("status"))
+    if status is not None and status not in DEVICE_STATUSES:
+        raise ValueError(f"status must be one of {', '.join(DEVICE_STATUSES)}")
+
+    location = _clean(record.get("location"))
+    if location is not None and len(location) > 255:
+        raise ValueError("location is longer than 255 characters")
+
+    last_ping = _clean(record.get("last_ping"))
+    if last_ping is not None:
+        try:
+            last_ping = datetime.fromisoformat(last_ping.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError("last_ping is not an ISO 8601 timestamp")
+        if last_ping.tzinfo is not None:
+            last_ping = last_ping.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return {"serial_number": serial, "status": status, "location": location, "last_ping": last_ping}
+
+
+def upsert_devices(project_id, rows):
+    # rows: validated dicts with distinct serial numbers. Returns how many
+    # serials already existed (updated rather than inserted) and the
+    # projects they belonged to.
+    table = DeploymentDevice.__table__
+    counts = db.session.execute(
+        select(table.c.project_id, func.count()).group_by(table.c.project_id)
+        .where(table.c.serial_number.in_([r["serial_number"] for r in rows]))
+    ).all()
+
+    # Executed as an executemany of one cached statement: pymysql folds it
+    # back into a single multi-row INSERT ... ON DUPLICATE KEY UPDATE, and
+    # SQLAlchemy doesn't recompile a 1000-row VALUES clause per chunk
+    values = [dict(r, project_id=project_id) for r in rows]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql_insert(table)
+        new = stmt.inserted
+        stmt = stmt.on_duplicate_key_update(
+            project_id=new.project_id,
+            **{c: func.coalesce(getattr(new, c), table.c[c]) for c in IMPORT_COLUMNS if c != "serial_number"}
+        )
+    else:
+        stmt = sqlite_insert(table)
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.serial_number], set_=dict(
+            project_id=new.project_id,
+            **{c: func.coalesce(getattr(new, c), table.c[c]) for c in IMPORT_COLUMNS if c != "serial_number"}
+        ))
+    db.session.execute(stmt, values)
+    return sum(count for _, count in counts), {pid for pid, _ in counts if pid is not None}
+
+
+class ImportReport:
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, serial, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "serial_number": serial, "error": message})
+
+    def to_dict(self):
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _db_error(e):
+    # The driver's message, e.g. (1292, "Incorrect datetime value: ...")
+    return str(getattr(e, "orig", None) or e)[:500]
+
+
+def import_devices(project_id, stream, fmt, chunk_size=CHUNK_SIZE):
+    report = ImportReport()
+    chunk = {}
+    projects = {project_id}
+
+    def write(entries):
+        # entries: [(line, row)]
+        try:
+            existing, moved_from = upsert_devices(project_id, [row for _, row in entries])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            if len(entries) == 1 or getattr(e, "connection_invalidated", False):
+                # A lost connection isn't about the rows: no point splitting
+                for line, row in entries:
+                    report.error(line, row["serial_number"], _db_error(e))
+                return
+            middle = len(entries) // 2
+            write(entries[:middle])
+            write(entries[middle:])
+            return
+        report.updated += existing
+        projects.update(moved_from)
+        report.inserted += len(entries) - existing
+
+    def flush():
+        if chunk:
+            write(list(chunk.values()))
+        chunk.clear()
+
+    for line, record in iter_records(stream, fmt):
+        report.processed += 1
+        if isinstance(record, str):
+            report.error(line, None, record)
+            continue
+        try:
+            row = validate_record(record)
+        except ValueError as e:
+            report.error(line, _clean(record.get("serial_number")), str(e))
+            continue
+        serial = row["serial_number"]
+        if serial in chunk:
+            # Later rows win; the earlier one is reported so it isn't lost silently
+            report.error(chunk[serial][0], serial, f"Superseded by line {line}")
+        chunk[serial] = (line, row)
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+
+    if report.inserted or report.updated:
+        # Multi-row INSERTs skip the flush hooks that bump versions / feed events
+        bump(*[f"deployment:{pid}" for pid in projects])
+        record_bulk("deployment", projects)
+        db.session.commit()
+    return report
@@ -0,0 +1,260 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect, select, func
+from sqlalchemy.orm import Session
+from utils.db import db
+from models.change_event import ChangeEvent
+from models.task import Task
+from models.issue import Issue
+from models.comment import Comment
+from models.tracking import HardwareComponent, FirmwareVersion, TestSession, DeploymentDevice
+
+logger = logging.getLogger(__name__)
+
+# Change feed behind /api/events. Writes to the models below append rows to
+# change_events inside the same transaction (so rolled back writes never
+# show up), and after_commit wakes this worker's poller. The poller is the
+# only thing that reads change_events: one query per interval per worker,
+# however many clients are connected. New rows are formatted once into SSE
+# messages and kept in a ring buffer; subscribers all wait on one shared
+# condition and read from that buffer, so an idle subscriber is just a
+# parked generator with no queue or thread of its own.
+
+EVENT_TOPICS = {
+    Task: "task",
+    Issue: "issue",
+    Comment: "comment",
+    HardwareComponent: "hardware",
+    FirmwareVersion: "firmware",
+    TestSession: "testing",
+    DeploymentDevice: "deployment",
+}
+
+_PENDING_KEY = "change_events_pending"
+
+# Seconds to wait for an id gap in change_events to fill (see _settled)
+GAP_GRACE = 2
+
+
+def _history(state, attr):
+    if attr not in state.attrs:
+        return []
+    history = state.attrs[attr].history
+    values = list(history.added) + list(history.unchanged) + list(history.deleted)
+    return list(dict.fromkeys(v for v in values if v is not None))
+
+
+def _event_rows(session):
+    rows = []
+    changes = [(obj, "created") for obj in session.new] + \
+              [(obj, "deleted") for obj in session.deleted] + \
+              [(obj, "updated") for obj in session.dirty if session.is_modified(obj)]
+    for obj, action in changes:
+        topic = EVENT_TOPICS.get(type(obj))
+        if topic is None:
+            continue
+        state = inspect(obj)
+        task_id = obj.id if topic == "task" else getattr(obj, "task_id", None)
+        # A task moved to another project shows up in both feeds
+        for project_id in _history(state, "project_id") or [None]:
+            rows.append({"topic": topic, "action": action, "object_id": obj.id,
+                         "project_id": project_id, "task_id": task_id})
+
+    # Task comments don't carry a project id; look it up so project feeds
+    # still see them
+    missing = {r["task_id"] for r in rows if r["project_id"] is None and r["task_id"]}
+    if missing:
+        projects = dict(session.connection().execute(
+            select(Task.id, Task.project_id).where(Task.id.in_(missing))
+        ).all())
+        for r in rows:
+            if r["project_id"] is None and r["task_id"]:
+                r["project_id"] = projects.get(r["task_id"])
+    return rows
+
+
+def record_events(connection, session, rows):
+    if not rows:
+        return
+    connection.execute(ChangeEvent.__table__.insert(), rows)
+    session.info[_PENDING_KEY] = True
+
+
+def record_bulk(topic, project_ids):
+    # For bulk UPDATE/DELETE statements, which bypass the flush hook.
+    # Clients treat "bulk" as "refetch this project's list".
+    rows = [{"topic": topic, "action": "bulk", "object_id": None, "project_id": pid, "task_id": None}
+            for pid in sorted(project_ids, key=lambda p: (p is None, p))]
+    record_events(db.session.connection(), db.session(), rows)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_after_flush(session, flush_context):
+    rows = _event_rows(session)
+    if rows:
+        record_events(session.connection(), session, rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_after_commit(session):
+    if session.info.pop(_PENDING_KEY, False):
+        event_hub.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def format_event(row):
+    data = json.dumps({
+        "action": row.action,
+        "id": row.object_id,
+        "project_id": row.project_id,
+        "task_id": row.task_id,
+    }, separators=(",", ":"))
+    return f"id: {row.id}\nevent: {row.topic}\ndata: {data}\n\n"
+
+
+def load_events(after_id, limit):
+    # [(id, project_id, topic, message)] after `after_id`, or None when rows the
+    # client hasn't seen were already pruned
+    oldest = db.session.query(func.min(ChangeEvent.id)).scalar()
+    if oldest is not None and after_id < oldest - 1:
+        return None
+    rows = ChangeEvent.query.filter(ChangeEvent.id > after_id)\
+        .order_by(ChangeEvent.id).limit(limit).all()
+    return [(r.id, r.project_id, r.topic, format_event(r)) for r in rows]
+
+
+class EventHub:
+    # Per-worker fan-out. `floor` is the highest id no longer (or never) in
+    # the buffer: subscribers behind it catch up from the database instead.
+    def __init__(self, capacity=2048):
+        self.app = None
+        self.poll_interval = 1.0
+        self.retention = timedelta(hours=24)
+        self.last_id = 0
+        self.floor = 0
+        self._buffer = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._pruned_at = 0
+        self._gap_since = None
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_interval = app.config["EVENTS_POLL_INTERVAL"]
+        self.retention = timedelta(hours=app.config["EVENTS_RETENTION_HOURS"])
+
+    def start(self):
+        # Started by the first subscriber, so workers nobody listens to
+        # never poll
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            with self.app.app_context():
+                try:
+                    latest = db.session.query(func.max(ChangeEvent.id)).scalar() or 0
+                finally:
+                    db.session.remove()
+            with self._cond:
+                self.last_id = self.floor = max(self.last_id, latest)
+            self._thread = threading.Thread(target=self._run, name="event-hub", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def publish(self, events):
+        # events: [(id, project_id, topic, message)] in id order
+        with self._cond:
+            for item in events:
+                if item[0] <= self.last_id:
+                    continue
+                if len(self._buffer) == self._buffer.maxlen:
+                    self.floor = self._buffer[0][0]
+                self._buffer.append(item)
+                self.last_id = item[0]
+            self._cond.notify_all()
+
+    def _since(self, after_id):
+        if after_id < self.floor:
+            return None
+        # Walk back from the newest entry; caught-up subscribers only look
+        # at the few events they're missing
+        items = []
+        for item in reversed(self._buffer):
+            if item[0] <= after_id:
+                break
+            items.append(item)
+        items.reverse()
+        return items
+
+    def wait(self, after_id, timeout):
+        # New events after `after_id` (empty on timeout), or None when the
+        # caller is behind the buffer and must read from the database
+        with self._cond:
+            if after_id >= self.last_id:
+                self._cond.wait_for(lambda: self.last_id > after_id, timeout)
+            return self._since(after_id)
+
+    def _settled(self, rows):
+        # Ids are handed out at INSERT but become visible at COMMIT, so a
+        # gap may be a transaction that hasn't committed yet. Hold back rows
+        # after a gap for GAP_GRACE seconds before assuming it rolled back;
+        # otherwise the late row would land behind subscribers' cursors.
+        expected, ready = self.last_id + 1, []
+        for r in rows:
+            if r.id != expected:
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < GAP_GRACE:
+                    break
+            self._gap_since = None
+            ready.append(r)
+            expected = r.id + 1
+        return ready
+
+    def poll(self):
+        with self.app.app_context():
+            try:
+                while True:
+                    rows = ChangeEvent.query.filter(ChangeEvent.id > self.last_id)\
+                        .order_by(ChangeEvent.id).limit(500).all()
+                    ready = self._settled(rows)
+                    if not ready:
+                        break
+                    self.publish([(r.id, r.project_id, r.topic, format_event(r)) for r in ready])
+                    if len(ready) < len(rows):
+                        break
+                self._prune()
+            finally:
+                db.session.remove()
+
+    def _prune(self):
+        if time.monotonic() - self._pruned_at < 600:
+            return
+        self._pruned_at = time.monotonic()
+        ChangeEvent.query.filter(ChangeEvent.created_at < datetime.now() - self.retention)\
+            .delete(synchronize_session=False)
+        db.session.commit()
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Change event poll failed")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+event_hub = EventHub()
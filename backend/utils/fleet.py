@@ -0,0 +1,206 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from utils.db import db
+from utils.telemetry import to_epoch
+from models.tracking import DeploymentDevice
+
+# Per-worker index of deployed devices ordered by last_ping. For every
+# project it keeps a sorted list of (last_ping epoch, device id) plus the
+# set of devices that never pinged, so "online", "offline" and "went
+# offline in the last N minutes" are each a couple of bisects instead of a
+# table scan.
+#
+# Heartbeats handled by this worker update it directly. Pings taken by
+# other workers arrive with an incremental read of rows whose last_ping
+# moved past the watermark (refresh_interval), and a full rebuild every
+# rebuild_interval picks up devices added, moved or deleted elsewhere.
+
+FLEET_STATES = ("online", "offline", "recently_offline", "never")
+
+
+class FleetIndex:
+    def __init__(self, offline_after=120, refresh_interval=10, refresh_lookback=15, rebuild_interval=300):
+        self.offline_after = offline_after
+        self.refresh_interval = refresh_interval
+        self.refresh_lookback = refresh_lookback
+        self.rebuild_interval = rebuild_interval
+        self._devices = {}
+        self._by_serial = {}
+        self._pings = defaultdict(list)
+        self._never = defaultdict(set)
+        self._watermark = None
+        self._built_at = None
+        self._refreshed_at = 0
+        self._lock = threading.RLock()
+
+    def init_app(self, app):
+        self.offline_after = app.config["FLEET_OFFLINE_AFTER"]
+        self.refresh_interval = app.config["FLEET_REFRESH_INTERVAL"]
+        self.refresh_lookback = app.config["FLEET_REFRESH_LOOKBACK"]
+        self.rebuild_interval = app.config["FLEET_REBUILD_INTERVAL"]
+
+    def _add(self, device_id, project_id, serial, ts):
+        self._devices[device_id] = (project_id, serial, ts)
+        if serial:
+            self._by_serial[serial] = device_id
+        if ts is None:
+            self._never[project_id].add(device_id)
+        else:
+            insort(self._pings[project_id], (ts, device_id))
+
+    def _remove(self, device_id):
+        entry = self._devices.pop(device_id, None)
+        if entry is None:
+            return None
+        project_id, serial, ts = entry
+        if serial and self._by_serial.get(serial) == device_id:
+            del self._by_serial[serial]
+        if ts is None:
+            self._never[project_id].discard(device_id)
+        else:
+            pings = self._pings[project_id]
+            i = bisect_left(pings, (ts, device_id))
+            if i < len(pings) and pings[i] == (ts, device_id):
+                del pings[i]
+        return entry
+
+    def rebuild(self):
+        rows = db.session.query(DeploymentDevice.id, DeploymentDevice.project_id,
+                                DeploymentDevice.serial_number, DeploymentDevice.last_ping).all()
+        devices, by_serial = {}, {}
+        pings, never = defaultdict(list), defaultdict(set)
+        for device_id, project_id, serial, last_ping in rows:
+            ts = to_epoch(last_ping) if last_ping else None
+            devices[device_id] = (project_id, serial, ts)
+            if serial:
+                by_serial[serial] = device_id
+            if ts is None:
+                never[project_id].add(device_id)
+            else:
+                pings[project_id].append((ts, device_id))
+        for entries in pings.values():
+            entries.sort()
+        watermark = max((last_ping for _, _, _, last_ping in rows if last_ping), default=None)
+        with self._lock:
+            self._devices, self._by_serial = devices, by_serial
+            self._pings, self._never = pings, never
+            self._watermark = watermark
+            self._built_at = self._refreshed_at = time.monotonic()
+
+    def refresh(self):
+        # Rows whose last_ping moved since the last read, from
+        # ix_deployment_devices_last_ping. Other workers write pings up to a
+        # flush interval late, so look back refresh_lookback seconds.
+        with self._lock:
+            watermark = self._watermark
+        query = db.session.query(DeploymentDevice.id, DeploymentDevice.project_id,
+                                 DeploymentDevice.serial_number, DeploymentDevice.last_ping)
+        if watermark is not None:
+            query = query.filter(DeploymentDevice.last_ping >= watermark - timedelta(seconds=self.refresh_lookback))
+        else:
+            query = query.filter(DeploymentDevice.last_ping != None)
+        rows = query.all()
+        with self._lock:
+            for device_id, project_id, serial, last_ping in rows:
+                self._set(device_id, project_id, serial, to_epoch(last_ping))
+                if self._watermark is None or last_ping > self._watermark:
+                    self._watermark = last_ping
+            self._refreshed_at = time.monotonic()
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self._built_at is None or now - self._built_at > self.rebuild_interval:
+            self.rebuild()
+        elif now - self._refreshed_at > self.refresh_interval:
+            self.refresh()
+
+    def _set(self, device_id, project_id, serial, ts):
+        # Newer pings only; a device seen under another project has moved
+        current = self._devices.get(device_id)
+        if current is not None:
+            if current[0] == project_id and current[2] is not None and ts is not None and ts <= current[2]:
+                return
+            self._remove(device_id)
+        self._add(device_id, project_id, serial, ts)
+
+    def touch(self, serial, seen_at):
+        # Called for every accepted heartbeat on this worker
+        with self._lock:
+            device_id = self._by_serial.get(serial)
+            if device_id is None:
+                return
+            project_id, _, _ = self._devices[device_id]
+            self._set(device_id, project_id, serial, to_epoch(seen_at))
+
+    def upsert_device(self, device):
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(device.id)
+            self._add(device.id, device.project_id, device.serial_number,
+                      to_epoch(device.last_ping) if device.last_ping else None)
+
+    def invalidate(self):
+        # Rebuild on next use, e.g. after a bulk import
+        with self._lock:
+            self._built_at = None
+
+    def remove_device(self, device_id):
+        with self._lock:
+            self._remove(device_id)
+
+    def _bounds(self, window):
+        # (offline cutoff, start of the "recently offline" window), in epoch
+        # seconds: online means last_ping >= cutoff
+        cutoff = to_epoch(datetime.utcnow()) - self.offline_after
+        return cutoff, cutoff - window
+
+    def _count(self, project_id, cutoff, since):
+        pings = self._pings.get(project_id, ())
+        below_cutoff = bisect_left(pings, (cutoff,))
+        below_since = bisect_left(pings, (since,))
+        never = len(self._never.get(project_id, ()))
+        return {
+            "total": len(pings) + never,
+            "online": len(pings) - below_cutoff,
+            "offline": below_cutoff + never,
+            "recently_offline": below_cutoff - below_since,
+            "never": never,
+        }
+
+    def summary(self, window, project_id=None):
+        cutoff, since = self._bounds(window)
+        with self._lock:
+            if project_id is not None:
+                return {project_id: self._count(project_id, cutoff, since)}
+            projects = set(self._pings) | set(self._never)
+            return {pid: self._count(pid, cutoff, since) for pid in projects
+                    if self._pings.get(pid) or self._never.get(pid)}
+
+    def device_ids(self, project_id, state, window, offset, limit):
+        # One page of device ids in `state`, most recent ping first, then
+        # (offline/never) the devices that never pinged. Returns (ids, total).
+        cutoff, since = self._bounds(window)
+        with self._lock:
+            pings = self._pings.get(project_id, [])
+            below_cutoff = bisect_left(pings, (cutoff,))
+            lo, hi = {
+                "online": (below_cutoff, len(pings)),
+                "recently_offline": (bisect_left(pings, (since,)), below_cutoff),
+                "offline": (0, below_cutoff),
+            }.get(state, (0, 0))
+            end = hi - offset
+            page = [pings[i][1] for i in range(end - 1, max(lo, end - limit) - 1, -1)]
+            total = hi - lo
+            if state in ("offline", "never"):
+                never = self._never.get(project_id, ())
+                total += len(never)
+                if len(page) < limit:
+                    start = max(0, offset - (hi - lo))
+                    page += sorted(never)[start:start + limit - len(page)]
+            return page, total
+
+fleet_index = FleetIndex()
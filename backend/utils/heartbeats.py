@@ -0,0 +1,170 @@
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import bindparam, case, select
+from utils.db import db
+from utils.errors import ValidationError
+from utils.versions import bump
+from utils.events import record_bulk
+from models.tracking import DeploymentDevice
+
+logger = logging.getLogger(__name__)
+
+# Write-behind buffer for device heartbeats. A ping only records the newest
+# timestamp per serial number in memory; a background thread periodically
+# writes everything pending with one batched UPDATE, so N pings from the
+# same device between flushes cost one row write instead of N commits.
+# The buffer is bounded by distinct devices: once full, pings from devices
+# that aren't already pending are refused until the next flush.
+
+# Rows per executemany batch / per project lookup
+FLUSH_BATCH = 1000
+
+
+def parse_ping(ping, now):
+    if not isinstance(ping, dict) or not ping.get('serial_number'):
+        raise ValidationError("Each ping needs a serial_number")
+    serial = str(ping['serial_number'])
+    timestamp = ping.get('timestamp')
+    if timestamp is None:
+        return serial, now
+    try:
+        seen_at = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    except ValueError:
+        raise ValidationError(f"Invalid timestamp for {serial}")
+    if seen_at.tzinfo is not None:
+        seen_at = seen_at.astimezone(timezone.utc).replace(tzinfo=None)
+    # Device clocks drift; never record a ping from the future
+    return serial, min(seen_at, now)
+
+
+class HeartbeatBuffer:
+    def __init__(self, max_pending=250000, flush_interval=5):
+        self.app = None
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.stats = {"accepted": 0, "rejected": 0, "flushed": 0, "skipped": 0, "flushes": 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.max_pending = app.config["HEARTBEAT_MAX_PENDING"]
+        self.flush_interval = app.config["HEARTBEAT_FLUSH_INTERVAL"]
+
+    def start(self):
+        # Started by the first ping; pending pings are flushed at exit too
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="heartbeat-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def add(self, pings):
+        # pings: [(serial_number, timestamp)]. Returns the serials refused
+        # because the buffer is full.
+        rejected = []
+        with self._lock:
+            pending = self._pending
+            for serial, seen_at in pings:
+                current = pending.get(serial)
+                if current is None:
+                    if len(pending) >= self.max_pending:
+                        rejected.append(serial)
+                        continue
+                    pending[serial] = seen_at
+                elif seen_at > current:
+                    pending[serial] = seen_at
+            self.stats["accepted"] += len(pings) - len(rejected)
+            self.stats["rejected"] += len(rejected)
+            # Flush early once the buffer is three quarters full
+            if len(pending) >= self.max_pending * 3 // 4:
+                self._wakeup.set()
+        return rejected
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _take(self):
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        return batch
+
+    def _restore(self, batch):
+        # Put a failed batch back, keeping newer pings that arrived since
+        with self._lock:
+            for serial, seen_at in batch.items():
+                current = self._pending.get(serial)
+                if current is None or seen_at > current:
+                    self._pending[serial] = seen_at
+
+    def write(self, batch):
+        # One UPDATE statement executed per batch of rows. Older timestamps
+        # never overwrite newer ones, and a ping brings an Offline device
+        # back to Active. Returns the number of devices updated.
+        table = DeploymentDevice.__table__
+        stmt = table.update()\
+            .where(table.c.serial_number == bindparam('sn'))\
+            .where((table.c.last_ping == None) | (table.c.last_ping < bindparam('ts')))\
+            .values(
+                last_ping=bindparam('ts'),
+                status=case((table.c.status == 'Offline', 'Active'), else_=table.c.status)
+            )
+        items = sorted(batch.items())
+        updated, projects = 0, set()
+        for start in range(0, len(items), FLUSH_BATCH):
+            chunk = items[start:start + FLUSH_BATCH]
+            result = db.session.execute(stmt, [{"sn": sn, "ts": ts} for sn, ts in chunk],
+                                        execution_options={"synchronize_session": False})
+            updated += max(result.rowcount, 0)
+            projects.update(db.session.execute(
+                select(table.c.project_id).distinct()
+                .where(table.c.serial_number.in_([sn for sn, _ in chunk]))
+            ).scalars())
+        # Bulk UPDATEs skip the flush hooks that bump versions / feed events
+        projects.discard(None)
+        if projects:
+            bump(*[f"deployment:{pid}" for pid in projects])
+            record_bulk("deployment", projects)
+        db.session.commit()
+        return updated
+
+    def flush(self):
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return 0
+            with self.app.app_context():
+                try:
+                    updated = self.write(batch)
+                except Exception:
+                    db.session.rollback()
+                    self._restore(batch)
+                    raise
+                finally:
+                    db.session.remove()
+            with self._lock:
+                self.stats["flushes"] += 1
+                self.stats["flushed"] += len(batch)
+                # Serials with no matching device, or pings older than the
+                # stored last_ping
+                self.stats["skipped"] += len(batch) - updated
+            return len(batch)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Heartbeat flush failed")
+
+
+heartbeat_buffer = HeartbeatBuffer()
@@ -0,0 +1,321 @@
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request and SQL metrics in Prometheus text format (GET /api/metrics).
+#
+# Per route (the URL rule, so ids don't multiply series): a latency
+# histogram, request counts by status, and the SQL statements and time the
+# requests spent. Statements are counted from engine events into the
+# current request's ContextVar; background threads only add to the
+# db_statements totals.
+#
+# Each worker keeps its own numbers. With METRICS_DIR set (gunicorn.conf.py
+# does) workers write them there at most every DUMP_INTERVAL seconds and a
+# scrape adds up every worker's file, so any worker can answer for all of
+# them. An exiting worker folds its final numbers into retired.json and
+# removes its own file (a scrape does the same for workers that died
+# without exiting), so counters never go backwards and the directory holds
+# one file per live worker; pool gauges only come from live workers.
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DUMP_INTERVAL = 5
+RETIRED_FILE = "retired.json"
+
+_request_sql = ContextVar("request_sql", default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self.directory = None
+        # (method, route) -> [bucket counts..., +Inf count, sum, sql statements, sql seconds]
+        self._routes = {}
+        self._statuses = {}
+        self._sql = [0, 0.0]
+        self._lock = threading.Lock()
+        self._dumped_at = 0
+
+    def init_app(self, app):
+        if not app.config["METRICS_ENABLED"]:
+            return
+        self.directory = app.config["METRICS_DIR"] or None
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        if not event.contains(Engine, "before_cursor_execute", _before_execute):
+            event.listen(Engine, "before_cursor_execute", _before_execute)
+            event.listen(Engine, "after_cursor_execute", _after_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+        _request_sql.set(g.metrics_sql)
+
+    def _finish(self, response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        sql = g.pop("metrics_sql")
+        _request_sql.set(None)
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        key = (request.method, route)
+        status_key = key + (response.status_code,)
+        with self._lock:
+            entry = self._routes.get(key)
+            if entry is None:
+                entry = self._routes[key] = [0] * (len(BUCKETS) + 1) + [0.0, 0, 0.0]
+            entry[bisect_left(BUCKETS, elapsed)] += 1
+            entry[-3] += elapsed
+            entry[-2] += sql[0]
+            entry[-1] += sql[1]
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+        if self.directory and time.monotonic() - self._dumped_at > DUMP_INTERVAL:
+            self.dump()
+        return response
+
+    def record_sql(self, seconds):
+        with self._lock:
+            self._sql[0] += 1
+            self._sql[1] += seconds
+
+    def snapshot(self):
+        from utils.db import pool_metrics
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "routes": [list(key) + list(values) for key, values in self._routes.items()],
+                "statuses": [list(key) + [count] for key, count in self._statuses.items()],
+                "sql": list(self._sql),
+                "pools": pool_metrics.snapshot()["pools"],
+            }
+
+    def reset(self):
+        # For a forked worker, which would otherwise report the master's
+        # warm-up requests as its own. A file under this pid is from an
+        # earlier process that had it.
+        with self._lock:
+            self._routes, self._statuses, self._sql = {}, {}, [0, 0.0]
+        if self.directory:
+            with self._locked(fcntl.LOCK_EX):
+                self._retire_files([self._path(os.getpid())])
+
+    def retire(self):
+        # Called as the worker exits (gunicorn.conf.py worker_exit)
+        if not self.directory:
+            return
+        with self._locked(fcntl.LOCK_EX):
+            # The live numbers supersede this worker's last dump
+            self._retire_files([], [self.snapshot()])
+            try:
+                os.remove(self._path(os.getpid()))
+            except FileNotFoundError:
+                pass
+        # Nothing this process does from here on is dumped again
+        self.directory = None
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def _locked(self, mode):
+        # Folding files into retired.json and reading them for a scrape
+        # exclude each other, so a scrape never counts a worker twice or
+        # misses it
+        os.makedirs(self.directory, exist_ok=True)
+        return _FileLock(os.path.join(self.directory, ".lock"), mode)
+
+    def _retire_files(self, paths, extra=()):
+        # Under the exclusive lock: adds the files (and extra snapshots) to
+        # retired.json, then removes them
+        snapshots = list(extra)
+        found = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+                found.append(path)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError):
+                found.append(path)
+        if not snapshots:
+            return
+        retired = os.path.join(self.directory, RETIRED_FILE)
+        try:
+            with open(retired) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            pass
+        routes, statuses, sql, _ = _merge(snapshots)
+        _write_json(retired, {
+            "pid": None,
+            "routes": [list(key) + values for key, values in routes.items()],
+            "statuses": [list(key) + [count] for key, count in statuses.items()],
+            "sql": sql,
+            "pools": {},
+        })
+        for path in found:
+            os.remove(path)
+
+    def dump(self):
+        self._dumped_at = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        _write_json(self._path(os.getpid()), self.snapshot())
+
+    def _collect(self):
+        # This worker's live numbers plus the last dump of every other one
+        # and the retired totals
+        mine = self.snapshot()
+        if not self.directory:
+            return [mine]
+        pattern = os.path.join(self.directory, "*.json")
+        dead = []
+        for path in glob.glob(pattern):
+            pid = os.path.basename(path)[:-len(".json")]
+            if pid.isdigit() and not _alive(int(pid)):
+                dead.append(path)
+        snapshots = [mine]
+        with self._locked(fcntl.LOCK_EX if dead else fcntl.LOCK_SH):
+            if dead:
+                self._retire_files(dead)
+            for path in glob.glob(pattern):
+                if path == self._path(mine["pid"]):
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return snapshots
+
+    def render(self):
+        routes, statuses, sql, pools = _merge(self._collect())
+
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), values in sorted(routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for le, count in zip(BUCKETS + ("+Inf",), values):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {values[-3]:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(statuses.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+        lines += ["# HELP http_request_sql_statements_total SQL statements issued by requests, by route.",
+                  "# TYPE http_request_sql_statements_total counter"]
+        lines += [f'http_request_sql_statements_total{{method="{m}",route="{_escape(r)}"}} {v[-2]}'
+                  for (m, r), v in sorted(routes.items())]
+        lines += ["# HELP http_request_sql_seconds_total Time requests spent in SQL, by route.",
+                  "# TYPE http_request_sql_seconds_total counter"]
+        lines += [f'http_request_sql_seconds_total{{method="{m}",route="{_escape(r)}"}} {v[-1]:.6f}'
+                  for (m, r), v in sorted(routes.items())]
+
+        lines += ["# HELP db_statements_total All SQL statements, including background work.",
+                  "# TYPE db_statements_total counter", f"db_statements_total {sql[0]}",
+                  "# HELP db_statement_seconds_total Time spent in all SQL statements.",
+                  "# TYPE db_statement_seconds_total counter", f"db_statement_seconds_total {sql[1]:.6f}"]
+
+        for name, kind, help_text in (
+            ("checked_out", "gauge", "Connections in use."),
+            ("checked_in", "gauge", "Idle pooled connections."),
+            ("overflow", "gauge", "Connections beyond pool_size (negative: unused capacity)."),
+            ("connects", "counter", "New database connections opened."),
+            ("invalidated", "counter", "Connections invalidated (failed pre-ping, disconnects)."),
+        ):
+            metric = f"db_pool_{name}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{bind="{bind}"}} {stats[name]}'
+                      for bind, stats in sorted(pools.items()) if name in stats]
+        return "\n".join(lines) + "\n"
+
+
+class _FileLock:
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file, self.mode)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _merge(snapshots):
+    # Sums of the snapshots' counters; pool gauges of live workers only
+    routes, statuses, sql, pools = {}, {}, [0, 0.0], {}
+    for snap in snapshots:
+        for row in snap["routes"]:
+            key, values = tuple(row[:2]), row[2:]
+            total = routes.setdefault(key, [0] * len(values))
+            for i, value in enumerate(values):
+                total[i] += value
+        for method, route, status, count in snap["statuses"]:
+            statuses[(method, route, status)] = statuses.get((method, route, status), 0) + count
+        sql[0] += snap["sql"][0]
+        sql[1] += snap["sql"][1]
+        if snap["pools"] and _alive(snap["pid"]):
+            for bind, stats in snap["pools"].items():
+                total = pools.setdefault(bind, {})
+                for name in ("checked_out", "checked_in", "overflow", "connects", "invalidated"):
+                    if name in stats:
+                        total[name] = total.get(name, 0) + stats[name]
+    return routes, statuses, sql, pools
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    # A connection runs one statement at a time
+    conn.info["metrics_started"] = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("metrics_started", time.perf_counter())
+    current = _request_sql.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+    metrics.record_sql(elapsed)
+
+
+metrics = Metrics()
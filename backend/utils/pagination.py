@@ -0,0 +1,123 @@
+import base64
+import json
+from datetime import date, datetime
+from flask import request
+from sqlalchemy import and_, or_, case
+from utils.cache import TTLCache
+from utils.errors import ValidationError
+
+# Keyset (cursor) pagination. A sort order is a list of (expression,
+# descending) pairs whose last entry must be unique (the primary key), so
+# every row has a distinct position. The cursor is the last row's sort key,
+# encoded as an opaque token; the next page is "rows after that key", which
+# the database can answer from an index instead of scanning OFFSET rows.
+
+_approx_totals = TTLCache(ttl=60)
+
+
+def nulls_first_flag(column):
+    # 0 for NULL, 1 otherwise. Put it in front of a nullable column in a sort
+    # order so NULLs sort first ascending / last descending (the MySQL
+    # default) and the cursor comparison never has to compare against NULL.
+    return case((column.is_(None), 0), else_=1)
+
+
+def order_by_clauses(keys):
+    return [expr.desc() if descending else expr.asc() for expr, descending in keys]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValidationError("Invalid cursor")
+    return values
+
+
+def _after(keys, values):
+    # (k1, k2, ...) > (v1, v2, ...) in the order's direction, expanded so it
+    # works with mixed ASC/DESC keys
+    clauses = []
+    for i, ((expr, descending), value) in enumerate(zip(keys, values)):
+        if value is None:
+            # Nothing sorts strictly after NULL within the same prefix
+            continue
+        prefix = [
+            k.is_(None) if v is None else k == v
+            for (k, _), v in zip(keys[:i], values[:i])
+        ]
+        clauses.append(and_(*prefix, expr < value if descending else expr > value))
+    return or_(*clauses)
+
+
+def keyset_paginate(query, keys, per_page, cursor=None):
+    # Returns (items, pagination dict). `query` must not be ordered yet.
+    labeled = [expr.label(f"_k{i}") for i, (expr, _) in enumerate(keys)]
+    page_query = query.add_columns(*labeled)
+    if cursor:
+        page_query = page_query.filter(_after(keys, decode_cursor(cursor, len(keys))))
+
+    rows = page_query.order_by(*order_by_clauses(keys)).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return [row[0] for row in rows], {
+        "next_cursor": encode_cursor(list(rows[-1][1:])) if has_more and rows else None,
+        "has_more": has_more,
+        "per_page": per_page
+    }
+
+
+def approximate_total(query, cache_key):
+    # Full COUNT(*) at most once a minute per distinct listing
+    return _approx_totals.get_or_set(cache_key, lambda: query.order_by(None).count())
+
+
+def paginate_request(query, keys, default_per_page=20):
+    # Shared by the list endpoints. `?cursor=` (empty for the first page)
+    # selects keyset mode, optionally with `&total=approx`; otherwise the
+    # original page/per_page offset pagination is used.
+    per_page = request.args.get('per_page', default_per_page, type=int)
+
+    if 'cursor' in request.args:
+        items, pagination = keyset_paginate(query, keys, per_page, request.args.get('cursor'))
+        if request.args.get('total') == 'approx':
+            filters = sorted((k, v) for k, v in request.args.items(multi=True)
+                             if k not in ('cursor', 'per_page', 'total'))
+            pagination["approx_total"] = approximate_total(query, (request.path, tuple(filters)))
+        return items, pagination
+
+    page = request.args.get('page', 1, type=int)
+    result = query.order_by(*order_by_clauses(keys)).paginate(page=page, per_page=per_page, error_out=False)
+    return result.items, {
+        "total": result.total,
+        "pages": result.pages,
+        "current_page": page,
+        "per_page": per_page
+    }
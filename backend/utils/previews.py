@@ -0,0 +1,174 @@
+import logging
+import mimetypes
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # no previews at all without Pillow
+    Image = None
+try:
+    import pypdfium2
+except ImportError:  # images only
+    pypdfium2 = None
+
+logger = logging.getLogger(__name__)
+
+# Thumbnails and first-page previews for image and PDF attachments.
+#
+# Rendering runs in a small process pool (PREVIEW_WORKERS), off the request
+# path and out of the workers' GIL, and at most PREVIEW_MAX_PENDING files
+# are queued; anything turned away is picked up again the next time its
+# attachment is listed. Output is cached on disk by content hash under
+# UPLOAD_FOLDER/previews, so identical uploads share previews and the only
+# state is whether the file exists. Files that can't be rendered get a
+# .failed marker instead of being retried.
+#
+# Nothing here imports the app or the database: the pool's children are
+# spawned and only need render().
+
+PREVIEW_SIZES = {"thumb": 256, "preview": 1024}
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff")
+PDF_TYPE = "application/pdf"
+
+
+def render(source, kind, outputs):
+    # Runs in a pool process. outputs: {size name: target path}. Each
+    # target is written to a temporary name first, so a reader never sees
+    # a partial file.
+    if kind == PDF_TYPE:
+        pdf = pypdfium2.PdfDocument(source)
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            scale = max(PREVIEW_SIZES.values()) / max(width, height)
+            image = page.render(scale=scale).to_pil()
+        finally:
+            pdf.close()
+    else:
+        image = Image.open(source)
+        # Decode a reduced version of big JPEGs straight away
+        image.draft("RGB", (max(PREVIEW_SIZES.values()),) * 2)
+        image = ImageOps.exif_transpose(image)
+    image = image.convert("RGB")
+
+    # Largest first, each shrunk from the last
+    for name, px in sorted(PREVIEW_SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((px, px))
+        if name not in outputs:
+            continue
+        target = outputs[name]
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        image.save(tmp, "JPEG", quality=82, optimize=True)
+        os.replace(tmp, target)
+
+
+class PreviewGenerator:
+    def __init__(self, root="uploads", workers=2, max_pending=200):
+        self.root = root
+        self.workers = workers
+        self.max_pending = max_pending
+        self.on_ready = None
+        self._pool = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, on_ready=None):
+        self.root = app.config["UPLOAD_FOLDER"]
+        self.workers = app.config["PREVIEW_WORKERS"]
+        self.max_pending = app.config["PREVIEW_MAX_PENDING"]
+        # on_ready(content_hash), called in the parent once a file's
+        # previews are written
+        self.on_ready = on_ready
+
+    def kind(self, content_type, file_name=None):
+        # PDF_TYPE, an image type, or None if no preview can be made
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        if not content_type or content_type == "application/octet-stream":
+            content_type = mimetypes.guess_type(file_name or "")[0] or ""
+        if Image is None:
+            return None
+        if content_type in IMAGE_TYPES:
+            return content_type
+        if content_type == PDF_TYPE and pypdfium2 is not None:
+            return PDF_TYPE
+        return None
+
+    def path(self, content_hash, size):
+        return os.path.join(self.root, "previews", content_hash[:2], content_hash[2:4], f"{content_hash}-{size}.jpg")
+
+    def _failed_path(self, content_hash):
+        return os.path.join(self.root, "previews", content_hash[:2], content_hash[2:4], f"{content_hash}.failed")
+
+    def ready(self, content_hash, content_type, file_name=None, source=None):
+        # The preview sizes available for a stored file. Missing ones are
+        # queued (source is the stored file's path).
+        if not content_hash or self.kind(content_type, file_name) is None:
+            return ()
+        available = [size for size in PREVIEW_SIZES if os.path.exists(self.path(content_hash, size))]
+        if len(available) < len(PREVIEW_SIZES) and source is not None:
+            self.submit(content_hash, content_type, file_name, source)
+        return available
+
+    def submit(self, content_hash, content_type, file_name, source):
+        kind = self.kind(content_type, file_name)
+        if kind is None or os.path.exists(self._failed_path(content_hash)):
+            return False
+        outputs = {size: self.path(content_hash, size) for size in PREVIEW_SIZES
+                   if not os.path.exists(self.path(content_hash, size))}
+        if not outputs:
+            return False
+        with self._lock:
+            if content_hash in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(content_hash)
+            if self._pool is None:
+                # spawn rather than fork: the parent has threads (buffers,
+                # scheduler) and open database connections
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            try:
+                future = self._pool.submit(render, source, kind, outputs)
+            except BrokenProcessPool:
+                self._pending.discard(content_hash)
+                self._pool = None
+                return False
+        future.add_done_callback(lambda f: self._done(f, content_hash))
+        return True
+
+    def _done(self, future, content_hash):
+        with self._lock:
+            self._pending.discard(content_hash)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # A child died (e.g. killed for memory); a new pool on next submit
+            with self._lock:
+                self._pool = None
+            logger.warning("Preview pool broke while rendering %s", content_hash)
+            return
+        if error is not None:
+            logger.warning("No preview for %s: %s", content_hash, error)
+            marker = self._failed_path(content_hash)
+            os.makedirs(os.path.dirname(marker), exist_ok=True)
+            with open(marker, "w") as f:
+                f.write(f"{error.__class__.__name__}: {error}\n")
+            return
+        if self.on_ready is not None:
+            try:
+                self.on_ready(content_hash)
+            except Exception:
+                logger.exception("Preview callback failed for %s", content_hash)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+preview_generator = PreviewGenerator()
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from sqlalchemy import func, case
+from utils.db import db
+from models.project import Project
+from models.project_stats import ProjectStats
+from models.task import Task
+from models.issue import Issue
+
+# Helpers that keep project_stats in step with the tasks and issues tables.
+# They only touch the current session, so the counter updates commit (or
+# roll back) together with the write that caused them.
+
+SEVERITY_COLUMNS = {
+    'Low': 'open_issues_low',
+    'Medium': 'open_issues_medium',
+    'High': 'open_issues_high',
+    'Critical': 'open_issues_critical'
+}
+CLOSED_ISSUE_STATUSES = ('Resolved', 'Closed')
+COUNTER_COLUMNS = ('total_tasks', 'done_tasks', 'overdue_tasks') + tuple(SEVERITY_COLUMNS.values())
+
+
+def task_counters(status):
+    return {
+        'total_tasks': 1,
+        'done_tasks': int(status == 'Done'),
+        'overdue_tasks': int(status == 'Overdue')
+    }
+
+
+def issue_counters(status, severity):
+    column = SEVERITY_COLUMNS.get(severity)
+    if column is None or status in CLOSED_ISSUE_STATUSES:
+        return {}
+    return {column: 1}
+
+
+def _project_key(project_id):
+    return int(project_id) if project_id not in (None, '') else None
+
+
+def _accumulate(changes, project_id, counters, sign):
+    project_id = _project_key(project_id)
+    if project_id is None:
+        return
+    for column, value in counters.items():
+        changes[project_id][column] += sign * value
+
+
+def apply_deltas(project_id, deltas):
+    # Call after the change itself is in the session. A project without a
+    # counter row (e.g. created before the table existed) gets one rebuilt
+    # from the current rows instead of starting from zero.
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    updated = ProjectStats.query.filter_by(project_id=project_id).update(
+        {getattr(ProjectStats, k): getattr(ProjectStats, k) + v for k, v in deltas.items()},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.flush()
+        db.session.add(ProjectStats(project_id=project_id, **_actual_counts(project_id)[project_id]))
+
+
+def _apply_changes(changes):
+    for project_id, deltas in changes.items():
+        apply_deltas(project_id, deltas)
+
+
+def track_task_change(before, after):
+    # before/after are (project_id, status) tuples, None for create/delete
+    changes = defaultdict(lambda: defaultdict(int))
+    if before:
+        _accumulate(changes, before[0], task_counters(before[1]), -1)
+    if after:
+        _accumulate(changes, after[0], task_counters(after[1]), 1)
+    _apply_changes(changes)
+
+
+def track_issue_change(before, after):
+    # before/after are (project_id, status, severity) tuples
+    changes = defaultdict(lambda: defaultdict(int))
+    if before:
+        _accumulate(changes, before[0], issue_counters(before[1], before[2]), -1)
+    if after:
+        _accumulate(changes, after[0], issue_counters(after[1], after[2]), 1)
+    _apply_changes(changes)
+
+
+def task_counts_by_project(*criteria):
+    rows = db.session.query(
+        Task.project_id,
+        func.count(Task.id),
+        func.sum(case((Task.status == 'Done', 1), else_=0)),
+        func.sum(case((Task.status == 'Overdue', 1), else_=0))
+    ).filter(Task.project_id != None, *criteria).group_by(Task.project_id).all()
+    return {
+        project_id: {'total_tasks': int(total), 'done_tasks': int(done or 0), 'overdue_tasks': int(overdue or 0)}
+        for project_id, total, done, overdue in rows
+    }
+
+
+def track_bulk_tasks(counts, sign):
+    # counts comes from task_counts_by_project() for the rows a set-based
+    # UPDATE/DELETE is about to touch
+    changes = defaultdict(lambda: defaultdict(int))
+    for project_id, counters in counts.items():
+        _accumulate(changes, project_id, counters, sign)
+    _apply_changes(changes)
+
+
+def _actual_counts(project_id=None):
+    task_criteria = [Task.project_id == project_id] if project_id is not None else []
+    issue_query = db.session.query(Issue.project_id, Issue.severity, func.count(Issue.id))\
+        .filter(Issue.project_id != None, Issue.status.notin_(CLOSED_ISSUE_STATUSES))
+    if project_id is not None:
+        issue_query = issue_query.filter(Issue.project_id == project_id)
+
+    actual = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    for pid, counters in task_counts_by_project(*task_criteria).items():
+        actual[pid].update(counters)
+    for pid, severity, count in issue_query.group_by(Issue.project_id, Issue.severity).all():
+        column = SEVERITY_COLUMNS.get(severity)
+        if column:
+            actual[pid][column] += count
+    return actual
+
+
+def rebuild_project_stats(dry_run=False):
+    # Recount everything from the source tables and overwrite project_stats.
+    # Returns a list of {project_id, column, stored, actual} drift entries.
+    actual = _actual_counts()
+    project_ids = {pid for (pid,) in db.session.query(Project.id).all()}
+    stored = {s.project_id: s for s in ProjectStats.query.all()}
+
+    drift = []
+    for project_id in sorted(project_ids):
+        expected = actual.get(project_id, dict.fromkeys(COUNTER_COLUMNS, 0))
+        row = stored.get(project_id)
+        if row is None:
+            row = ProjectStats(project_id=project_id)
+            db.session.add(row)
+        for column in COUNTER_COLUMNS:
+            current = getattr(row, column) or 0
+            if current != expected[column]:
+                drift.append({"project_id": project_id, "column": column, "stored": current, "actual": expected[column]})
+            setattr(row, column, expected[column])
+
+    # Counter rows left behind by deleted projects
+    for project_id, row in stored.items():
+        if project_id not in project_ids:
+            drift.append({"project_id": project_id, "column": None, "stored": None, "actual": None})
+            db.session.delete(row)
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return drift
@@ -0,0 +1,124 @@
+import logging
+import re
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.errors import AppError
+
+logger = logging.getLogger(__name__)
+
+# N+1 detection and per-route query budgets, for development and test runs.
+#
+# With QUERY_GUARD set to "warn" or "raise", every statement a request
+# issues is reduced to a fingerprint (literals, parameters and IN/VALUES
+# lists collapsed) and counted. A fingerprint seen QUERY_GUARD_REPEAT times
+# or more in one request is the shape of an N+1 loop and gets logged. Views
+# declare how many statements they may issue with @query_budget(n); going
+# over is logged in "warn" mode and fails the request with a 500 in
+# "raise" mode, so a check script or client run catches the regression.
+# Responses carry X-Query-Count either way.
+#
+# With QUERY_GUARD "off" (production) no engine listener is registered and
+# @query_budget costs one ContextVar lookup.
+
+MODES = ("off", "warn", "raise")
+
+_request_queries = ContextVar("request_queries", default=None)
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\?|\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    # Statements differing only in values (including the length of an IN
+    # list or a multi-row VALUES) share a fingerprint
+    sql = _LITERAL.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _LIST.sub("?", sql)
+    sql = _ROWS.sub("(?)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+class QueryBudgetExceeded(AppError):
+    def __init__(self, queries, budget, repeated):
+        super().__init__(f"{queries} SQL statements for a query budget of {budget}", 500,
+                         {"queries": queries, "budget": budget, "repeated": repeated})
+
+
+class QueryGuard:
+    def __init__(self):
+        self.mode = "off"
+        self.repeat_threshold = 5
+
+    def init_app(self, app):
+        self.mode = app.config["QUERY_GUARD"]
+        if self.mode not in MODES:
+            raise ValueError(f"QUERY_GUARD must be one of {', '.join(MODES)}")
+        self.repeat_threshold = app.config["QUERY_GUARD_REPEAT"]
+        if self.mode == "off":
+            return
+        if not event.contains(Engine, "after_cursor_execute", _count_statement):
+            event.listen(Engine, "after_cursor_execute", _count_statement)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        _request_queries.set(Counter())
+
+    def _finish(self, response):
+        counts = _request_queries.get()
+        if counts is None:
+            return response
+        _request_queries.set(None)
+        response.headers["X-Query-Count"] = str(sum(counts.values()))
+        for sql, count in self.repeated(counts):
+            logger.warning("Possible N+1 in %s %s: %d x %s", request.method, request.path, count, sql)
+        return response
+
+    def repeated(self, counts):
+        # (fingerprint, count) pairs at or over the threshold, most first
+        return [(sql, count) for sql, count in counts.most_common() if count >= self.repeat_threshold]
+
+    def check(self, budget):
+        # Called by @query_budget views after they ran
+        counts = _request_queries.get()
+        if counts is None:
+            return
+        queries = sum(counts.values())
+        if queries <= budget:
+            return
+        repeated = [{"count": count, "sql": sql[:300]} for sql, count in counts.most_common(5)]
+        if self.mode == "raise":
+            raise QueryBudgetExceeded(queries, budget, repeated)
+        logger.warning("%s %s issued %d SQL statements, over its budget of %d; most repeated: %s",
+                       request.method, request.path, queries, budget, repeated[:1])
+
+
+def query_budget(budget):
+    # Decorator declaring the most SQL statements a view may issue. Put it
+    # right under the route decorator so wrappers such as conditional_get
+    # count towards the budget.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            rv = view(*args, **kwargs)
+            query_guard.check(budget)
+            return rv
+        wrapper.query_budget = budget
+        return wrapper
+    return decorator
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counts = _request_queries.get()
+    if counts is not None:
+        counts[fingerprint(statement)] += 1
+
+
+query_guard = QueryGuard()
@@ -0,0 +1,247 @@
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from sqlalchemy import event, func
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+from utils.db import db
+from models.project import Project
+from models.task import Task
+from models.issue import Issue
+from models.comment import Comment
+
+# Unified search over projects, tasks, issues and comments.
+#
+# On MariaDB/MySQL it runs MATCH ... AGAINST in boolean mode on the
+# FULLTEXT indexes declared on each model. Anywhere else (SQLite in tests
+# and scripts) it falls back to InvertedIndex, an in-process BM25 index
+# built on first use and kept current from the session's commit hooks.
+# The fallback only sees this process's writes, so it is meant for
+# single-process setups; multi-worker deployments run on MariaDB.
+
+# type -> (model, title column, indexed columns, project id column)
+SEARCH_TYPES = {
+    "project": (Project, Project.name, (Project.name, Project.description), Project.id),
+    "task": (Task, Task.name, (Task.name, Task.description), Task.project_id),
+    "issue": (Issue, Issue.title, (Issue.title, Issue.description), Issue.project_id),
+    "comment": (Comment, Comment.content, (Comment.content,), Comment.project_id),
+}
+MODEL_TYPES = {model: name for name, (model, _, _, _) in SEARCH_TYPES.items()}
+
+SNIPPET_LENGTH = 160
+# InnoDB ignores shorter words (innodb_ft_min_token_size)
+FULLTEXT_MIN_WORD = 3
+# Vocabulary terms a trailing prefix may expand to
+MAX_PREFIX_TERMS = 50
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1] if text else []
+
+
+def _snippet(text):
+    if not text:
+        return None
+    return text if len(text) <= SNIPPET_LENGTH else text[:SNIPPET_LENGTH].rsplit(" ", 1)[0] + "..."
+
+
+def _document(obj):
+    # (type, id, title, project id, full text) for an indexed instance
+    kind = MODEL_TYPES[type(obj)]
+    _, title_col, columns, project_col = SEARCH_TYPES[kind]
+    values = [getattr(obj, c.key) for c in columns]
+    text = " ".join(v for v in values if v)
+    return kind, obj.id, getattr(obj, title_col.key), getattr(obj, project_col.key), text
+
+
+class InvertedIndex:
+    # term -> {doc key: term frequency}, with BM25 ranking. A doc key is
+    # (type, id). The last query word matches as a prefix, found by
+    # bisecting the sorted vocabulary.
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.built = False
+        self._reset()
+
+    def _reset(self):
+        self._postings = defaultdict(dict)
+        self._vocab = []
+        self._docs = {}
+        self._total_length = 0
+
+    def build(self):
+        with self._lock:
+            self._reset()
+            for kind, (model, title_col, columns, project_col) in SEARCH_TYPES.items():
+                # Plain column tuples; building ORM instances would dominate
+                title_at = columns.index(title_col)
+                query = db.session.query(model.id, project_col, *columns).execution_options(yield_per=5000)
+                for doc_id, project_id, *values in query:
+                    self._add(kind, doc_id, values[title_at], project_id, " ".join(v for v in values if v))
+            self.built = True
+
+    def _add(self, kind, doc_id, title, project_id, text):
+        key = (kind, doc_id)
+        self._remove(key)
+        tokens = tokenize(text)
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for token, tf in counts.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocab, token)
+            postings[key] = tf
+        self._docs[key] = (len(tokens), title, project_id, _snippet(text), tuple(counts))
+        self._total_length += len(tokens)
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        self._total_length -= doc[0]
+        for token in doc[4]:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+                    i = bisect_left(self._vocab, token)
+                    if i < len(self._vocab) and self._vocab[i] == token:
+                        del self._vocab[i]
+
+    def apply(self, changes):
+        # changes: [(document tuple, deleted)] from a committed transaction
+        with self._lock:
+            if not self.built:
+                return
+            for doc, deleted in changes:
+                if deleted:
+                    self._remove(doc[:2])
+                else:
+                    self._add(*doc)
+
+    def _expand(self, word):
+        i = bisect_left(self._vocab, word)
+        terms = []
+        while i < len(self._vocab) and self._vocab[i].startswith(word) and len(terms) < MAX_PREFIX_TERMS:
+            terms.append(self._vocab[i])
+            i += 1
+        return terms
+
+    def search(self, words, types, project_id, limit):
+        with self._lock:
+            n = len(self._docs) or 1
+            avg_length = self._total_length / n or 1
+            scores = None
+            for i, word in enumerate(words):
+                terms = self._expand(word) if i == len(words) - 1 else [word]
+                word_scores = defaultdict(float)
+                for term in terms:
+                    postings = self._postings.get(term, {})
+                    idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, tf in postings.items():
+                        length = self._docs[key][0]
+                        word_scores[key] = max(word_scores[key], idf * tf * (self.k1 + 1) / (
+                            tf + self.k1 * (1 - self.b + self.b * length / avg_length)))
+                # Every word has to match
+                if scores is None:
+                    scores = word_scores
+                else:
+                    scores = {key: s + word_scores[key] for key, s in scores.items() if key in word_scores}
+                if not scores:
+                    break
+
+            facets = {kind: 0 for kind in types}
+            matches = []
+            for key, score in (scores or {}).items():
+                kind = key[0]
+                if kind not in facets:
+                    continue
+                doc = self._docs[key]
+                if project_id is not None and doc[2] != project_id:
+                    continue
+                facets[kind] += 1
+                matches.append((score, key))
+            top = heapq.nlargest(limit, matches)
+            return [
+                {"type": key[0], "id": key[1], "title": self._docs[key][1], "project_id": self._docs[key][2],
+                 "snippet": self._docs[key][3], "score": round(score, 4)}
+                for score, key in top
+            ], facets
+
+
+search_index = InvertedIndex()
+
+
+def fulltext_search(words, types, project_id, limit):
+    words = [w for w in words if len(w) >= FULLTEXT_MIN_WORD]
+    if not words:
+        return [], {kind: 0 for kind in types}
+    # Boolean mode: every word required, the last one as a prefix
+    against = " ".join(f"+{w}" for w in words[:-1]) + f" +{words[-1]}*"
+    results, facets = [], {}
+    for kind in types:
+        model, title_col, columns, project_col = SEARCH_TYPES[kind]
+        score = match(*columns, against=against).in_boolean_mode()
+        query = db.session.query(model.id, title_col, project_col, columns[-1], score.label("score")).filter(score > 0)
+        if project_id is not None:
+            query = query.filter(project_col == project_id)
+        facets[kind] = query.with_entities(func.count()).order_by(None).scalar()
+        for doc_id, title, pid, text, rank in query.order_by(score.desc()).limit(limit):
+            results.append({"type": kind, "id": doc_id, "title": title, "project_id": pid,
+                            "snippet": _snippet(text), "score": round(float(rank), 4)})
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:limit], facets
+
+
+def search(q, types, project_id=None, limit=20, backend="auto"):
+    words = tokenize(q)
+    if backend == "auto":
+        backend = "fulltext" if db.session.get_bind().dialect.name in ("mysql", "mariadb") else "memory"
+    if not words:
+        return [], {kind: 0 for kind in types}
+    if backend == "fulltext":
+        return fulltext_search(words, types, project_id, limit)
+    if not search_index.built:
+        search_index.build()
+    return search_index.search(words, types, project_id, limit)
+
+
+_PENDING_KEY = "search_index_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_after_flush(session, flush_context):
+    # Only the in-process index needs this; values are captured now since
+    # instances are expired by the time after_commit runs
+    if not search_index.built:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in session.deleted:
+        if type(obj) in MODEL_TYPES:
+            pending.append(((MODEL_TYPES[type(obj)], obj.id), True))
+    for obj in list(session.new) + [o for o in session.dirty if session.is_modified(o)]:
+        if type(obj) in MODEL_TYPES:
+            pending.append((_document(obj), False))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        search_index.apply(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,81 @@
+from operator import attrgetter
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import inspect
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback, same output apart from date formatting
+    orjson = None
+
+
+class ModelSerializer:
+    # Built once per model: the column keys in table order plus a single
+    # attrgetter that pulls them all off an instance as a tuple. Unlike
+    # iterating __dict__ this never leaks loaded relationships or
+    # SQLAlchemy state and returns the same keys for every row.
+    def __init__(self, model):
+        self.model = model
+        self.keys = tuple(attr.key for attr in inspect(model).column_attrs)
+        self.columns = tuple(getattr(model, key) for key in self.keys)
+        getter = attrgetter(*self.keys)
+        self.row = getter if len(self.keys) > 1 else lambda obj: (getter(obj),)
+
+    def to_dict(self, obj):
+        return dict(zip(self.keys, self.row(obj)))
+
+    def many(self, objs):
+        keys, row = self.keys, self.row
+        return [dict(zip(keys, row(obj))) for obj in objs]
+
+    def rows(self, objs):
+        return [self.row(obj) for obj in objs]
+
+
+_registry = {}
+
+
+def serializer_for(model):
+    serializer = _registry.get(model)
+    if serializer is None:
+        serializer = _registry[model] = ModelSerializer(model)
+    return serializer
+
+
+def serialize(obj):
+    return serializer_for(type(obj)).to_dict(obj)
+
+
+def serialize_list(model, objs):
+    # `?format=rows` returns {"columns": [...], "rows": [[...], ...]} instead
+    # of repeating every key in every object
+    serializer = serializer_for(model)
+    if request.args.get('format') == 'rows':
+        return {"columns": serializer.keys, "rows": serializer.rows(objs)}
+    return serializer.many(objs)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Routes jsonify() and dict/list view return values through orjson.
+    # Datetimes go out as ISO 8601 in UTC with a "Z" (the columns hold naive
+    # UTC), so browsers don't read them as local time. Anything orjson can't
+    # handle (Decimal, UUID, ...) falls back to Flask's default hook.
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = self.option
+        # response() passes compact separators, or indent=2 in debug mode;
+        # orjson output is compact already
+        kwargs.pop("separators", None)
+        if kwargs.pop("indent", None):
+            option |= orjson.OPT_INDENT_2
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from sqlalchemy import literal, select
+from utils.db import db
+from utils.serializers import serialize
+from models.task import Task
+
+# Hard limit on subtask nesting; also stops a parent_id cycle from
+# recursing forever
+MAX_TREE_DEPTH = 100
+
+
+def load_descendants(root_ids, max_depth=MAX_TREE_DEPTH):
+    # Every task below root_ids, down to max_depth levels, in one recursive CTE
+    if not root_ids or max_depth < 1:
+        return []
+
+    tree = select(Task.id, literal(1).label('depth'))\
+        .where(Task.parent_id.in_(root_ids))\
+        .cte('subtask_tree', recursive=True)
+    tree = tree.union_all(
+        select(Task.id, tree.c.depth + 1)
+        .where(Task.parent_id == tree.c.id, tree.c.depth < max_depth)
+    )
+    return Task.query.join(tree, Task.id == tree.c.id).order_by(Task.id).all()
+
+
+def build_subtrees(root_ids, max_depth=MAX_TREE_DEPTH):
+    # {root_id: [serialized child with nested 'subtasks', ...]}
+    children = defaultdict(list)
+    for t in load_descendants(root_ids, max_depth):
+        children[t.parent_id].append(t)
+
+    def build(t):
+        data = serialize(t)
+        data['subtasks'] = [build(st) for st in children.get(t.id, [])]
+        return data
+
+    return {root_id: [build(st) for st in children.get(root_id, [])] for root_id in root_ids}
+
+
+class SubtaskTreeCache:
+    # Per-worker LRU of serialized subtask trees keyed by (root id, depth).
+    # Each entry remembers the collection version (utils/versions.py) of the
+    # project it was built for, and only serves requests that read that same
+    # version; any task write in the project, from whichever worker, bumps
+    # it. Expired entries are dropped as they're found and the least
+    # recently used go once there are max_entries.
+    def __init__(self, ttl=60, max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, root_ids, version, max_depth=MAX_TREE_DEPTH):
+        now = time.monotonic()
+        result, missing = {}, []
+        with self._lock:
+            for root_id in root_ids:
+                key = (root_id, max_depth)
+                entry = self._entries.get(key)
+                if entry and entry[0] == version and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    result[root_id] = entry[2]
+                else:
+                    if entry:
+                        del self._entries[key]
+                    missing.append(root_id)
+
+        if missing:
+            fresh = build_subtrees(missing, max_depth)
+            with self._lock:
+                for root_id, subtasks in fresh.items():
+                    result[root_id] = subtasks
+                    self._entries[(root_id, max_depth)] = (version, now + self.ttl, subtasks)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+subtask_trees = SubtaskTreeCache()
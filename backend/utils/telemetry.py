@@ -0,0 +1,304 @@
+import atexit
+import logging
+import math
+import struct
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, cast, LargeBinary
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError, InterfaceError, TimeoutError as PoolTimeoutError
+from utils.db import db
+from utils.errors import ValidationError
+from models.telemetry import TelemetryChunk, TelemetryRollup
+from models.tracking import DeploymentDevice
+
+logger = logging.getLogger(__name__)
+
+# Device telemetry. Readings are buffered per worker and written every
+# flush interval as:
+#  - raw samples appended to one telemetry_chunks row per device, metric
+#    and hour (6 bytes a sample, appended with CONCAT, never rewritten)
+#  - count/sum/min/max added into 1m/1h/1d buckets in telemetry_rollups,
+#    per device and per project, with one upsert per bucket per flush
+# Range queries read whichever resolution keeps the series under
+# max_points, so a month of data is a few hundred rows from the primary
+# key (project) or the device index.
+
+METRICS = ("battery", "rssi", "temperature")
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+CHUNK_SECONDS = 3600
+SAMPLE = struct.Struct("<Hf")
+# Largest value a sample's float32 holds
+FLOAT32_MAX = 3.4028234663852886e38
+# Rows per executemany batch / per device lookup
+WRITE_BATCH = 1000
+DEFAULT_MAX_POINTS = 500
+
+
+def to_epoch(dt):
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def from_epoch(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+
+def pack_samples(samples):
+    # samples: [(epoch seconds, value)] all within one chunk
+    return b"".join(SAMPLE.pack(ts % CHUNK_SECONDS, value) for ts, value in samples)
+
+
+def unpack_samples(chunk_start, blob):
+    return [(chunk_start + offset, value) for offset, value in SAMPLE.iter_unpack(blob)]
+
+
+def readings_from(data, parse):
+    # A reading is {"serial_number", "timestamp"?, <metric>: value, ...}.
+    # Returns [(serial, metric, epoch seconds, value)].
+    serial, seen_at = parse(data)
+    ts = to_epoch(seen_at)
+    samples = []
+    for metric in METRICS:
+        value = data.get(metric)
+        if value is None:
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            raise ValidationError(f"Invalid {metric} for {serial}")
+        # nan/inf or beyond float32 would only fail later, at flush
+        if not math.isfinite(value) or abs(value) > FLOAT32_MAX:
+            raise ValidationError(f"Invalid {metric} for {serial}")
+        samples.append((serial, metric, ts, value))
+    return samples
+
+
+def _upsert(table, rows, updates):
+    # INSERT ... ON DUPLICATE KEY / ON CONFLICT with updates(table, new),
+    # where `new` names the incoming row's values
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update(**updates(table, stmt.inserted, func.least, func.greatest))
+    else:
+        stmt = sqlite_insert(table)
+        # SQLite's two-argument min()/max() are scalar functions
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_=updates(table, stmt.excluded, func.min, func.max)
+        )
+    for start in range(0, len(rows), WRITE_BATCH):
+        db.session.execute(stmt, rows[start:start + WRITE_BATCH])
+
+
+def write_samples(samples):
+    # samples: [(device_id, project_id, metric, epoch seconds, value)]
+    chunks = defaultdict(list)
+    rollups = {}
+    for device_id, project_id, metric, ts, value in samples:
+        chunks[(device_id, metric, ts - ts % CHUNK_SECONDS)].append((ts, value))
+        for resolution in RESOLUTIONS.values():
+            bucket = ts - ts % resolution
+            for key in ((project_id, device_id, metric, resolution, bucket),
+                        (project_id, 0, metric, resolution, bucket)):
+                agg = rollups.get(key)
+                if agg is None:
+                    rollups[key] = [1, value, value, value]
+                else:
+                    agg[0] += 1
+                    agg[1] += value
+                    agg[2] = min(agg[2], value)
+                    agg[3] = max(agg[3], value)
+
+    # SQLite's || yields text even for two blobs, hence the cast
+    _upsert(TelemetryChunk.__table__, [
+        {"device_id": device_id, "metric": metric, "chunk_start": start, "samples": pack_samples(points)}
+        for (device_id, metric, start), points in sorted(chunks.items())
+    ], lambda t, new, least, greatest: {"samples": cast(t.c.samples.concat(new.samples), LargeBinary)})
+
+    _upsert(TelemetryRollup.__table__, [
+        {"project_id": key[0], "device_id": key[1], "metric": key[2], "resolution": key[3],
+         "bucket_start": key[4], "sample_count": agg[0], "value_sum": agg[1],
+         "value_min": agg[2], "value_max": agg[3]}
+        for key, agg in sorted(rollups.items())
+    ], lambda t, new, least, greatest: {
+        "sample_count": t.c.sample_count + new.sample_count,
+        "value_sum": t.c.value_sum + new.value_sum,
+        "value_min": least(t.c.value_min, new.value_min),
+        "value_max": greatest(t.c.value_max, new.value_max),
+    })
+
+
+def pick_resolution(start, end, max_points=DEFAULT_MAX_POINTS):
+    # Finest rollup that keeps the series under max_points buckets
+    for name, seconds in sorted(RESOLUTIONS.items(), key=lambda item: item[1]):
+        if (end - start) / seconds <= max_points:
+            return name
+    return "1d"
+
+
+def rollup_series(metric, resolution, start, end, device_id=None, project_id=None):
+    query = db.session.query(
+        TelemetryRollup.bucket_start, TelemetryRollup.sample_count, TelemetryRollup.value_sum,
+        TelemetryRollup.value_min, TelemetryRollup.value_max
+    ).filter(
+        TelemetryRollup.metric == metric,
+        TelemetryRollup.resolution == RESOLUTIONS[resolution],
+        TelemetryRollup.bucket_start >= start - start % RESOLUTIONS[resolution],
+        TelemetryRollup.bucket_start <= end
+    )
+    if device_id is not None:
+        query = query.filter(TelemetryRollup.device_id == device_id)
+    else:
+        query = query.filter(TelemetryRollup.project_id == project_id, TelemetryRollup.device_id == 0)
+    return [
+        {"t": from_epoch(bucket), "avg": total / count, "min": low, "max": high, "count": count}
+        for bucket, count, total, low, high in query.order_by(TelemetryRollup.bucket_start)
+    ]
+
+
+def raw_series(device_id, metric, start, end):
+    blobs = db.session.query(TelemetryChunk.chunk_start, TelemetryChunk.samples).filter(
+        TelemetryChunk.device_id == device_id,
+        TelemetryChunk.metric == metric,
+        TelemetryChunk.chunk_start >= start - start % CHUNK_SECONDS,
+        TelemetryChunk.chunk_start <= end
+    ).order_by(TelemetryChunk.chunk_start)
+    points = []
+    for chunk_start, blob in blobs:
+        # Samples are appended in arrival order, which may not be time order
+        points.extend(sorted(p for p in unpack_samples(chunk_start, blob) if start <= p[0] <= end))
+    return [{"t": from_epoch(ts), "value": value} for ts, value in points]
+
+
+class TelemetryBuffer:
+    # Same shape as utils/heartbeats.HeartbeatBuffer, but samples are
+    # appended rather than coalesced, so the bound is on buffered samples.
+    def __init__(self, max_pending=500000, flush_interval=5, flush_attempts=3):
+        self.app = None
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self.flush_attempts = flush_attempts
+        self.raw_retention = timedelta(days=30)
+        self.minute_retention = timedelta(days=90)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pruned_at = 0
+        self._failures = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.max_pending = app.config["TELEMETRY_MAX_PENDING"]
+        self.flush_interval = app.config["TELEMETRY_FLUSH_INTERVAL"]
+        self.flush_attempts = app.config["TELEMETRY_FLUSH_ATTEMPTS"]
+        self.raw_retention = timedelta(days=app.config["TELEMETRY_RAW_RETENTION_DAYS"])
+        self.minute_retention = timedelta(days=app.config["TELEMETRY_MINUTE_RETENTION_DAYS"])
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="telemetry-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def add(self, samples):
+        # samples: [(serial, metric, epoch seconds, value)]. All or nothing:
+        # returns False (and keeps none) when they don't fit.
+        with self._lock:
+            if len(self._pending) + len(samples) > self.max_pending:
+                return False
+            self._pending.extend(samples)
+            if len(self._pending) >= self.max_pending * 3 // 4:
+                self._wakeup.set()
+        return True
+
+    def _take(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _restore(self, batch):
+        with self._lock:
+            self._pending[:0] = batch
+
+    def write(self, batch):
+        # Resolve serial numbers to devices; samples for unknown serials
+        # are dropped. Returns the number of samples written.
+        serials = sorted({serial for serial, _, _, _ in batch})
+        devices = {}
+        for start in range(0, len(serials), WRITE_BATCH):
+            devices.update((serial, (device_id, project_id or 0)) for serial, device_id, project_id in db.session.execute(
+                select(DeploymentDevice.serial_number, DeploymentDevice.id, DeploymentDevice.project_id)
+                .where(DeploymentDevice.serial_number.in_(serials[start:start + WRITE_BATCH]))
+            ))
+        samples = [devices[serial] + (metric, ts, value)
+                   for serial, metric, ts, value in batch if serial in devices]
+        if samples:
+            write_samples(samples)
+        self._prune()
+        db.session.commit()
+        return len(samples)
+
+    def _prune(self):
+        # Raw chunks and 1m buckets are only kept for a while; 1h and 1d
+        # rollups are kept forever
+        if time.monotonic() - self._pruned_at < 3600:
+            return
+        self._pruned_at = time.monotonic()
+        now = datetime.utcnow()
+        TelemetryChunk.query.filter(TelemetryChunk.chunk_start < to_epoch(now - self.raw_retention))\
+            .delete(synchronize_session=False)
+        TelemetryRollup.query.filter(
+            TelemetryRollup.resolution == RESOLUTIONS["1m"],
+            TelemetryRollup.bucket_start < to_epoch(now - self.minute_retention)
+        ).delete(synchronize_session=False)
+
+    def flush(self):
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return 0
+            with self.app.app_context():
+                try:
+                    written = self.write(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    self._failed(batch, e)
+                    raise
+                finally:
+                    db.session.remove()
+            self._failures = 0
+            return written
+
+    def _failed(self, batch, error):
+        # The database being unreachable or busy is retried for as long as
+        # the buffer has room. Anything else is the batch itself, which
+        # gets a few more tries and is then dropped, so one bad sample
+        # can't hold up everything queued behind it.
+        self._failures += 1
+        if isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError)) \
+                or self._failures < self.flush_attempts:
+            self._restore(batch)
+            return
+        self._failures = 0
+        logger.error("Dropped %d telemetry samples after %d failed flushes: %r",
+                     len(batch), self.flush_attempts, error)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Telemetry flush failed")
+
+
+telemetry_buffer = TelemetryBuffer()
@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from utils.db import db
+from models.user import User
+from models.collection_version import CollectionVersion
+
+logger = logging.getLogger(__name__)
+
+# Prefix index for the member picker. Every user is filed under a few keys
+# in three sorted arrays, one per match kind, best first:
+#   0: the whole name ("jane doe")
+#   1: each later word of the name ("doe")
+#   2: the email address ("jane.doe@example.com")
+# A query bisects to the first key >= q in each array and walks forward
+# while keys still start with q, so a lookup costs O(log n + limit) and
+# results come out ranked by kind, then alphabetically.
+#
+# Each worker has its own index. Writes it handles itself are applied
+# directly (upsert); those made by other workers show up as a new "users"
+# collection version (utils/versions.py), checked at most every
+# VERSION_CHECK_INTERVAL seconds, and the index is then rebuilt by a
+# background thread while queries keep using the current one.
+
+MATCH_KINDS = 3
+# Hints returned to the client for throttling keystrokes
+MIN_CHARS = 2
+DEBOUNCE_MS = 150
+VERSION_CHECK_INTERVAL = 1
+
+
+def _users_version():
+    return db.session.query(CollectionVersion.version)\
+        .filter(CollectionVersion.scope == "users").scalar() or 0
+
+
+def _keys(name, email):
+    keys = []
+    name = (name or "").strip().lower()
+    if name:
+        keys.append((0, name))
+        keys.extend((1, word) for word in name.split()[1:])
+    if email:
+        keys.append((2, email.strip().lower()))
+    return keys
+
+
+class UserTypeahead:
+    def __init__(self, rebuild_interval=300):
+        self.app = None
+        self.rebuild_interval = rebuild_interval
+        self._arrays = [[] for _ in range(MATCH_KINDS)]
+        self._users = {}
+        self._built_at = None
+        self._version = None
+        self._checked_at = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.rebuild_interval = app.config["TYPEAHEAD_REBUILD_INTERVAL"]
+        # Built by the first query, not here: CLI commands, migrations and
+        # scripts build the app too. The prefork server's warm-up searches
+        # once (WARMUP_PATHS), so workers fork with the index built.
+
+    def rebuild(self):
+        # The version is read first: a change committed during the scan
+        # triggers another rebuild rather than being missed
+        version = _users_version()
+        rows = db.session.query(User.id, User.name, User.email).all()
+        arrays = [[] for _ in range(MATCH_KINDS)]
+        users = {}
+        for user_id, name, email in rows:
+            keys = _keys(name, email)
+            for kind, key in keys:
+                arrays[kind].append((key, user_id))
+            users[user_id] = (name, email, keys)
+        for array in arrays:
+            array.sort()
+        with self._lock:
+            self._arrays, self._users = arrays, users
+            self._built_at = time.monotonic()
+            self._version = version
+
+    def ensure_fresh(self):
+        # Called by queries. Only builds inline when there is no index yet;
+        # otherwise a rebuild runs in the background.
+        if self._built_at is None:
+            self.rebuild()
+            return
+        now = time.monotonic()
+        if now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        # rebuild_interval also covers bulk changes that bump no version
+        if _users_version() != self._version or now - self._built_at > self.rebuild_interval:
+            self._start_rebuild()
+
+    def _start_rebuild(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._rebuild_in_background, name="typeahead-rebuild",
+                                            daemon=True)
+            self._thread.start()
+
+    def _rebuild_in_background(self):
+        with self.app.app_context():
+            try:
+                self.rebuild()
+            except Exception:
+                logger.exception("User typeahead rebuild failed")
+            finally:
+                db.session.remove()
+
+    def _remove(self, user_id):
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return
+        for kind, key in entry[2]:
+            array = self._arrays[kind]
+            i = bisect_left(array, (key, user_id))
+            if i < len(array) and array[i] == (key, user_id):
+                del array[i]
+
+    def upsert(self, user):
+        # Call after commit from register / update_user
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove(user.id)
+            keys = _keys(user.name, user.email)
+            for kind, key in keys:
+                insort(self._arrays[kind], (key, user.id))
+            self._users[user.id] = (user.name, user.email, keys)
+
+    def remove(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+
+    def search(self, q, limit=10):
+        q = q.strip().lower()
+        if not q:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            for array in self._arrays:
+                i = bisect_left(array, (q,))
+                while i < len(array) and len(results) < limit:
+                    key, user_id = array[i]
+                    if not key.startswith(q):
+                        break
+                    if user_id not in seen:
+                        seen.add(user_id)
+                        name, email, _ = self._users[user_id]
+                        results.append({"id": user_id, "name": name, "email": email})
+                    i += 1
+                if len(results) >= limit:
+                    break
+        return results
+
+
+user_typeahead = UserTypeahead()
@@ -0,0 +1,290 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from werkzeug.exceptions import ClientDisconnected
+from utils.db import db
+from utils.errors import AppError, NotFoundError, ValidationError
+from utils.previews import preview_generator
+from utils.versions import bump
+from models.attachment import Attachment
+from models.task import Task
+from models.upload import UploadSession
+
+logger = logging.getLogger(__name__)
+
+# Attachment storage. Files are stored once per content hash under
+# UPLOAD_FOLDER/objects/<aa>/<bb>/<sha256>, however many attachments point
+# at them, so two uploads with the same name no longer overwrite each other
+# and identical uploads share one file.
+#
+# Large files go through an upload session: the client sends the file in
+# chunks, each appended at the session's current offset to
+# partial/<upload id> and fed through SHA-256 as it streams to disk.
+# Completing the upload is then a rename into objects/. After a dropped
+# connection the client asks for the session's offset and carries on from
+# there.
+
+READ_BLOCK = 64 * 1024
+# Running hashes kept per worker; a miss (another worker took the previous
+# chunk, restart) rehashes the partial file once
+MAX_HASHERS = 1000
+
+
+class Conflict(AppError):
+    def __init__(self, message, offset):
+        super().__init__(message, 409, {"offset": offset})
+
+
+def _copy(stream, out, hasher, limit=None):
+    # Copies up to `limit` bytes (everything if None) from stream to out.
+    # Returns the number of bytes copied; a client disconnect ends the copy
+    # early rather than raising, so what did arrive is kept.
+    copied = 0
+    while limit is None or copied < limit:
+        try:
+            block = stream.read(READ_BLOCK if limit is None else min(READ_BLOCK, limit - copied))
+        except ClientDisconnected:
+            break
+        if not block:
+            break
+        out.write(block)
+        hasher.update(block)
+        copied += len(block)
+    return copied
+
+
+class UploadStore:
+    def __init__(self, root="uploads", max_bytes=2 * 1024 ** 3, chunk_size=8 * 1024 ** 2,
+                 max_chunk=32 * 1024 ** 2, session_ttl=24):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.max_chunk = max_chunk
+        self.session_ttl = timedelta(hours=session_ttl)
+        self.app = None
+        self._hashers = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned_at = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.root = app.config["UPLOAD_FOLDER"]
+        self.max_bytes = app.config["UPLOAD_MAX_BYTES"]
+        self.chunk_size = app.config["UPLOAD_CHUNK_BYTES"]
+        self.max_chunk = app.config["UPLOAD_MAX_CHUNK_BYTES"]
+        self.session_ttl = timedelta(hours=app.config["UPLOAD_SESSION_TTL_HOURS"])
+        for sub in ("objects", "partial"):
+            os.makedirs(os.path.join(self.root, sub), exist_ok=True)
+
+    def object_key(self, digest):
+        # Relative to root; two levels of 256 directories keep any one
+        # directory small
+        return os.path.join("objects", digest[:2], digest[2:4], digest)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, self.object_key(digest))
+
+    def _partial_path(self, upload_id):
+        return os.path.join(self.root, "partial", upload_id)
+
+    def _store(self, source, digest):
+        # Moves a finished file into place, or drops it if that content is
+        # already stored
+        target = self.object_path(digest)
+        if os.path.exists(target):
+            os.remove(source)
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+
+    def save_stream(self, stream):
+        # One-shot upload of a whole file. Returns (sha256, size).
+        hasher = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "partial"))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = _copy(stream, out, hasher, self.max_bytes + 1)
+            if size > self.max_bytes:
+                raise ValidationError(f"File is larger than {self.max_bytes} bytes")
+            digest = hasher.hexdigest()
+            self._store(tmp, digest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return digest, size
+
+    def begin(self, file_name, size, content_type=None, task_id=None, project_id=None):
+        if size < 0 or size > self.max_bytes:
+            raise ValidationError(f"size must be between 0 and {self.max_bytes} bytes")
+        if task_id is not None:
+            task = db.session.get(Task, task_id)
+            if task is None:
+                raise NotFoundError("Task not found")
+            project_id = project_id or task.project_id
+        self._prune()
+        upload = UploadSession(id=uuid.uuid4().hex, task_id=task_id, project_id=project_id,
+                               file_name=file_name, content_type=content_type, size=size, received_bytes=0)
+        db.session.add(upload)
+        db.session.commit()
+        open(self._partial_path(upload.id), "wb").close()
+        return upload
+
+    def get(self, upload_id, lock=False):
+        query = UploadSession.query.filter_by(id=upload_id)
+        if lock:
+            # Serializes chunks for one upload across workers (a no-op on SQLite)
+            query = query.with_for_update()
+        upload = query.first()
+        if upload is None:
+            raise NotFoundError("Upload not found or expired")
+        return upload
+
+    def _hasher(self, upload):
+        # SHA-256 state covering the first received_bytes of the upload
+        with self._lock:
+            cached = self._hashers.pop(upload.id, None)
+        if cached is not None and cached[0] == upload.received_bytes:
+            return cached[1]
+        hasher = hashlib.sha256()
+        remaining = upload.received_bytes
+        try:
+            with open(self._partial_path(upload.id), "rb") as f:
+                while remaining:
+                    block = f.read(min(READ_BLOCK, remaining))
+                    if not block:
+                        break
+                    hasher.update(block)
+                    remaining -= len(block)
+        except FileNotFoundError:
+            pass
+        if remaining:
+            raise AppError("Partial upload data is missing; start a new upload", 410)
+        return hasher
+
+    def _keep_hasher(self, upload, hasher):
+        with self._lock:
+            self._hashers[upload.id] = (upload.received_bytes, hasher)
+            while len(self._hashers) > MAX_HASHERS:
+                self._hashers.popitem(last=False)
+
+    def append(self, upload_id, offset, stream, length):
+        # Appends one chunk at `offset`, which has to be where the upload
+        # currently ends. Returns the new offset; a chunk cut short by a
+        # disconnect still counts for the bytes that arrived.
+        upload = self.get(upload_id, lock=True)
+        received = upload.received_bytes
+        if offset != received:
+            db.session.rollback()
+            raise Conflict("Chunk does not start at the upload's current offset", received)
+        if length is None:
+            raise ValidationError("Content-Length is required")
+        if length > self.max_chunk:
+            raise ValidationError(f"Chunks are limited to {self.max_chunk} bytes")
+        if offset + length > upload.size:
+            raise ValidationError("Chunk runs past the declared file size")
+
+        hasher = self._hasher(upload)
+        with open(self._partial_path(upload.id), "r+b" if offset else "wb") as out:
+            # Drop anything past the committed offset left by a crash
+            out.truncate(offset)
+            out.seek(offset)
+            written = _copy(stream, out, hasher, length)
+        upload.received_bytes = offset + written
+        db.session.commit()
+        self._keep_hasher(upload, hasher)
+        return upload.received_bytes
+
+    def complete(self, upload_id, sha256=None):
+        upload = self.get(upload_id, lock=True)
+        received = upload.received_bytes
+        if received != upload.size:
+            db.session.rollback()
+            raise Conflict("Upload is not finished", received)
+        digest = self._hasher(upload).hexdigest()
+        if sha256 and sha256.lower() != digest:
+            self.abort(upload_id)
+            raise ValidationError("Checksum mismatch; the upload was discarded", {"sha256": digest})
+
+        self._store(self._partial_path(upload.id), digest)
+        attachment = self.add_attachment(upload.file_name, digest, upload.size, upload.content_type,
+                                         task_id=upload.task_id, project_id=upload.project_id)
+        db.session.delete(upload)
+        db.session.commit()
+        return attachment
+
+    def add_attachment(self, file_name, digest, size, content_type=None, task_id=None, project_id=None):
+        # file_url of a stored file is its download endpoint, so existing
+        # attachment lists link to it as they are
+        attachment = Attachment(task_id=task_id, project_id=project_id, file_name=file_name,
+                                content_hash=digest, size=size, content_type=content_type)
+        db.session.add(attachment)
+        db.session.flush()
+        attachment.file_url = f"/api/attachments/{attachment.id}/download"
+        return attachment
+
+    def previews(self, attachment):
+        # Preview URLs for attachment lists, None until rendered; listing an
+        # attachment whose previews are missing queues them
+        urls = {"thumbnail_url": None, "preview_url": None}
+        if attachment.content_hash:
+            available = preview_generator.ready(attachment.content_hash, attachment.content_type,
+                                                attachment.file_name, self.object_path(attachment.content_hash))
+            for size in available:
+                key = "thumbnail_url" if size == "thumb" else f"{size}_url"
+                urls[key] = f"/api/attachments/{attachment.id}/preview?size={size}"
+        return urls
+
+    def previews_ready(self, content_hash):
+        # Preview pool callback. Attachment lists are served with version
+        # ETags, so bump the ones showing this file or clients keep their
+        # copy without the new URLs.
+        with self.app.app_context():
+            try:
+                task_ids = [task_id for (task_id,) in db.session.query(Attachment.task_id).distinct()
+                            .filter(Attachment.content_hash == content_hash, Attachment.task_id != None)]
+                if task_ids:
+                    bump(*[f"attachments:task:{task_id}" for task_id in task_ids])
+                    db.session.commit()
+            finally:
+                db.session.remove()
+
+    def abort(self, upload_id):
+        upload = self.get(upload_id)
+        db.session.delete(upload)
+        db.session.commit()
+        self._discard(upload_id)
+
+    def _discard(self, upload_id):
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+        try:
+            os.remove(self._partial_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def _prune(self):
+        # Sessions idle for longer than session_ttl are dropped along with
+        # their partial files, at most once an hour
+        if time.monotonic() - self._pruned_at < 3600:
+            return
+        self._pruned_at = time.monotonic()
+        cutoff = datetime.utcnow() - self.session_ttl
+        stale = [upload_id for (upload_id,) in
+                 db.session.query(UploadSession.id).filter(UploadSession.updated_at < cutoff)]
+        if not stale:
+            return
+        UploadSession.query.filter(UploadSession.id.in_(stale)).delete(synchronize_session=False)
+        db.session.commit()
+        for upload_id in stale:
+            self._discard(upload_id)
+        logger.info("Pruned %d stale uploads", len(stale))
+
+
+upload_store = UploadStore()
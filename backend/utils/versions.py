@@ -0,0 +1,178 @@
+import hashlib
+import logging
+from functools import wraps
+from flask import g, request, make_response
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from utils.db import db
+from models.collection_version import CollectionVersion
+from models.task import Task
+from models.issue import Issue
+from models.project import Project
+from models.comment import Comment
+from models.attachment import Attachment
+from models.user import User
+from models.tracking import HardwareComponent, FirmwareVersion, TestSession, DeploymentDevice
+
+logger = logging.getLogger(__name__)
+
+# Per-collection version counters behind the ETags on list/detail GETs.
+# Any flush that touches one of the models below bumps the matching scopes,
+# so a GET only needs one primary-key lookup on collection_versions to tell
+# whether its response could have changed.
+#
+# Scoped counters ("tasks:12") are bumped inside the writer's transaction.
+# Global ones ("tasks", "projects") are shared by every writer, and holding
+# their row lock until commit would serialize all writes to the table, so
+# they are bumped in a short transaction of their own right after the
+# commit. A GET in between gets the old ETag with the new data, which only
+# costs it one extra full response later, never a stale 304.
+
+_DEFERRED_KEY = "versions_after_commit"
+
+# model -> [(scope template, attribute filling it in)]. With attribute None
+# the scope is always bumped; a template without {} is bumped only when the
+# attribute is set.
+VERSIONED_MODELS = {
+    Task: [("tasks", None), ("tasks:{}", "project_id")],
+    Issue: [("issues", None), ("issues:{}", "project_id")],
+    Project: [("projects", None)],
+    Comment: [("comments:task:{}", "task_id"), ("comments:project:{}", "project_id")],
+    # Project payloads embed their attachments
+    Attachment: [("attachments:task:{}", "task_id"), ("projects", "project_id")],
+    # Member name/email/role show up in project payloads; "users" is what
+    # the typeahead index watches
+    User: [("projects", None), ("users", None)],
+    HardwareComponent: [("hardware:{}", "project_id")],
+    FirmwareVersion: [("firmware:{}", "project_id")],
+    TestSession: [("testing:{}", "project_id")],
+    DeploymentDevice: [("deployment:{}", "project_id")],
+}
+
+
+def scopes_for(obj):
+    # Scopes for the object's current values and, for updates, its previous
+    # ones (e.g. a task moved to another project changes both lists)
+    templates = VERSIONED_MODELS.get(type(obj))
+    if not templates:
+        return set()
+    state = inspect(obj)
+    scopes = set()
+    for template, attr in templates:
+        if attr is None:
+            scopes.add(template)
+            continue
+        history = state.attrs[attr].history
+        for value in list(history.added) + list(history.unchanged) + list(history.deleted):
+            if value is not None:
+                scopes.add(template.format(value))
+    return scopes
+
+
+def bump_versions(connection, scopes):
+    if not scopes:
+        return
+    table = CollectionVersion.__table__
+    rows = [{"scope": scope, "version": 1} for scope in sorted(scopes)]
+    dialect = connection.dialect.name
+    if dialect in ("mysql", "mariadb"):
+        stmt = mysql_insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(version=table.c.version + 1)
+    elif dialect == "sqlite":
+        stmt = sqlite_insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.scope], set_={"version": table.c.version + 1})
+    else:
+        for scope in sorted(scopes):
+            updated = connection.execute(
+                table.update().where(table.c.scope == scope).values(version=table.c.version + 1)
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert().values(scope=scope, version=1))
+        return
+    connection.execute(stmt)
+
+
+def _bump(session, scopes):
+    scoped = {scope for scope in scopes if ":" in scope}
+    bump_versions(session.connection(), scoped)
+    if scopes - scoped:
+        session.info.setdefault(_DEFERRED_KEY, set()).update(scopes - scoped)
+
+
+def bump(*scopes):
+    # For bulk UPDATE/DELETE statements, which bypass the flush hook
+    _bump(db.session(), set(scopes))
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_after_flush(session, flush_context):
+    scopes = set()
+    for obj in list(session.new) + list(session.deleted):
+        scopes |= scopes_for(obj)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            scopes |= scopes_for(obj)
+    if scopes:
+        _bump(session, scopes)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    scopes = session.info.pop(_DEFERRED_KEY, None)
+    if not scopes:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            bump_versions(connection, scopes)
+    except Exception:
+        # The write itself is committed; clients see it once anything else
+        # bumps these scopes
+        logger.exception("Could not bump %s after commit", ", ".join(sorted(scopes)))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_DEFERRED_KEY, None)
+
+
+def current_etag(scopes):
+    rows = db.session.query(CollectionVersion.scope, CollectionVersion.version)\
+        .filter(CollectionVersion.scope.in_(scopes)).all()
+    versions = dict(rows)
+    # Kept for the view, see collection_version()
+    g.setdefault("collection_versions", {}).update((s, versions.get(s, 0)) for s in scopes)
+    key = "|".join([request.full_path] + [f"{s}={versions.get(s, 0)}" for s in sorted(scopes)])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def collection_version(scope):
+    # A scope's version as this request read it for its ETag, or read now.
+    # Caches keyed on it can't serve data older than the ETag says.
+    versions = g.setdefault("collection_versions", {})
+    if scope not in versions:
+        versions[scope] = db.session.query(CollectionVersion.version)\
+            .filter(CollectionVersion.scope == scope).scalar() or 0
+    return versions[scope]
+
+
+def conditional_get(scopes_fn):
+    # Decorator for GET views. scopes_fn gets the view's URL kwargs and
+    # returns the scopes the response depends on. A matching If-None-Match
+    # returns 304 before the view (and its row queries) runs.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = current_etag(scopes_fn(**kwargs))
+            if request.if_none_match.contains(etag):
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,66 @@
+import logging
+import time
+from sqlalchemy.orm import configure_mappers
+from utils.db import db, pool_metrics
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Process lifecycle for the pre-forking server (gunicorn.conf.py). The app
+# is built and warmed once in the master, so workers fork with mappers
+# configured, compiled statements cached on the engines and the in-memory
+# indexes (typeahead, fleet) already loaded, all shared copy-on-write.
+# Database connections and background threads can't cross a fork, so the
+# master drops its connections after warming up and every worker starts
+# its own threads.
+
+
+def warm_up(app):
+    started = time.monotonic()
+    configure_mappers()
+    # Representative read-only requests: fills the engines' compiled
+    # statement caches and builds indexes that are built on first use
+    client = app.test_client()
+    for path in app.config["WARMUP_PATHS"]:
+        try:
+            status = client.get(path).status_code
+        except Exception:
+            logger.exception("Warm-up request to %s failed", path)
+            continue
+        if status >= 400:
+            logger.warning("Warm-up request to %s returned %s", path, status)
+    dispose_pools(app, close=True)
+    metrics.reset()
+    logger.info("Warmed up in %.2fs", time.monotonic() - started)
+
+
+def dispose_pools(app, close):
+    # close=False in a forked child: forget the parent's connections
+    # without closing sockets the parent may still be using
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
+
+
+def after_fork(app):
+    dispose_pools(app, close=False)
+    metrics.reset()
+    pool_metrics.reset()
+    if app.config["DEADLINE_SCHEDULER_ENABLED"]:
+        # In every worker, so one keeps sweeping through recycling; the
+        # sweep itself takes a database lock and runs in one at a time
+        from utils.deadlines import deadline_scheduler
+        deadline_scheduler.start()
+
+
+def before_exit(app):
+    # Write out what the buffers still hold before a worker goes away
+    from utils.heartbeats import heartbeat_buffer
+    from utils.telemetry import telemetry_buffer
+    for buffer in (heartbeat_buffer, telemetry_buffer):
+        try:
+            buffer.flush()
+        except Exception:
+            logger.exception("Final flush failed")
+    # Last, so the flushes' SQL is counted too
+    metrics.retire()
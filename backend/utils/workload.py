@@ -0,0 +1,61 @@
+import threading
+import time
+from sqlalchemy import func
+from utils.db import db
+from models.task import Task
+
+
+def is_open(status):
+    # Mirrors the SQL filter `status != 'Done'`, which also skips NULLs
+    return status is not None and status != 'Done'
+
+
+class AssigneeWorkload:
+    # Per-worker cache of open task counts keyed by Task.assigned_to. Loaded
+    # with one grouped query, kept current by the task write paths in this
+    # worker and reloaded after `ttl` seconds to pick up other workers' writes.
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._counts = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        rows = db.session.query(Task.assigned_to, func.count(Task.id))\
+            .filter(Task.assigned_to != None, Task.status != 'Done')\
+            .group_by(Task.assigned_to)\
+            .all()
+        return {name: count for name, count in rows}
+
+    def counts(self):
+        with self._lock:
+            if self._counts is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._counts
+        counts = self._load()
+        with self._lock:
+            self._counts = counts
+            self._loaded_at = time.monotonic()
+        return counts
+
+    def get(self, assignee):
+        return self.counts().get(assignee, 0)
+
+    def track(self, before, after):
+        # before/after are (assigned_to, status) tuples, None for create/delete.
+        # Call after the commit so a rolled back write never reaches the cache.
+        with self._lock:
+            if self._counts is None:
+                return
+            counts = dict(self._counts)
+            if before and before[0] is not None and is_open(before[1]):
+                counts[before[0]] = max(0, counts.get(before[0], 0) - 1)
+            if after and after[0] is not None and is_open(after[1]):
+                counts[after[0]] = counts.get(after[0], 0) + 1
+            self._counts = counts
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+
+assignee_workload = AssigneeWorkload()
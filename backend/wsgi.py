@@ -0,0 +1,7 @@
+from app import create_app
+from utils.workers import warm_up
+
+# Entry point for gunicorn (see gunicorn.conf.py): built and warmed once
+# in the master, then forked into the workers
+app = create_app(prefork=True)
+warm_up(app)
@@ -1,5 +1,28 @@
 import axios from "axios";
 
-export default axios.create({
+const api = axios.create({
     baseURL: "http://localhost:5000/api"
 });
+
+// After a write the server returns X-DB-Primary-Until (epoch seconds).
+// Sending it back keeps our reads on the primary database until then, so
+// a refetch right after a write sees it even when replicas lag. Cookies
+// don't cross origins here, hence the header.
+let primaryUntil = null;
+
+api.interceptors.request.use((config) => {
+    if (primaryUntil && Number(primaryUntil) > Date.now() / 1000) {
+        config.headers["X-DB-Primary-Until"] = primaryUntil;
+    }
+    return config;
+});
+
+api.interceptors.response.use((response) => {
+    const until = response.headers["x-db-primary-until"];
+    if (until) {
+        primaryUntil = until;
+    }
+    return response;
+});
+
+export default api;
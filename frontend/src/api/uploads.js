@@ -0,0 +1,46 @@
+import api from "./axios";
+
+// Chunked, resumable upload to /attachments/uploads. Each chunk is retried
+// from the offset the server reports, so a dropped connection only costs
+// the chunk in flight.
+export async function uploadFile(file, { taskId, projectId, onProgress } = {}) {
+    const { data: upload } = await api.post("/attachments/uploads", {
+        file_name: file.name,
+        size: file.size,
+        content_type: file.type || null,
+        task_id: taskId,
+        project_id: projectId,
+    });
+
+    let offset = upload.offset;
+    let failures = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + upload.chunk_size);
+        try {
+            const res = await api.put(`/attachments/uploads/${upload.upload_id}`, chunk, {
+                params: { offset },
+                headers: { "Content-Type": "application/octet-stream" },
+            });
+            offset = res.data.offset;
+            failures = 0;
+        } catch (err) {
+            if (++failures > 5) throw err;
+            // 409 carries the right offset; otherwise ask where the upload got to
+            const current = err.response?.status === 409
+                ? err.response.data.details
+                : (await api.get(`/attachments/uploads/${upload.upload_id}`)).data;
+            offset = current.offset;
+            await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+        }
+        onProgress?.(offset / file.size);
+    }
+
+    const { data } = await api.post(`/attachments/uploads/${upload.upload_id}/complete`);
+    return data;
+}
+
+// Stored files link to the API's download endpoint ("/api/attachments/1/download"),
+// which lives on the backend's origin rather than the app's
+export function fileHref(url) {
+    return url?.startsWith("/api/") ? new URL(url, api.defaults.baseURL).href : url;
+}
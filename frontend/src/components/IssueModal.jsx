@@ -33,7 +33,7 @@ export default function IssueModal({ issue = null, projectId = null, onClose, on
 
     const fetchProjects = async () => {
         try {
-            const res = await api.get("/projects/");
+            const res = await api.get("/projects/?fields=id,name&include=");
             setProjects(res.data.projects);
         } catch (err) {
             console.error("Failed to fetch projects", err);
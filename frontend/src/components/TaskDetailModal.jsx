@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import api from "../api/axios";
+import { fileHref, uploadFile } from "../api/uploads";
 import TaskModal from "./TaskModal";
 
 export default function TaskDetailModal({ task, onClose, onUpdate }) {
@@ -12,6 +13,8 @@ export default function TaskDetailModal({ task, onClose, onUpdate }) {
     // Attachments
     const [docName, setDocName] = useState("");
     const [docUrl, setDocUrl] = useState("");
+    const [docFile, setDocFile] = useState(null);
+    const [uploadProgress, setUploadProgress] = useState(null);
     const [showUpload, setShowUpload] = useState(false);
 
     const fetchDetails = async () => {
@@ -49,9 +52,19 @@ export default function TaskDetailModal({ task, onClose, onUpdate }) {
 
     const uploadAttachment = async (e) => {
         e.preventDefault();
-        await api.post(`/tasks/${task.id}/attachments`, { name: docName, url: docUrl });
+        if (docFile) {
+            setUploadProgress(0);
+            try {
+                await uploadFile(docFile, { taskId: task.id, onProgress: setUploadProgress });
+            } finally {
+                setUploadProgress(null);
+            }
+        } else {
+            await api.post(`/tasks/${task.id}/attachments`, { name: docName, url: docUrl });
+        }
         setDocName("");
         setDocUrl("");
+        setDocFile(null);
         setShowUpload(false);
         fetchDetails();
     };
@@ -125,17 +138,30 @@ export default function TaskDetailModal({ task, onClose, onUpdate }) {
 
                         {showUpload && (
                             <form onSubmit={uploadAttachment} className="mb-4 p-3 bg-gray-50 rounded-lg space-y-2">
-                                <input className="input w-full text-sm" placeholder="File Name" value={docName} onChange={e => setDocName(e.target.value)} required />
-                                <input className="input w-full text-sm" placeholder="File URL" value={docUrl} onChange={e => setDocUrl(e.target.value)} required />
-                                <button type="submit" className="btn text-sm w-full">Upload</button>
+                                <input type="file" className="w-full text-sm" onChange={e => setDocFile(e.target.files[0] || null)} />
+                                {!docFile && (
+                                    <>
+                                        <input className="input w-full text-sm" placeholder="File Name" value={docName} onChange={e => setDocName(e.target.value)} required />
+                                        <input className="input w-full text-sm" placeholder="File URL" value={docUrl} onChange={e => setDocUrl(e.target.value)} required />
+                                    </>
+                                )}
+                                <button type="submit" className="btn text-sm w-full" disabled={uploadProgress !== null}>
+                                    {uploadProgress !== null ? `Uploading ${Math.round(uploadProgress * 100)}%` : "Upload"}
+                                </button>
                             </form>
                         )}
 
                         <div className="space-y-2">
                             {attachments.map(att => (
                                 <div key={att.id} className="flex items-center gap-2 text-sm">
-                                    <span>📎</span>
-                                    <a href={att.file_url} target="_blank" rel="noreferrer" className="text-blue-600 hover:underline">{att.file_name}</a>
+                                    {att.thumbnail_url ? (
+                                        <a href={fileHref(att.preview_url || att.file_url)} target="_blank" rel="noreferrer">
+                                            <img src={fileHref(att.thumbnail_url)} alt="" loading="lazy" className="w-12 h-12 object-cover rounded border border-gray-200" />
+                                        </a>
+                                    ) : (
+                                        <span>📎</span>
+                                    )}
+                                    <a href={fileHref(att.file_url)} target="_blank" rel="noreferrer" className="text-blue-600 hover:underline">{att.file_name}</a>
                                 </div>
                             ))}
                             {attachments.length === 0 && <p className="text-gray-400 text-sm italic">No attachments.</p>}
@@ -20,23 +20,15 @@ export default function Dashboard() {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [countRes, issuesRes, velocityRes, workloadRes, pendingRes, healthRes, activityRes] = await Promise.all([
-                    api.get("/stats/counts"),
-                    api.get("/stats/issues-by-severity"),
-                    api.get("/stats/task-velocity"),
-                    api.get("/stats/team-workload"),
-                    api.get("/stats/pending-approvals"),
-                    api.get("/stats/project-health"),
-                    api.get("/stats/recent-activity")
-                ]);
+                const { data } = await api.get("/stats/dashboard");
 
-                setStats(countRes.data);
-                setIssuesData(issuesRes.data.data);
-                setVelocityData(velocityRes.data.data);
-                setWorkloadData(workloadRes.data.data);
-                setPendingCount(pendingRes.data.count);
-                setProjectHealth(healthRes.data.data);
-                setRecentActivity(activityRes.data.data);
+                setStats(data.counts);
+                setIssuesData(data.issues_by_severity);
+                setVelocityData(data.task_velocity);
+                setWorkloadData(data.team_workload);
+                setPendingCount(data.pending_approvals);
+                setProjectHealth(data.project_health);
+                setRecentActivity(data.recent_activity);
             } catch (err) {
                 console.error("Failed to fetch dashboard data", err);
                 toast.error("Failed to load dashboard data");
@@ -1,6 +1,7 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import api from "../api/axios";
+import { fileHref } from "../api/uploads";
 import TaskModal from "../components/TaskModal";
 import ProjectModal from "../components/ProjectModal";
 import IssueModal from "../components/IssueModal";
@@ -97,14 +98,31 @@ export default function ProjectDetail() {
         }
     };
 
-    const handleSearchUsers = async (q) => {
+    // Typeahead: wait for a pause in typing (the server's debounce hint),
+    // cancel the previous request, and ignore answers to older queries
+    const searchHints = useRef({ min_chars: 2, debounce_ms: 150 });
+    const searchTimer = useRef(null);
+    const searchRequest = useRef(null);
+
+    const handleSearchUsers = (q) => {
         setSearchQuery(q);
-        if (q.length > 1) {
-            const res = await api.get(`/projects/users/search?q=${q}`);
-            setSearchResults(res.data.users);
-        } else {
+        clearTimeout(searchTimer.current);
+        searchRequest.current?.abort();
+        if (q.trim().length < searchHints.current.min_chars) {
             setSearchResults([]);
+            return;
         }
+        searchTimer.current = setTimeout(async () => {
+            const controller = new AbortController();
+            searchRequest.current = controller;
+            try {
+                const res = await api.get("/projects/users/search", { params: { q }, signal: controller.signal });
+                searchHints.current = res.data.hints || searchHints.current;
+                if (res.data.q === q) setSearchResults(res.data.users);
+            } catch (err) {
+                if (err.name !== "CanceledError") console.error("User search failed", err);
+            }
+        }, searchHints.current.debounce_ms);
     };
 
     const addMember = async (userId) => {
@@ -553,13 +571,13 @@ export default function ProjectDetail() {
                                                 <FileText size={24} />
                                             </div>
                                             <div>
-                                                <a href={doc.file_url} target="_blank" rel="noreferrer" className="font-bold text-gray-900 hover:text-primary transition-colors">
+                                                <a href={fileHref(doc.file_url)} target="_blank" rel="noreferrer" className="font-bold text-gray-900 hover:text-primary transition-colors">
                                                     {doc.file_name}
                                                 </a>
                                                 <p className="text-xs text-gray-500 mt-0.5">Uploaded on {new Date(doc.uploaded_at).toLocaleDateString()}</p>
                                             </div>
                                         </div>
-                                        <a href={doc.file_url} target="_blank" rel="noreferrer" className="text-gray-400 hover:text-primary transition-colors">
+                                        <a href={fileHref(doc.file_url)} target="_blank" rel="noreferrer" className="text-gray-400 hover:text-primary transition-colors">
                                             <Download size={20} />
                                         </a>
                                     </div>
@@ -10,7 +10,7 @@ export default function Projects() {
   const [showModal, setShowModal] = useState(false);
 
   const fetchProjects = () => {
-    api.get("/projects").then(res => setProjects(res.data.projects));
+    api.get("/projects/?include=").then(res => setProjects(res.data.projects));
   };
 
   useEffect(() => {
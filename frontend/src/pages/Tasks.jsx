@@ -20,12 +20,22 @@ export default function Tasks() {
     const [showTaskModal, setShowTaskModal] = useState(false);
     const [editingTask, setEditingTask] = useState(null);
 
-    // Poll for updates every 10 seconds
+    // Refetch when the server reports task changes (server-sent events) in
+    // any project, since this page lists them all. Bursts of events are
+    // coalesced into one reload.
     useEffect(() => {
-        const interval = setInterval(() => {
-            loadTasks(pagination.current_page);
-        }, 10000);
-        return () => clearInterval(interval);
+        const source = new EventSource(`${api.defaults.baseURL}/events/?topic=task`);
+        let timer = null;
+        const refresh = () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => loadTasks(pagination.current_page), 300);
+        };
+        source.addEventListener("task", refresh);
+        source.addEventListener("reset", refresh);
+        return () => {
+            clearTimeout(timer);
+            source.close();
+        };
     }, [pagination.current_page, filter, search, sortBy, order]);
 
     useEffect(() => {